@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""CSV rotation and compression under load.
+
+Writes --rows rows at --rate rows/s through a CsvSink that rotates every
+--rotate-mb MB (or every --rotate-s seconds) and compresses the closed
+segments, for each compression method available. Then reads every segment
+back (decompressing it) plus the live file and checks that each row is
+there exactly once and in order, that the manifest's time ranges and row
+counts match the segments, and that nothing was left uncompressed. Reports
+the write() cost seen by the receive loop (p50, p99, max), which must not
+jump at the rotations.
+
+Example:
+    python scripts/bench_csv_rotate.py --rows 200000 --rotate-mb 2
+"""
+import argparse, csv, gzip, io, os, shutil, subprocess, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import csv_sink
+from csv_sink import CsvSink
+
+HEADER = ['ts', 'seq', 'src_addr', 'freq_mhz', 'payload']
+
+
+def read_segment(path):
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rt', newline='') as f:
+            return list(csv.reader(f))[1:]
+    if path.endswith('.zst'):
+        out = subprocess.run(['zstd', '-q', '-d', '-c', path], check=True, capture_output=True).stdout
+        return list(csv.reader(io.StringIO(out.decode(), newline='')))[1:]
+    with open(path, newline='') as f:
+        return list(csv.reader(f))[1:]
+
+
+def run(method, args, d):
+    path = os.path.join(d, method, 'rx_log.csv')
+    if method == 'off':
+        sink = CsvSink(path, HEADER, flush_rows=args.flush_rows, flush_ms=args.flush_ms)
+    else:
+        sink = CsvSink(path, HEADER, flush_rows=args.flush_rows, flush_ms=args.flush_ms,
+                       max_bytes=int(args.rotate_mb * 1e6), rotate_s=args.rotate_s, compress=method)
+    pad = 'x' * 80
+    lat = []
+    t0 = time.perf_counter()
+    for i in range(args.rows):
+        row = [time.strftime('%Y-%m-%dT%H:%M:%S'), i, 101, '868.125', '{"seq":%d,"pad":"%s"}' % (i, pad)]
+        t = time.perf_counter_ns()
+        sink.write(row)
+        lat.append(time.perf_counter_ns() - t)
+        if args.rate:
+            time.sleep(max(0.0, t0 + (i + 1) / args.rate - time.perf_counter()))
+    sink.close()
+    wall = time.perf_counter() - t0
+    lat.sort()
+    cost = (f"write() p50={lat[len(lat) // 2] / 1000:.1f} p99={lat[int(len(lat) * 0.99)] / 1000:.1f} "
+            f"max={lat[-1] / 1000:.0f} µs")
+    if method == 'off':
+        print(f"  {'off':5s}: no rotation in {wall:.1f} s, {cost} (baseline)")
+        return True
+
+    segs = csv_sink.segments(path)
+    rows, manifest_ok = [], True
+    with open(sink.manifest, newline='') as f:
+        entries = list(csv.DictReader(f))
+    for seg, e in zip(segs, entries):
+        got = read_segment(seg)
+        manifest_ok &= (len(got) == int(e['rows']) and got[0][0] == e['first_ts'] and got[-1][0] == e['last_ts'])
+        rows += got
+    rows += read_segment(path)
+    seqs = [int(r[1]) for r in rows]
+    complete = seqs == list(range(args.rows))
+    left = [s for s in segs if method != 'none' and not s.endswith(csv_sink.COMPRESS[method])]
+    raw = sum(int(e['bytes']) for e in entries)
+    packed = sum(os.path.getsize(s) for s in segs)
+    biggest = max((int(e['bytes']) for e in entries), default=0)
+    ok = complete and manifest_ok and not left and len(segs) == sink.rotations == len(entries)
+    print(f"  {method:5s}: {sink.rotations} rotations in {wall:.1f} s, {cost}; segments "
+          f"{raw / 1e6:.1f} MB (largest {biggest / 1e6:.2f}) -> {packed / 1e6:.1f} MB; "
+          f"rows {'complete' if complete else 'MISSING/REPEATED'}, "
+          f"manifest {'OK' if manifest_ok else 'WRONG'}, {len(left)} uncompressed {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description='CSV rotation/compression check')
+    ap.add_argument('--rows', type=int, default=200000)
+    ap.add_argument('--rate', type=float, default=0, help='rows/s (0 = as fast as possible)')
+    ap.add_argument('--rotate-mb', type=float, default=2)
+    ap.add_argument('--rotate-s', type=float, default=0)
+    ap.add_argument('--flush-rows', type=int, default=20)
+    ap.add_argument('--flush-ms', type=float, default=1000)
+    ap.add_argument('--dir', default=None, help='Directory for the temp files (e.g. on the SD card)')
+    args = ap.parse_args()
+    methods = ['off', 'none', 'gzip'] + (['zstd'] if shutil.which('zstd') else [])
+    print(f"{args.rows} rows, rotate every {args.rotate_mb:g} MB / {args.rotate_s:g} s, {os.cpu_count()} CPUs")
+    ok = True
+    with tempfile.TemporaryDirectory(dir=args.dir) as d:
+        for method in methods:
+            ok &= run(method, args, d)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""CSV sink benchmark: per-row write+flush vs the group-commit CsvSink.
+
+Measures rows/s as seen by the receive loop (time spent in the write call)
+and end-to-end (until every row is flushed and the file closed).
+
+Example:
+    python scripts/bench_csv_sink.py --rows 50000 --flush-rows 50 --dir /home/pi
+"""
+import argparse, csv, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from csv_sink import CsvSink
+
+HEADER = ['ts', 'src_addr', 'freq_mhz', 'payload']
+
+
+def make_row(i):
+    return ['2025-08-16T12:00:00', 101, '915.125',
+            '{"ts":"2025-08-16 12:00:00","seq":%d,"station":"REVN"}' % i]
+
+
+def per_row(path, rows, fsync):
+    t0 = time.perf_counter()
+    with open(path, 'a', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        for i in range(rows):
+            w.writerow(make_row(i)); f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+    dt = time.perf_counter() - t0
+    return dt, dt
+
+
+def grouped(path, rows, fsync, flush_rows, flush_ms):
+    sink = CsvSink(path, HEADER, flush_rows=flush_rows, flush_ms=flush_ms, fsync=fsync)
+    t0 = time.perf_counter()
+    max_risk = 0
+    for i in range(rows):
+        sink.write(make_row(i))
+        if i % 1000 == 0:
+            max_risk = max(max_risk, sink.at_risk)
+    t_loop = time.perf_counter() - t0
+    sink.close()
+    t_total = time.perf_counter() - t0
+    print(f"  group-commit: {sink.flushes} flushes, max rows at risk sampled={max_risk}")
+    return t_loop, t_total
+
+
+def main():
+    ap = argparse.ArgumentParser(description='CSV sink rows/s benchmark')
+    ap.add_argument('--rows', type=int, default=20000)
+    ap.add_argument('--flush-rows', type=int, default=20)
+    ap.add_argument('--flush-ms', type=float, default=1000)
+    ap.add_argument('--fsync', action='store_true', help='fsync after every flush (both modes)')
+    ap.add_argument('--dir', default=None, help='Directory for the temp files (e.g. on the SD card)')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as d:
+        a = per_row(os.path.join(d, 'a.csv'), args.rows, args.fsync)
+        b = grouped(os.path.join(d, 'b.csv'), args.rows, args.fsync, args.flush_rows, args.flush_ms)
+        for name, (t_loop, t_total) in (('per-row flush', a), ('group-commit', b)):
+            print(f"{name:>14}: loop {args.rows / t_loop:>12,.0f} rows/s | "
+                  f"end-to-end {args.rows / t_total:>12,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
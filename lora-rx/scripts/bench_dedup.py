@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Duplicate suppression over a long simulated uptime.
+
+Feeds --messages messages from --sources stations (binary telemetry, JSON
+and MSG|seq|ts text, as tx_sensors.py / tx_random.py send them, plus a
+constant PING that carries no message id and must never be taken for a
+repeat) through a DedupCache on a fake clock advancing --rate messages per second, so a few million
+messages stand for weeks of a busy network. A --dup-rate share of them
+is repeated within --delay seconds, as a relay would. Reports missed and
+false duplicates, the cost per message, and the cache size and memory
+(RSS, or traced allocations with --tracemalloc, which slows everything
+down) at every tenth of the run, which must stay flat.
+
+Example:
+    python scripts/bench_dedup.py --messages 2000000 --sources 200
+"""
+import argparse, json, os, random, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import telemetry_codec
+from dedup import DedupCache
+
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+class Clock:
+    t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Dedup cache over a simulated long uptime')
+    ap.add_argument('--messages', type=int, default=2000000)
+    ap.add_argument('--sources', type=int, default=200)
+    ap.add_argument('--rate', type=float, default=5.0, help='messages per second on the network')
+    ap.add_argument('--dup-rate', type=float, default=0.3, help='share of messages repeated')
+    ap.add_argument('--delay', type=float, default=5.0, help='max seconds before a repeat arrives')
+    ap.add_argument('--ttl', type=float, default=30.0)
+    ap.add_argument('--max-entries', type=int, default=4096)
+    ap.add_argument('--tracemalloc', action='store_true', help='report traced memory instead of RSS')
+    args = ap.parse_args()
+
+    rng = random.Random(1)
+    clock = Clock()
+    cache = DedupCache(args.ttl, args.max_entries, clock=clock)
+    seq = [0] * args.sources
+    pending = []            # (due time, src, payload) repeats not delivered yet
+    missed = false_dup = dups = 0
+    step = 1.0 / args.rate
+    if args.tracemalloc:
+        tracemalloc.start()
+    cpu = 0.0
+    for i in range(args.messages):
+        clock.t += step
+        src = rng.randrange(args.sources)
+        n = seq[src]
+        seq[src] += 1
+        if src % 3 == 1:
+            rain = {'intensity_mm_h': 1.0, 'bucket_mm': 0.2, 'bucket_tips_total': n}
+            payload = telemetry_codec.encode(n, 1.7e9 + clock.t, 'tx01', rain=rain)
+        elif src % 3 == 2:
+            payload = f"MSG|{n:06d}|{int(clock.t)}|{rng.randrange(10000)}".encode()
+        else:
+            payload = json.dumps({'ts': int(clock.t), 'seq': n}, separators=(',', ':')).encode()
+        batch = [(src, payload, False)]
+        if rng.random() < 0.05:
+            batch.append((src, b'PING', False))
+        if rng.random() < args.dup_rate:
+            pending.append((clock.t + rng.random() * args.delay, src, payload))
+        if pending and pending[0][0] <= clock.t:
+            batch += [(s, p, True) for _, s, p in pending if _ <= clock.t]
+            pending = [x for x in pending if x[0] > clock.t]
+        t0 = time.perf_counter()
+        result = [cache.seen(s, p) for s, p, _ in batch]
+        cpu += time.perf_counter() - t0
+        for (s, p, is_dup), r in zip(batch, result):
+            dups += is_dup
+            missed += is_dup and not r
+            false_dup += r and not is_dup
+        if (i + 1) % (args.messages // 10) == 0:
+            if args.tracemalloc:
+                mem = f"{tracemalloc.get_traced_memory()[0] // 1024:7d} KiB traced"
+            else:
+                mem = f"{rss_kb():7d} kB RSS"
+            print(f"  {clock.t / 86400:6.2f} days: {len(cache):5d} entries, {mem}, "
+                  f"{cache.duplicates} duplicates, {cache.expired} expired, {cache.evicted} evicted")
+    checked = cache.checked
+    print(f"{checked} messages ({cache.unkeyed} without id), {dups} repeats: {missed} missed, {false_dup} false, "
+          f"{cpu / checked * 1e6:.2f} µs per message")
+    if missed or false_dup:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Fan-out socket with fast and stuck subscribers.
+
+Publishes --records NDJSON records (the size of a rx_basic.py record) to
+a fanout.FanoutServer with --fast subscribers reading in their own threads
+and one subscriber that connects and never reads. For each slow-consumer
+policy it reports the publish() cost as seen by the radio loop (p50, p99,
+max), checks that every fast subscriber got every record in order and
+that the stuck one was dropped from or disconnected instead of stalling
+the publisher.
+
+Example:
+    python scripts/bench_fanout.py --records 100000 --fast 4
+"""
+import argparse, json, os, socket, sys, tempfile, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from fanout import FanoutServer
+
+
+def reader(path, out, ready):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    ready.release()
+    buf = b''
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            break
+        buf += data
+        *lines, buf = buf.split(b'\n')
+        out.extend(int(json.loads(l)['seq']) for l in lines)
+    sock.close()
+
+
+def run(policy, args, path):
+    srv = FanoutServer(path, args.queue, policy)
+    got = [[] for _ in range(args.fast)]
+    ready = threading.Semaphore(0)
+    threads = [threading.Thread(target=reader, args=(path, g, ready), daemon=True) for g in got]
+    for t in threads:
+        t.start()
+    for _ in threads:
+        ready.acquire()
+    stuck = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stuck.connect(path)
+    while srv.subscribers < args.fast + 1:
+        time.sleep(0.01)
+    pad = 'x' * 120
+    lat = []
+    t0 = time.perf_counter()
+    for seq in range(args.records):
+        line = json.dumps({'ts': '2024-01-01T00:00:00', 'src': 101, 'freq_mhz': '868.125', 'rssi': -60,
+                           'payload': pad, 'seq': seq}, separators=(',', ':')).encode() + b'\n'
+        t = time.perf_counter_ns()
+        srv.publish(line)
+        lat.append(time.perf_counter_ns() - t)
+        if args.rate:
+            time.sleep(max(0.0, t0 + (seq + 1) / args.rate - time.perf_counter()))
+    wall = time.perf_counter() - t0
+    deadline = time.monotonic() + 30
+    while any(len(g) < args.records for g in got) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    srv.close()
+    for t in threads:
+        t.join(timeout=5)
+    stuck.close()
+    lat.sort()
+    ok = all(g == list(range(args.records)) for g in got)
+    stuck_ok = srv.dropped > 0 if policy == 'drop-oldest' else srv.disconnects == 1
+    print(f"  {policy:11s}: {args.records / wall:8.0f} records/s, publish p50={lat[len(lat) // 2] / 1000:.1f} "
+          f"p99={lat[int(len(lat) * 0.99)] / 1000:.1f} max={lat[-1] / 1000:.0f} µs; "
+          f"fast subscribers {'complete' if ok else 'INCOMPLETE'}, stuck one: {srv.dropped} dropped, "
+          f"{srv.disconnects} disconnected {'OK' if ok and stuck_ok else 'FAIL'}")
+    return ok and stuck_ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Fan-out socket throughput with a stuck subscriber')
+    ap.add_argument('--records', type=int, default=100000)
+    ap.add_argument('--fast', type=int, default=4, help='subscribers that keep up')
+    ap.add_argument('--queue', type=int, default=1000)
+    ap.add_argument('--rate', type=float, default=2000, help='records/s (0 = as fast as possible)')
+    args = ap.parse_args()
+    print(f"{args.records} records, {args.fast} fast + 1 stuck subscriber, queue {args.queue}, "
+          f"{os.cpu_count()} CPUs")
+    ok = True
+    with tempfile.TemporaryDirectory() as d:
+        for policy in ('drop-oldest', 'disconnect'):
+            ok &= run(policy, args, os.path.join(d, 'rx.sock'))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Self-check and throughput of fragment.split() / Reassembler.
+
+Checks (exit non-zero on any failure):
+  - in-order, out-of-order and duplicated fragments reassemble exactly once
+  - a message with a missing fragment is dropped after the timeout
+  - late duplicates of a completed message are ignored
+  - the table never holds more than max_messages / max_bytes
+  - payloads that fit one packet are passed through unchanged
+  - text starting with a multi-byte UTF-8 character is never a fragment
+Then a random fuzz run (shuffle, loss, duplication, interleaved sources)
+and a throughput figure.
+
+Example:
+    python scripts/bench_fragment.py --messages 20000 --loss 0.02
+"""
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import fragment
+from fragment import Reassembler, split
+
+
+class VirtualClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+FAILS = []
+
+
+def check(name, cond):
+    print(f"  {'OK  ' if cond else 'FAIL'} {name}")
+    if not cond:
+        FAILS.append(name)
+
+
+def feed(r, src, parts):
+    return [m for m in (r.add(src, p) for p in parts) if m is not None]
+
+
+def scenarios(rng):
+    msg = rng.randbytes(1000)
+    parts = split(msg, 7, 240)
+    check('1000 B -> 5 fragments of <= 234 B', len(parts) == 5 and all(len(p) <= 234 for p in parts))
+    check('small payload passes unchanged', split(b'{"a":1}', 1) == [b'{"a":1}'])
+    odd = bytes([fragment.MARKER | fragment.VERSION]) + rng.randbytes(20)
+    check('payload starting with the marker is wrapped', fragment.is_fragment(split(odd, 1)[0])
+          and Reassembler().add(1, split(odd, 1)[0]) == odd)
+    texts = [t.encode() for t in ('🚀 despegue', 'яблоко', 'ñandú', '東京 晴れ', 'ÿ')]
+    check('non-ASCII text is not a fragment and passes unchanged',
+          not any(fragment.is_fragment(t) for t in texts) and all(split(t, 1) == [t] for t in texts))
+
+    r = Reassembler()
+    check('in order', feed(r, 1, parts) == [msg])
+
+    r = Reassembler()
+    shuffled = parts[:]
+    rng.shuffle(shuffled)
+    check('out of order', feed(r, 1, shuffled) == [msg])
+
+    r = Reassembler()
+    dup = parts[:3] + parts[1:2] + parts[3:] + parts[:2]
+    out = feed(r, 1, dup)
+    check('duplicates (before and after completion)', out == [msg] and r.duplicates == 3 and r.pending == 0)
+
+    clock = VirtualClock()
+    r = Reassembler(timeout_s=30, clock=clock)
+    feed(r, 1, parts[:2] + parts[3:])
+    clock.t = 31.0
+    r.expire()
+    check('missing fragment times out', r.pending == 0 and r.timeouts == 1 and r.buffered == 0)
+    check('late fragment starts over instead of completing', r.add(1, parts[2]) is None and r.pending == 1)
+
+    r = Reassembler()
+    a, b = split(msg, 1, 240), split(msg[::-1], 1, 240)
+    out = [m for pair in zip(a, b) for m in (r.add(10, pair[0]), r.add(11, pair[1])) if m is not None]
+    check('same message id from two sources', out == [msg, msg[::-1]])
+
+    r = Reassembler(max_messages=4, max_bytes=4000)
+    peak_n = peak_b = 0
+    for mid in range(50):
+        r.add(1, split(msg, mid, 240)[0])
+        peak_n, peak_b = max(peak_n, r.pending), max(peak_b, r.buffered)
+    check('bounded table (4 messages, 4000 B)', peak_n <= 4 and peak_b <= 4000 and r.evicted == 46)
+
+
+def fuzz(rng, n, loss, dup, sources):
+    r = Reassembler(max_messages=256, max_bytes=1 << 22)
+    sent, stream = {}, []
+    for mid in range(n):
+        src = rng.randrange(sources)
+        msg = rng.randbytes(rng.randrange(300, 1500))   # always more than one packet
+        parts = split(msg, mid, rng.choice((240, 128, 64)))
+        kept = [p for p in parts if rng.random() >= loss]
+        if len(kept) == len(parts):
+            sent[(src, mid & 0xFFFF)] = msg
+        for p in kept:
+            stream.append((src, p))
+            if rng.random() < dup:
+                stream.append((src, p))
+    # local reordering, as from interleaved senders
+    for i in range(0, len(stream) - 8, 4):
+        j = i + rng.randrange(8)
+        stream[i], stream[j] = stream[j], stream[i]
+    got = {}
+    t0 = time.perf_counter()
+    for src, p in stream:
+        m = r.add(src, p)
+        if m is not None:
+            got[(src, int.from_bytes(p[1:3], 'little'))] = m
+    dt = time.perf_counter() - t0
+    check(f'fuzz: {len(sent)} complete messages recovered exactly', all(got.get(k) == v for k, v in sent.items()))
+    check('fuzz: nothing invented', all(k in sent for k in got))
+    print(f"  {len(stream)} fragments in {dt * 1000:.0f} ms = {len(stream) / dt / 1000:.0f}k fragments/s, "
+          f"dup={r.duplicates} pending={r.pending} evicted={r.evicted}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Fragmentation/reassembly self-check')
+    ap.add_argument('--messages', type=int, default=5000)
+    ap.add_argument('--loss', type=float, default=0.02, help='fragment loss probability')
+    ap.add_argument('--dup', type=float, default=0.05, help='fragment duplication probability')
+    ap.add_argument('--sources', type=int, default=4)
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+    rng = random.Random(args.seed)
+    print('scenarios:')
+    scenarios(rng)
+    print('fuzz:')
+    fuzz(rng, args.messages, args.loss, args.dup, args.sources)
+    if FAILS:
+        print(f"{len(FAILS)} check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Fuzz and throughput check for the streaming FrameParser.
+
+Builds a byte stream of random frames as the module would output them
+(src, chan, SYNC/LEN header, payload, checksum, RSSI), cuts it into randomly
+sized chunks and feeds the parser. Every frame must come out exactly once
+and in order.
+
+With --garbage, random junk is injected between frames. A candidate header
+that starts in the junk fails the 8-bit sum checksum 255 times out of 256;
+the rare one that passes is taken as a frame and swallows the real frames
+its length covers. So the check allows at most 1 + bad_checksum/64 such
+false frames (four times the expected number, plus one), each costing at
+most the frames that fit in one MAX_FRAME bytes. Every other frame must come
+out once and in order.
+
+Example:
+    python scripts/bench_framing.py --frames 50000 --max-chunk 64 --garbage 0.1
+"""
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import framing
+from framing import FrameParser
+
+
+def make_stream(rng, n, garbage):
+    frames, parts = [], []
+    for _ in range(n):
+        src = rng.randrange(65536); chan = rng.randrange(84)
+        payload = rng.randbytes(rng.randrange(0, 200))
+        rssi = rng.randrange(100, 256)
+        frames.append((src, chan, payload, -(256 - rssi)))
+        parts.append(framing.encode(src, chan, payload) + bytes([rssi]))
+        if garbage and rng.random() < garbage:
+            # junk without sync bytes, as left by a truncated/corrupted read
+            parts.append(bytes(b for b in rng.randbytes(rng.randrange(1, 40)) if b != framing.SYNC))
+    return frames, b''.join(parts)
+
+
+# real frames one false match can swallow: the smallest ones (header, empty
+# payload, CHK, RSSI) that fit in the MAX_FRAME bytes it may cover
+MAX_SWALLOWED = framing.MAX_FRAME // (framing.HEADER_LEN + 2)
+
+
+def align(expected, got):
+    """(false frames, missing frames) of `got` against `expected`, in order."""
+    index = {e: i for i, e in enumerate(expected)}
+    j = false = missing = 0
+    for f in got:
+        k = index.get((f.src_addr, f.chan, f.payload, f.rssi))
+        if k is None or k < j:
+            false += 1
+            continue
+        missing += k - j
+        j = k + 1
+    return false, missing + len(expected) - j
+
+
+def chunks(rng, data, max_chunk):
+    i = 0
+    while i < len(data):
+        n = rng.randrange(1, max_chunk + 1)
+        yield data[i:i + n]
+        i += n
+
+
+def main():
+    ap = argparse.ArgumentParser(description='FrameParser fuzz/throughput test')
+    ap.add_argument('--frames', type=int, default=20000)
+    ap.add_argument('--max-chunk', type=int, default=64, help='Largest random read size')
+    ap.add_argument('--garbage', type=float, default=0.0, help='Probability of junk after a frame')
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    expected, stream = make_stream(rng, args.frames, args.garbage)
+    pieces = list(chunks(rng, stream, args.max_chunk))
+
+    parser = FrameParser(rssi=True)
+    got = []
+    t0 = time.perf_counter()
+    for piece in pieces:
+        got.extend(parser.feed(piece))
+    dt = time.perf_counter() - t0
+
+    false, missing = align(expected, got)
+    if args.garbage:
+        ok = false <= 1 + parser.bad_checksum // 64 and missing <= false * MAX_SWALLOWED
+    else:
+        ok = false == missing == 0
+    print(f"frames={len(expected)} recovered={len(got)} reads={len(pieces)} "
+          f"dropped_bytes={parser.dropped_bytes} bad_checksum={parser.bad_checksum} "
+          f"false_frames={false} missing={missing} -> {'OK' if ok else 'MISMATCH'}")
+    print(f"throughput: {len(stream) / dt / 1e6:.2f} MB/s, {len(got) / dt:,.0f} frames/s")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Per-frame cost of the receiver metrics and a /metrics scrape.
+
+Times the calls rx_basic.py makes for every frame (two labelled counter
+increments, RSSI, read-size and latency histograms, records counter)
+against an empty loop, then renders and scrapes a registry holding
+--sources source addresses over HTTP.
+
+Example:
+    python scripts/bench_metrics.py --frames 200000 --sources 50
+"""
+import argparse, os, random, sys, time, urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import metrics
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Receiver metrics overhead')
+    ap.add_argument('--frames', type=int, default=200000)
+    ap.add_argument('--sources', type=int, default=50)
+    ap.add_argument('--port', type=int, default=0, help='HTTP port for the scrape (0 = any free port)')
+    args = ap.parse_args()
+
+    reg = metrics.Registry()
+    frames = reg.counter('lora_rx_frames_total', 'frames', label='src')
+    nbytes = reg.counter('lora_rx_bytes_total', 'bytes', label='src')
+    records = reg.counter('lora_rx_records_total', 'records')
+    rssi = reg.histogram('lora_rx_rssi_dbm', 'rssi', range(-130, -20, 10))
+    reads = reg.histogram('lora_rx_serial_read_bytes', 'reads', [1 << i for i in range(11)])
+    lat = reg.histogram('lora_rx_sink_latency_seconds', 'latency',
+                        [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0])
+    rng = random.Random(1)
+    data = [(rng.randrange(args.sources), rng.randrange(20, 240), rng.randrange(-120, -40),
+             rng.random() * 0.05) for _ in range(args.frames)]
+
+    t0 = time.perf_counter()
+    for src, n, r, dt in data:
+        pass
+    empty = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for src, n, r, dt in data:
+        frames.inc(1, src)
+        nbytes.inc(n, src)
+        rssi.observe(r)
+        reads.observe(n)
+        records.inc()
+        lat.observe(dt)
+    hot = time.perf_counter() - t0
+    per = (hot - empty) / args.frames * 1e6
+    print(f"hot path: {per:.2f} us/frame over {args.frames} frames ({args.sources} sources)")
+
+    t0 = time.perf_counter()
+    text = reg.render()
+    print(f"render: {len(text)} bytes, {(time.perf_counter() - t0) * 1000:.2f} ms")
+    server = reg.serve(args.port)
+    port = server.server_address[1]
+    t0 = time.perf_counter()
+    body = urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics').read().decode()
+    print(f"scrape: {(time.perf_counter() - t0) * 1000:.2f} ms, "
+          f"{'OK' if f'lora_rx_records_total {args.frames}' in body else 'FAIL'}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
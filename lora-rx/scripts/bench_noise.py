@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Frames lost to noise-floor queries: old blocking query vs NoiseSampler.
+
+A TX sx126x sends --frames numbered frames at --period (air seconds) over a
+sim_radio.SimChannel while the RX side measures the noise floor two ways:
+
+  blocking: what sx126x.receive() used to do after every packet: flush the
+            UART input, write the query and sleep 0.5 s (scaled) for the reply
+  sampler:  noise_floor.NoiseSampler every --interval air seconds, with the
+            reply taken out of the stream by the FrameParser
+
+and reports frames received, noise samples and the time the receive loop
+spent blocked. The check fails if the sampler loses any frame or gets no
+noise sample.
+
+Example:
+    python scripts/bench_noise.py --frames 60 --time-scale 20
+"""
+import argparse, os, selectors, sys, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def run(mode, args):
+    from sim_radio import SimChannel
+    from sx126x import sx126x
+    from framing import FrameParser, NOISE_CMD
+    from noise_floor import NoiseSampler
+    import framing
+
+    scale = args.time_scale
+    ch = SimChannel(scale, seed=1)
+    tx_port, rx_port = ch.attach('tx'), ch.attach('rx')
+    rx = sx126x(rx_port, 868, 102, 22, True, air_speed=args.airspeed)
+    tx = sx126x(tx_port, 868, 101, 22, False, air_speed=args.airspeed)
+    rx.ser.timeout = 0
+    got, noise, blocked = set(), [], 0.0
+
+    parser = FrameParser(rssi=True)
+    sampler = None
+    if mode == 'sampler':
+        sampler = NoiseSampler(rx, parser, interval=args.interval / scale, timeout=1.0 / scale,
+                               on_sample=lambda t, dbm: noise.append(dbm))
+
+    def sender():
+        t0 = time.monotonic()
+        for seq in range(args.frames):
+            tx.send(bytes([0, 102, tx.offset_freq]) + framing.encode(101, tx.offset_freq, b'seq=%d' % seq))
+            time.sleep(max(0.0, t0 + (seq + 1) * args.period / scale - time.monotonic()))
+
+    th = threading.Thread(target=sender, daemon=True)
+    th.start()
+    sel = selectors.DefaultSelector()
+    sel.register(rx.ser.fileno(), selectors.EVENT_READ)
+    end = time.monotonic() + (args.frames * args.period + 5) / scale + 1
+    while time.monotonic() < end and len(got) < args.frames:
+        sel.select(0.05)
+        for fr in parser.feed(rx.ser.read(rx.ser.in_waiting or 1)):
+            got.add(fr.payload)
+            if mode == 'blocking':
+                t = time.monotonic()
+                rx.ser.reset_input_buffer()
+                rx.ser.write(NOISE_CMD)
+                time.sleep(0.5 / scale)
+                r = rx.ser.read(rx.ser.in_waiting)
+                if r[:3] == b'\xc1\x00\x02':
+                    noise.append(-(256 - r[3]))
+                blocked += time.monotonic() - t
+        if sampler:
+            sampler.poll()
+    th.join()
+    sel.close()
+    rx.ser.close()
+    tx.ser.close()
+    ch.close()
+    print(f"  {mode:8s}: {len(got)}/{args.frames} frames, {len(noise)} noise samples "
+          f"({sorted(set(noise))} dBm), loop blocked {blocked:.1f} s, "
+          f"parser resync {parser.dropped_bytes} B")
+    return len(got), len(noise)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Noise-floor sampling vs frame loss')
+    ap.add_argument('--frames', type=int, default=60)
+    ap.add_argument('--period', type=float, default=1.0, help='air seconds between frames')
+    ap.add_argument('--interval', type=float, default=5.0, help='air seconds between sampler queries')
+    ap.add_argument('--airspeed', type=int, default=9600)
+    ap.add_argument('--time-scale', type=float, default=20.0)
+    args = ap.parse_args()
+    # before sx126x/airtime are imported
+    os.environ['LORA_GPIO'] = 'sim'
+    os.environ['LORA_TIME_SCALE'] = str(args.time_scale)
+    print(f"{args.frames} frames every {args.period} s of air, x{args.time_scale:g}")
+    run('blocking', args)
+    n, samples = run('sampler', args)
+    if n < args.frames or not samples:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Offline replay throughput of the receive pipeline.
+
+Builds a capture of --frames frames (binary telemetry and JSON from
+--sources stations, as tx_sensors.py / tx_random.py send them, with the
+RSSI byte) cut into UART-sized reads, timing how long CaptureWriter.record()
+takes in the receive loop. Then replays it through rx_basic.py --replay
+--replay-speed 0 --quiet with no output, with the CSV, and with CSV and
+SQLite, checks that every frame was logged and reports records/s for each.
+
+Example:
+    python scripts/bench_replay.py --frames 100000
+"""
+import argparse, json, os, random, re, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RX_DIR = os.path.join(HERE, '..')
+sys.path.insert(0, os.path.join(RX_DIR, 'src'))
+import capture, framing, telemetry_codec
+
+
+def build(path, frames, sources, binary_pct=50):
+    rng = random.Random(1)
+    info = {'id': 'bench', 'start_freq': 850, 'offset_freq': 18, 'addr': 102, 'rssi': True}
+    cap = capture.CaptureWriter(path, [info])
+    stream = bytearray()
+    for i in range(frames):
+        src = 100 + i % sources
+        if i % 100 < binary_pct:
+            rain = {'intensity_mm_h': 1.0, 'bucket_mm': 0.2, 'bucket_tips_total': i}
+            payload = telemetry_codec.encode(i, 1.7e9 + i, f"st{src}", rain=rain)
+        else:
+            payload = json.dumps({'ts': 1700000000 + i, 'seq': i, 'val': round(rng.random() * 100, 3)},
+                                 separators=(',', ':')).encode()
+        stream += framing.encode(src, 18, payload) + bytes([256 - rng.randrange(40, 120)])
+    lat, pos = [], 0
+    while pos < len(stream):
+        n = rng.choice((8, 32, 64, 128, 256))
+        t = time.perf_counter_ns()
+        cap.record(0, bytes(stream[pos:pos + n]))
+        lat.append(time.perf_counter_ns() - t)
+        pos += n
+    cap.close()
+    lat.sort()
+    print(f"capture: {frames} frames in {cap.records} reads, {cap.bytes_written / 1e6:.1f} MB; record() "
+          f"p50={lat[len(lat) // 2] / 1000:.2f} p99={lat[int(len(lat) * 0.99)] / 1000:.2f} µs")
+
+
+def replay(path, extra):
+    cmd = [sys.executable, 'src/rx_basic.py', '--replay', path, '--replay-speed', '0', '--quiet', '1',
+           '--dedup-s', '0', '--csv', '', '--db', ''] + extra
+    out = subprocess.run(cmd, cwd=RX_DIR, capture_output=True, text=True, check=True).stdout
+    m = re.search(r'(\d+) registros en ([\d.]+) s', out)
+    records, secs = int(m.group(1)), float(m.group(2))
+    return records, secs
+
+
+def main():
+    ap = argparse.ArgumentParser(description='rx_basic.py replay throughput')
+    ap.add_argument('--frames', type=int, default=100000)
+    ap.add_argument('--sources', type=int, default=50)
+    args = ap.parse_args()
+    ok = True
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'bench.cap')
+        build(path, args.frames, args.sources)
+        for name, extra in (('no output', []),
+                            ('CSV', ['--csv', os.path.join(d, 'rx.csv')]),
+                            ('CSV + SQLite', ['--csv', os.path.join(d, 'rx2.csv'), '--db', os.path.join(d, 'rx.db')])):
+            records, secs = replay(path, extra)
+            ok &= records == args.frames
+            print(f"  {name:13s}: {records} records in {secs:.2f} s = {records / secs:8.0f} records/s "
+                  f"{'OK' if records == args.frames else 'MISSING'}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
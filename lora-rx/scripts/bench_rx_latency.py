@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Receive latency benchmark: legacy polling loop vs SerialReceiver.
+
+A pseudo-terminal stands in for the HAT: a writer thread pushes frames into
+the master side at UART pace and each receiver reads the slave side through
+pyserial. Latency is measured from the first byte written to the moment the
+receiver hands the frame over (so it includes the UART transfer time);
+CPU is the receiver thread's CPU time.
+
+Example:
+    python scripts/bench_rx_latency.py --frames 20 --period 0.8 --size 60
+"""
+import argparse, os, sys, threading, time, statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import serial
+from rx_engine import SerialReceiver
+
+
+def legacy_loop(ser, stop, on_frame):
+    """Receive loop as it was in rx_basic.py before the event-driven engine."""
+    while not stop.is_set():
+        if ser.inWaiting() > 0:
+            time.sleep(0.5)
+            r = ser.read(ser.inWaiting())
+            on_frame(r)
+        time.sleep(0.05)
+
+
+def engine_loop(ser, stop, on_frame, idle_ms):
+    rx = SerialReceiver(ser, idle_timeout=idle_ms / 1000.0)
+    while not stop.is_set():
+        r = rx.read_burst(timeout=0.1)
+        if r:
+            on_frame(r)
+    rx.close()
+
+
+def pace_write(fd, data: bytes, baud: int):
+    """Write data to the pty at roughly the UART byte rate (10 bits/byte)."""
+    step = 16
+    for i in range(0, len(data), step):
+        os.write(fd, data[i:i + step])
+        time.sleep(len(data[i:i + step]) * 10.0 / baud)
+
+
+def run(name, loop, args):
+    master, slave = os.openpty()
+    ser = serial.Serial(os.ttyname(slave), 9600, timeout=0)
+    stop = threading.Event()
+    sent_at, got = [], []
+    cpu = {}
+
+    def on_frame(r):
+        got.append((time.monotonic(), len(r)))
+
+    def target():
+        t0 = time.thread_time()
+        loop(ser, stop, on_frame)
+        cpu['s'] = time.thread_time() - t0
+
+    th = threading.Thread(target=target, daemon=True)
+    wall0 = time.monotonic()
+    th.start()
+    frame = bytes(range(256)) * (args.size // 256 + 1)
+    for _ in range(args.frames):
+        time.sleep(args.period)
+        sent_at.append(time.monotonic())
+        pace_write(master, frame[:args.size], args.baud)
+    time.sleep(1.0)
+    stop.set(); th.join()
+    wall = time.monotonic() - wall0
+    ser.close(); os.close(master); os.close(slave)
+
+    # Pair every received burst with the last frame written before it
+    lat = []
+    for t_rx, _ in got:
+        prev = [t for t in sent_at if t <= t_rx]
+        if prev:
+            lat.append((t_rx - prev[-1]) * 1000.0)
+    lat.sort()
+    print(f"{name:>8}: frames sent={len(sent_at)} bursts={len(got)} "
+          f"latency ms p50={statistics.median(lat):.1f} "
+          f"mean={statistics.fmean(lat):.1f} max={lat[-1]:.1f} "
+          f"| cpu={cpu['s'] * 1000.0 / wall:.2f} ms/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description='RX latency benchmark over a pty')
+    ap.add_argument('--frames', type=int, default=15)
+    ap.add_argument('--period', type=float, default=0.8, help='Seconds between frames')
+    ap.add_argument('--size', type=int, default=60, help='Bytes per frame')
+    ap.add_argument('--baud', type=int, default=9600)
+    ap.add_argument('--idle-ms', type=float, default=30.0)
+    args = ap.parse_args()
+
+    run('legacy', legacy_loop, args)
+    run('select', lambda s, st, cb: engine_loop(s, st, cb, args.idle_ms), args)
+
+
+if __name__ == '__main__':
+    main()
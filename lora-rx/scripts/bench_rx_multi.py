@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Throughput of the multi-radio gateway (rx_multi.Gateway) over ptys.
+
+Each fake radio is a pseudo-terminal: a writer thread pushes framed
+binary telemetry batches (the heaviest payload to decode) into the master
+side as fast as it can, and the gateway reads every slave side through
+real sx126x objects (skip_config, with an in-script fake RPi.GPIO). The
+run ends when every frame has been recorded; the check fails if a record
+is missing, duplicated or attributed to the wrong radio.
+
+Example:
+    python scripts/bench_rx_multi.py --radios 3 --frames 2000 --workers 0,2
+"""
+import argparse, os, random, sys, threading, time, types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class FakeGPIO(types.ModuleType):
+    """Minimal RPi.GPIO stand-in."""
+    BCM, OUT, IN, LOW, HIGH = 11, 0, 1, 0, 1
+
+    def __init__(self):
+        super().__init__('RPi.GPIO')
+
+    def setmode(self, mode): pass
+    def setwarnings(self, flag): pass
+    def setup(self, pin, direction): pass
+    def output(self, pin, level): pass
+    def input(self, pin): return self.HIGH
+
+
+GPIO = FakeGPIO()
+sys.modules['RPi'] = types.ModuleType('RPi')
+sys.modules['RPi'].GPIO = GPIO
+sys.modules['RPi.GPIO'] = GPIO
+
+import framing, telemetry_codec
+from sx126x import sx126x
+from rx_multi import Gateway, Radio
+
+
+def make_frames(src, n, rng):
+    """Framed batch telemetry as the module puts it on the UART (+ RSSI byte)."""
+    cap = telemetry_codec.batch_capacity(240 - framing.HEADER_LEN - 1 - 20)
+    out = []
+    for seq in range(n):
+        samples = [(rng.gauss(0, 0.01), rng.gauss(0, 0.01), 1 + rng.gauss(0, 0.01)) for _ in range(cap)]
+        payload = telemetry_codec.encode(seq, 1.7e9 + seq, 'tx01', batch=(10, samples))
+        out.append(framing.encode(src, 18, payload) + bytes([200]))
+    return out
+
+
+def writer(fd, frames):
+    for f in frames:
+        os.write(fd, f)
+
+
+def run(nradios, frames, workers):
+    ptys = [os.openpty() for _ in range(nradios)]
+    radios = []
+    for i, (master, slave) in enumerate(ptys):
+        dev = sx126x(os.ttyname(slave), 868, 0, 22, True, skip_config=True)
+        dev.ser.timeout = 0
+        radios.append(Radio(f"hat{i}", dev, arq_ack=False))
+    got = {r.id: [] for r in radios}
+
+    def on_record(ts, rid, fr, text):
+        got[rid].append((fr.src_addr, text))
+
+    gw = Gateway(radios, on_record, workers=workers)
+    streams = [make_frames(100 + i, frames, random.Random(i)) for i in range(nradios)]
+    threads = [threading.Thread(target=writer, args=(m, s), daemon=True) for (m, _), s in zip(ptys, streams)]
+    total = nradios * frames
+    t0, c0 = time.perf_counter(), time.thread_time()
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 120
+    while sum(len(v) for v in got.values()) < total and time.monotonic() < deadline:
+        gw.poll(0.5)
+    dt, cpu = time.perf_counter() - t0, time.thread_time() - c0
+    gw.close()
+    ok = all(len(v) == frames and all(src == 100 + i for src, _ in v) for i, v in enumerate(got.values()))
+    ok = ok and all(text.startswith('{') for v in got.values() for _, text in v)
+    n = sum(len(v) for v in got.values())
+    print(f"  workers={workers}: {n}/{total} records in {dt:.2f} s = {n / dt:7.0f} frames/s, "
+          f"loop CPU {cpu / dt:5.1%} {'OK' if ok else 'FAIL'}")
+    for r, (master, slave) in zip(radios, ptys):
+        r.dev.ser.close()
+        os.close(master)
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Multi-radio gateway throughput over ptys')
+    ap.add_argument('--radios', type=int, default=3)
+    ap.add_argument('--frames', type=int, default=2000, help='frames per radio')
+    ap.add_argument('--workers', default='0,2', help='comma-separated decoding pool sizes')
+    args = ap.parse_args()
+    print(f"{args.radios} radios x {args.frames} batch frames, {os.cpu_count()} CPUs")
+    ok = True
+    for w in (int(x) for x in args.workers.split(',')):
+        ok &= run(args.radios, args.frames, w)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""SQLite sink insert rate and query latency on a large database.
+
+1. Insert: pushes --insert records (JSON telemetry as rx_basic.py logs it)
+   through sqlite_sink.SqliteSink and reports the write() cost seen by the
+   receive loop, the sustained commit rate and the number of transactions.
+2. Query: fills the database to --rows rows spread over --days days from
+   --stations stations (bulk executemany, same schema and indexes), then
+   times the query CLI's typical filters, cold (first run) and warm (median
+   of --repeat), and shows the index each one uses.
+3. Prune: deletes the oldest --prune-days days with the retention job.
+
+Reuses --db if it already holds --rows rows, so the query part can be
+rerun without refilling it.
+
+Example:
+    python scripts/bench_sqlite.py --rows 10000000 --db /tmp/bench.db
+"""
+import argparse, json, os, random, statistics, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import sqlite_sink
+from sqlite_sink import SqliteSink
+
+
+def record(rng, station, seq, ts):
+    return json.dumps({'ts': int(ts), 'seq': seq, 'station': station,
+                       'temp_c': round(rng.uniform(-5, 35), 1), 'hum_pct': rng.randrange(20, 100),
+                       'press_hpa': round(rng.uniform(980, 1030), 1)}, separators=(',', ':'))
+
+
+def bench_insert(path, n, args):
+    rng = random.Random(1)
+    sink = SqliteSink(path, flush_rows=args.flush_rows, flush_ms=args.flush_ms)
+    rows = [(time.time(), None, 100 + i % args.stations, 868.125, -60 - i % 40,
+             record(rng, f"st{i % args.stations:03d}", i // args.stations, time.time())) for i in range(n)]
+    lat = []
+    t0 = time.perf_counter()
+    for row in rows:
+        t = time.perf_counter_ns()
+        sink.write(row)
+        lat.append(time.perf_counter_ns() - t)
+    t_write = time.perf_counter() - t0
+    sink.close()
+    wall = time.perf_counter() - t0
+    lat.sort()
+    print(f"insert: {n} rows in {wall:.2f} s = {n / wall:,.0f} rows/s committed "
+          f"({sink.flushes} transactions, flush_rows={args.flush_rows}); "
+          f"write() p50={lat[n // 2] / 1000:.1f} p99={lat[int(n * 0.99)] / 1000:.1f} "
+          f"max={lat[-1] / 1000:.0f} µs, loop done in {t_write:.2f} s")
+    return sink.rows_written == n
+
+
+def fill(path, rows, args):
+    db = sqlite_sink.connect(path)
+    have = db.execute("SELECT count(*) FROM frames").fetchone()[0]
+    if have >= rows:
+        print(f"fill: reusing {have:,} rows in {path}")
+        return db
+    rng = random.Random(2)
+    t_end = time.time()
+    step = args.days * 86400 / rows
+    seq = [0] * args.stations
+    batch = 100000
+    t0 = time.perf_counter()
+    for start in range(have, rows, batch):
+        chunk = []
+        for i in range(start, min(rows, start + batch)):
+            s = i % args.stations
+            ts = t_end - (rows - i) * step
+            text = record(rng, f"st{s:03d}", seq[s], ts)
+            chunk.append((ts, None, 100 + s, 868.125, -60 - i % 40, f"st{s:03d}", seq[s], text))
+            seq[s] += 1
+        db.execute("BEGIN")
+        db.executemany(sqlite_sink.INSERT, chunk)
+        db.execute("COMMIT")
+        if (start // batch) % 10 == 0:
+            print(f"  {start + len(chunk):>11,} rows, {time.perf_counter() - t0:6.0f} s", flush=True)
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.execute("ANALYZE")
+    print(f"fill: {rows - have:,} rows in {time.perf_counter() - t0:.0f} s, "
+          f"{os.path.getsize(path) / 2**30:.2f} GiB")
+    return db
+
+
+def bench_queries(path, args):
+    db = sqlite_sink.connect(path, readonly=True)
+    now = time.time()
+    mid = args.rows // args.stations // 2
+    cases = [
+        ('station, last 24 h', dict(station='st007', since=now - 86400)),
+        ('station + seq', dict(station='st007', seq=mid)),
+        ('src, last 100', dict(src=107, last=100)),
+        ('all, last 1 h', dict(since=now - 3600)),
+        ('src, one day a month ago', dict(src=120, since=now - 31 * 86400, until=now - 30 * 86400)),
+    ]
+    print(f"query ({args.rows:,} rows, {args.stations} stations over {args.days} days):")
+    for name, f in cases:
+        sql, a = sqlite_sink.build_query(**f)
+        plan = '; '.join(r[-1] for r in db.execute("EXPLAIN QUERY PLAN " + sql, a))
+        times = []
+        for _ in range(args.repeat + 1):
+            t = time.perf_counter()
+            n = len(db.execute(sql, a).fetchall())
+            times.append(time.perf_counter() - t)
+        print(f"  {name:26s} {n:6d} rows  cold {times[0] * 1000:7.2f} ms  "
+              f"warm {statistics.median(times[1:]) * 1000:7.2f} ms  [{plan}]")
+    db.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='SQLite sink insert rate and query latency')
+    ap.add_argument('--insert', type=int, default=200000, help='rows pushed through SqliteSink')
+    ap.add_argument('--rows', type=int, default=1000000, help='database size for the query part')
+    ap.add_argument('--stations', type=int, default=50)
+    ap.add_argument('--days', type=float, default=365)
+    ap.add_argument('--flush-rows', type=int, default=200)
+    ap.add_argument('--flush-ms', type=float, default=1000)
+    ap.add_argument('--repeat', type=int, default=20)
+    ap.add_argument('--prune-days', type=float, default=7, help='oldest days deleted by the prune step (0 = skip)')
+    ap.add_argument('--db', help='database for the query part (default: temporary, deleted)')
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as d:
+        ok = bench_insert(os.path.join(d, 'insert.db'), args.insert, args)
+        path = args.db or os.path.join(d, 'query.db')
+        db = fill(path, args.rows, args)
+        bench_queries(path, args)
+        if args.prune_days:
+            oldest = db.execute("SELECT min(ts) FROM frames").fetchone()[0]
+            t = time.perf_counter()
+            n = sqlite_sink.prune(db, oldest + args.prune_days * 86400)
+            print(f"prune: {n:,} rows ({args.prune_days:g} days) in {time.perf_counter() - t:.2f} s")
+        db.close()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Per-frame cost of the tracing hooks, disabled and enabled.
+
+Feeds framed payloads through a FrameParser with the hooks rx_basic.py
+places around every frame (parse, frame, decode, print, sink.write) and
+times the loop with no hooks, with tracing disabled (TRACER is None) and
+with a ring buffer of --size spans. Then dumps the buffer as a Chrome
+trace and as collapsed stacks and checks both files.
+
+Example:
+    python scripts/bench_tracing.py --frames 100000
+"""
+import argparse, json, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import framing, tracing
+from framing import FrameParser
+
+
+def plain(chunks):
+    parser, n = FrameParser(), 0
+    for c in chunks:
+        for fr in parser.feed(c):
+            fr.payload.decode()
+            n += 1
+    return n
+
+
+def hooked(chunks):
+    parser, n = FrameParser(), 0
+    perf = time.perf_counter_ns
+    for c in chunks:
+        tr = tracing.TRACER
+        if tr: t0 = perf()
+        frames = parser.feed(c)
+        if tr: tr.add('parse', t0)
+        for fr in frames:
+            tr = tracing.TRACER
+            if tr: t_fr = t0 = perf()
+            fr.payload.decode()
+            if tr:
+                t1 = perf()
+                tr.add('decode', t0, t1)
+                t0 = perf()
+                tr.add('print', t1, t0)
+                tr.add('sink.write', t0)
+                tr.add('frame', t_fr)
+            n += 1
+    return n
+
+
+def timed(fn, chunks):
+    t0 = time.perf_counter()
+    n = fn(chunks)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Tracing hook overhead')
+    ap.add_argument('--frames', type=int, default=100000)
+    ap.add_argument('--size', type=int, default=65536, help='ring buffer spans')
+    args = ap.parse_args()
+
+    chunks = [framing.encode(100 + i % 8, 18, b'{"seq":%d,"t":"x"}' % i) for i in range(args.frames)]
+    base = min(timed(plain, chunks) for _ in range(3))
+    tracing.disable()
+    off = min(timed(hooked, chunks) for _ in range(3))
+    tr = tracing.enable(args.size)
+    on = timed(hooked, chunks)
+    print(f"{args.frames} frames: no hooks {base:.2f} µs/frame, "
+          f"disabled {off:.2f} (+{off - base:.2f}), enabled {on:.2f} (+{on - base:.2f})")
+
+    ok = tr.n == args.frames * 5 and len(tr.spans()) == min(tr.n, args.size)
+    with tempfile.TemporaryDirectory() as d:
+        trace = json.load(open(tr.dump(os.path.join(d, 'trace.json'))))
+        events = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        ok &= len(events) == min(tr.n, args.size)
+        stacks = dict(line.rsplit(' ', 1) for line in open(tr.dump(os.path.join(d, 'trace.folded'))))
+        ok &= {'parse', 'frame;decode', 'frame;print', 'frame;sink.write'} <= set(stacks)
+    print(f"dump: {len(events)} events, {len(stacks)} stacks {'OK' if ok else 'FAIL'}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
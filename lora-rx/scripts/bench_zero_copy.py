@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Allocations and frames/s of the receive path, copying vs zero-copy.
+
+Builds a capture like bench_replay.py, loads its reads into memory and
+replays them in-process through the stages of rx_basic.py's stream loop,
+up to the row handed to the sinks:
+
+  copy       each read as a new bytes object (what ser.read() returns),
+             parser.feed(), bytes payloads, payload.decode() and strftime()
+             for every frame (the old path)
+  zero-copy  each read copied into the parser's reserve()d buffer (what
+             readinto() on the fd does), memoryview payloads, str(view) and
+             the timestamp formatted once a second
+  no sink    zero-copy with nothing consuming the text (--quiet, no
+             CSV/DB/fan-out): no decode and no timestamp at all
+
+Each path runs once untraced for frames/s, then under tracemalloc, where
+the peak traced memory above the baseline is taken for every read
+(reset_peak) and averaged per frame. Python has no allocation counter, so
+this is the heap a read transiently needs, not the number of malloc calls.
+All paths must produce the same rows. --binary-pct sets the share of
+binary telemetry frames, whose JSON conversion costs the same either way.
+
+Example:
+    python scripts/bench_zero_copy.py --frames 100000
+"""
+import argparse, json, os, sys, tempfile, time, tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+import arq, capture, framing, telemetry_codec
+from bench_replay import build
+from fragment import is_fragment
+
+
+def utf8(payload):
+    return str(payload, 'utf-8')
+
+
+def text_of(payload, decode):
+    if telemetry_codec.is_binary(payload):
+        return json.dumps(telemetry_codec.decode(payload), separators=(',', ':'))
+    return decode(payload)
+
+
+def load(path):
+    """[(wall time, data)] of every read in the capture."""
+    reads = []
+    for rec in capture.read_capture(path):
+        if rec[0] == 'S':
+            wall = rec[1]
+        elif rec[0] == 'D':
+            reads.append(((wall + rec[1]) / 1e9, rec[3]))
+    return reads
+
+
+def run(reads, mode, traced, check=None):
+    """Parse `reads` through `mode`; return (frames, seconds, transient bytes/frame)."""
+    views = mode != 'copy'
+    parser = framing.FrameParser(rssi=True, views=views)
+    frames = heap = 0
+    ts_sec, ts = None, ''
+    t0 = time.perf_counter()
+    for t_rec, data in reads:
+        if traced:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        if views:
+            view = parser.reserve(len(data))
+            view[:len(data)] = data
+            got = parser.commit(len(data))
+        else:
+            got = parser.feed(bytes(memoryview(data)))   # a new object, as ser.read()
+        for fr in got:
+            payload = fr.payload
+            if arq.is_data(payload) or arq.is_ack(payload) or is_fragment(payload):
+                continue
+            frames += 1
+            if mode == 'no sink':
+                continue
+            if mode == 'copy':
+                text = text_of(payload, bytes.decode)
+                ts = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(t_rec))
+            else:
+                text = text_of(payload, utf8)
+                if int(t_rec) != ts_sec:
+                    ts_sec = int(t_rec)
+                    ts = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts_sec))
+            row = [ts, fr.src_addr, fr.chan, text]
+            if check is not None:
+                check.append(hash(tuple(row)))
+        if traced:
+            heap += tracemalloc.get_traced_memory()[1] - base
+    return frames, time.perf_counter() - t0, heap / max(1, frames)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Receive path allocations: copy vs zero-copy')
+    ap.add_argument('--frames', type=int, default=100000)
+    ap.add_argument('--sources', type=int, default=50)
+    ap.add_argument('--binary-pct', type=int, default=50, help='binary telemetry frames, %%')
+    args = ap.parse_args()
+    ok = True
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'bench.cap')
+        build(path, args.frames, args.sources, args.binary_pct)
+        reads = load(path)
+        rows = {}
+        for mode in ('copy', 'zero-copy'):
+            rows[mode] = []
+            run(reads, mode, False, rows[mode])
+        same = rows['copy'] == rows['zero-copy'] and len(rows['copy']) == args.frames
+        ok &= same
+        print(f"  rows: {len(rows['copy'])} {'identical' if same else 'DIFFER'}")
+        base = None
+        for mode in ('copy', 'zero-copy', 'no sink'):
+            frames, secs, _ = run(reads, mode, False)
+            tracemalloc.start()
+            _, _, heap = run(reads, mode, True)
+            tracemalloc.stop()
+            ok &= frames == args.frames
+            rate = frames / secs
+            base = base or rate
+            print(f"  {mode:9s}: {rate:8.0f} frames/s (x{rate / base:.2f}), "
+                  f"{heap:6.0f} B transient heap per frame")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
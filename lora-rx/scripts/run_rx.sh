@@ -28,10 +28,74 @@ POWER="${POWER:-22}"
 AIRSPEED="${AIRSPEED:-2400}"
 RX_CSV="${RX_CSV:-}"
 RX_DEBUG="${RX_DEBUG:-0}"
+RX_QUIET="${RX_QUIET:-0}"
+RX_CAPTURE="${RX_CAPTURE:-}"
+RX_IDLE_MS="${RX_IDLE_MS:-30}"
+RX_FRAMING="${RX_FRAMING:-stream}"
+RX_CSV_FLUSH_ROWS="${RX_CSV_FLUSH_ROWS:-20}"
+RX_CSV_FLUSH_MS="${RX_CSV_FLUSH_MS:-1000}"
+RX_CSV_ROTATE_MB="${RX_CSV_ROTATE_MB:-0}"
+RX_CSV_ROTATE_S="${RX_CSV_ROTATE_S:-0}"
+RX_CSV_COMPRESS="${RX_CSV_COMPRESS:-gzip}"
+RX_DB="${RX_DB:-}"
+RX_DB_RETENTION_DAYS="${RX_DB_RETENTION_DAYS:-0}"
+RX_REASM_TIMEOUT_S="${RX_REASM_TIMEOUT_S:-30}"
+RX_REASM_MAX="${RX_REASM_MAX:-64}"
+RX_ARQ_ACK="${RX_ARQ_ACK:-1}"
+RX_RADIOS="${RX_RADIOS:-}"
+RX_WORKERS="${RX_WORKERS:-0}"
+RX_METRICS_PORT="${RX_METRICS_PORT:-0}"
+RX_METRICS_ADDR="${RX_METRICS_ADDR:-127.0.0.1}"
+RX_NOISE_S="${RX_NOISE_S:-0}"
+RX_DEDUP_S="${RX_DEDUP_S:-30}"
+RX_DEDUP_MAX="${RX_DEDUP_MAX:-4096}"
+RX_DEDUP_HASH="${RX_DEDUP_HASH:-0}"
+RX_FANOUT="${RX_FANOUT:-}"
+RX_FANOUT_QUEUE="${RX_FANOUT_QUEUE:-1000}"
+RX_FANOUT_POLICY="${RX_FANOUT_POLICY:-drop-oldest}"
+RX_NOISE_CSV="${RX_NOISE_CSV:-}"
+FAST_START="${FAST_START:-1}"
+CFG_CACHE="${CFG_CACHE:-}"
+
+if [[ -n "$RX_RADIOS" ]]; then
+  # Varios HAT en un solo proceso (un id por radio en cada registro)
+  echo "Ejecutando RECEPTOR multi-radio:"
+  echo "    RADIOS=$RX_RADIOS"
+  echo "    CSV=$RX_CSV  WORKERS=$RX_WORKERS"
+  exec python src/rx_multi.py \
+    --freq "$FREQ" \
+    --addr "$ADDR" \
+    --power "$POWER" \
+    --airspeed "$AIRSPEED" \
+    --csv "$RX_CSV" \
+    --csv-flush-rows "$RX_CSV_FLUSH_ROWS" \
+    --csv-flush-ms "$RX_CSV_FLUSH_MS" \
+    --csv-rotate-mb "$RX_CSV_ROTATE_MB" \
+    --csv-rotate-s "$RX_CSV_ROTATE_S" \
+    --csv-compress "$RX_CSV_COMPRESS" \
+    --db "$RX_DB" \
+    --db-retention-days "$RX_DB_RETENTION_DAYS" \
+    --reasm-timeout "$RX_REASM_TIMEOUT_S" \
+    --reasm-max "$RX_REASM_MAX" \
+    --arq-ack "$RX_ARQ_ACK" \
+    --workers "$RX_WORKERS" \
+    --quiet "$RX_QUIET" \
+    --capture "$RX_CAPTURE" \
+    --dedup-s "$RX_DEDUP_S" \
+    --dedup-max "$RX_DEDUP_MAX" \
+    --dedup-hash "$RX_DEDUP_HASH" \
+    --fanout "$RX_FANOUT" \
+    --fanout-queue "$RX_FANOUT_QUEUE" \
+    --fanout-policy "$RX_FANOUT_POLICY" \
+    --noise-s "$RX_NOISE_S" \
+    --noise-csv "$RX_NOISE_CSV" \
+    --fast-start "$FAST_START" \
+    --cfg-cache "$CFG_CACHE"
+fi
 
 echo "Ejecutando RECEPTOR:"
 echo "    SERIAL=$SERIAL  FREQ=${FREQ}MHz  ADDR=$ADDR"
-echo "    POWER=${POWER}dBm  AIRSPEED=$AIRSPEED  CSV=$RX_CSV  DEBUG=$RX_DEBUG"
+echo "    POWER=${POWER}dBm  AIRSPEED=$AIRSPEED  CSV=$RX_CSV  DEBUG=$RX_DEBUG  IDLE_MS=$RX_IDLE_MS  FRAMING=$RX_FRAMING"
 
 exec python src/rx_basic.py \
   --serial "$SERIAL" \
@@ -40,4 +104,30 @@ exec python src/rx_basic.py \
   --power "$POWER" \
   --airspeed "$AIRSPEED" \
   --csv "$RX_CSV" \
-  --debug "$RX_DEBUG"
+  --debug "$RX_DEBUG" \
+  --quiet "$RX_QUIET" \
+  --capture "$RX_CAPTURE" \
+  --idle-ms "$RX_IDLE_MS" \
+  --framing "$RX_FRAMING" \
+  --csv-flush-rows "$RX_CSV_FLUSH_ROWS" \
+  --csv-flush-ms "$RX_CSV_FLUSH_MS" \
+  --csv-rotate-mb "$RX_CSV_ROTATE_MB" \
+  --csv-rotate-s "$RX_CSV_ROTATE_S" \
+  --csv-compress "$RX_CSV_COMPRESS" \
+  --db "$RX_DB" \
+  --db-retention-days "$RX_DB_RETENTION_DAYS" \
+  --reasm-timeout "$RX_REASM_TIMEOUT_S" \
+  --reasm-max "$RX_REASM_MAX" \
+  --arq-ack "$RX_ARQ_ACK" \
+  --dedup-s "$RX_DEDUP_S" \
+  --dedup-max "$RX_DEDUP_MAX" \
+  --dedup-hash "$RX_DEDUP_HASH" \
+  --fanout "$RX_FANOUT" \
+  --fanout-queue "$RX_FANOUT_QUEUE" \
+  --fanout-policy "$RX_FANOUT_POLICY" \
+  --metrics-port "$RX_METRICS_PORT" \
+  --metrics-addr "$RX_METRICS_ADDR" \
+  --noise-s "$RX_NOISE_S" \
+  --noise-csv "$RX_NOISE_CSV" \
+  --fast-start "$FAST_START" \
+  --cfg-cache "$CFG_CACHE"
@@ -1,4 +1,15 @@
-import lgpio, atexit
+"""RPi.GPIO subset on top of lgpio (gpiochip0).
+
+LORA_GPIO=sim swaps lgpio for an in-memory pin table, so sx126x runs on
+any Linux box against a simulated module (see sim_radio.py): outputs are
+remembered, inputs read what set_input() stored (HIGH if never set, i.e.
+an idle AUX line).
+"""
+import os, atexit
+
+SIM = os.getenv('LORA_GPIO', 'lgpio') == 'sim'
+if not SIM:
+    import lgpio
 
 BCM, BOARD = 11, 10
 IN, OUT = 1, 0
@@ -6,6 +17,7 @@ LOW, HIGH = 0, 1
 
 _chip = None
 _claimed = set()
+_levels = {}    # pin -> level (sim backend)
 
 def _ensure():
     global _chip
@@ -20,6 +32,10 @@ def setwarnings(flag):  # compat
     pass
 
 def setup(pin, direction, initial=None):
+    if SIM:
+        _levels.setdefault(pin, (HIGH if initial else LOW) if direction == OUT else HIGH)
+        _claimed.add(pin)
+        return
     _ensure()
     if direction == OUT:
         lgpio.gpio_claim_output(_chip, pin, HIGH if initial else LOW if initial is not None else LOW)
@@ -28,15 +44,30 @@ def setup(pin, direction, initial=None):
     _claimed.add(pin)
 
 def output(pin, value):
+    if SIM:
+        _levels[pin] = HIGH if value else LOW
+        return
     _ensure()
     lgpio.gpio_write(_chip, pin, HIGH if value else LOW)
 
 def input(pin):
+    if SIM:
+        return _levels.get(pin, HIGH)
     _ensure()
     return lgpio.gpio_read(_chip, pin)
 
+def set_input(pin, value):
+    """Drive a simulated input pin (sim backend only)."""
+    _levels[pin] = HIGH if value else LOW
+
 def cleanup(pin=None):
     global _chip
+    if SIM:
+        if pin is None:
+            _claimed.clear()
+        else:
+            _claimed.discard(pin)
+        return
     if _chip is None: return
     if pin is None:
         for p in list(_claimed):
@@ -0,0 +1,70 @@
+"""LoRa time-on-air estimates for the SX126x HAT air speeds.
+
+The module hides the LoRa modem settings behind an "air speed" register.
+LORA_PARAMS maps each air speed of sx126x.lora_air_speed_dic to the
+spreading factor and bandwidth that produce it (coding rate 4/5, 8-symbol
+preamble, explicit header and CRC on), and lora_airtime() applies the
+Semtech SX126x time-on-air formula.
+
+LORA_TIME_SCALE > 1 (simulated channels only, see sim_radio.py) divides
+the estimates used for pacing, frame_airtime() and uart_time(), so the
+transmit path keeps up with a channel running faster than real time.
+"""
+import math, os
+
+# air speed (bps) -> (spreading factor, bandwidth Hz)
+LORA_PARAMS = {
+    1200: (11, 250000),
+    2400: (11, 500000),
+    4800: (10, 500000),
+    9600: (9, 500000),
+    19200: (8, 500000),
+    38400: (7, 500000),
+    62500: (5, 500000),
+}
+
+FIXED_PREFIX = 3        # dest_hi dest_lo chan, consumed by the module (not on air)
+UART_BAUD = 9600        # host <-> module UART (SX126X_UART_BAUDRATE_9600)
+TIME_SCALE = float(os.getenv('LORA_TIME_SCALE', '1') or 1)
+
+
+def lora_airtime(payload_len, sf, bw, cr=1, preamble=8, crc=True,
+                 explicit_header=True, ldro=None) -> float:
+    """Time on air in seconds of one LoRa packet (Semtech AN1200.13).
+
+    cr is the coding rate index (1 = 4/5 ... 4 = 4/8). Low data rate
+    optimisation is enabled automatically when the symbol time exceeds 16 ms.
+    """
+    t_sym = (1 << sf) / float(bw)
+    if ldro is None:
+        ldro = t_sym > 0.016
+    de = 1 if ldro else 0
+    ih = 0 if explicit_header else 1
+    num = 8 * payload_len - 4 * sf + 28 + (16 if crc else 0) - 20 * ih
+    n_payload = 8 + max(math.ceil(num / (4.0 * (sf - 2 * de))) * (cr + 4), 0)
+    return (preamble + 4.25) * t_sym + n_payload * t_sym
+
+
+def packet_airtime(payload_len, air_speed) -> float:
+    """Time on air of one module packet of payload_len bytes at air_speed."""
+    sf, bw = LORA_PARAMS[air_speed]
+    return lora_airtime(payload_len, sf, bw)
+
+
+def frame_airtime(frame_len, air_speed, packet_size=240) -> float:
+    """Time on air of a frame as passed to sx126x.send().
+
+    The destination prefix is not transmitted, and frames longer than the
+    module packet size go out as several packets.
+    """
+    n = max(frame_len - FIXED_PREFIX, 0)
+    full, rest = divmod(n, packet_size)
+    t = full * packet_airtime(packet_size, air_speed)
+    if rest or not full:
+        t += packet_airtime(rest, air_speed)
+    return t / TIME_SCALE
+
+
+def uart_time(n_bytes, baud=UART_BAUD) -> float:
+    """Seconds to move n_bytes over the UART (8N1, 10 bits per byte)."""
+    return n_bytes * 10.0 / baud / TIME_SCALE
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""Raw UART capture and replay.
+
+CaptureWriter records every serial read of the receiver, as delivered, to
+an append-only binary file; ReplayReceiver and ReplayRadio feed such a file
+back to rx_basic.py (--replay) in place of the UART and the module, so the
+same parser, decoding and sinks run on it at the original timing or as fast
+as possible.
+
+File layout (little endian), a magic then any number of sessions (one per
+receiver start):
+
+    b'LORACAP1'
+    'S' u64 wall_ns, u64 mono_ns, u16 n, n bytes of JSON
+        {"framing": "stream", "radios": [{"id", "start_freq", "offset_freq",
+         "addr", "rssi"}, ...]}
+    'D' u64 t_ns, u8 radio, u16 len, len bytes      (one per read)
+    'E' u64 t_ns, u8 radio, u8 event                (noise query sent/given up)
+
+t_ns is time.monotonic_ns() minus the session's mono_ns, radio an index
+into the session's radio list. Events keep the parser's noise-reply
+demultiplexing (framing.FrameParser.expect_noise) identical on replay.
+Records are queued by the receive loop and written by a background thread,
+as CsvSink does, so a slow SD card never delays a read.
+
+Run the module to summarise or dump a capture:
+
+    python src/capture.py rx.cap
+    python src/capture.py rx.cap --hex | head
+"""
+import argparse, json, os, struct, threading, time, types
+
+MAGIC = b'LORACAP1'
+_SESSION = struct.Struct('<QQH')
+_DATA = struct.Struct('<QBH')
+_EVENT = struct.Struct('<QBB')
+EV_NOISE_QUERY, EV_NOISE_CANCEL = 1, 2
+
+
+def radio_info(rid, dev) -> dict:
+    """Session header entry for a configured sx126x (what ReplayRadio needs)."""
+    return {'id': rid, 'start_freq': dev.start_freq, 'offset_freq': dev.offset_freq,
+            'addr': dev.addr, 'rssi': bool(dev.rssi)}
+
+
+class CaptureWriter:
+    """Append serial reads to a capture file from a background thread."""
+
+    def __init__(self, path, radios, framing='stream', flush_ms=1000):
+        """Args:
+            path: capture file, appended to (magic written if empty).
+            radios: list of radio_info() dicts; record() takes an index into it.
+            framing: rx_basic.py --framing, used by default on replay.
+            flush_ms: write queued reads at most this many ms after they arrive.
+        """
+        self.path = path
+        self.flush_s = flush_ms / 1000.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(path, 'ab')
+        if self._f.tell() == 0:
+            self._f.write(MAGIC)
+        self._mono = time.monotonic_ns()
+        meta = json.dumps({'framing': framing, 'radios': radios}, separators=(',', ':')).encode()
+        self._f.write(b'S' + _SESSION.pack(time.time_ns(), self._mono, len(meta)) + meta)
+        self._f.flush()
+        self._recs = []
+        self._closing = False
+        self._cond = threading.Condition()
+        self.records = 0
+        self.bytes_written = 0
+        self._thread = threading.Thread(target=self._run, name='capture', daemon=True)
+        self._thread.start()
+
+    @property
+    def at_risk(self) -> int:
+        """Reads queued but not yet written (lost on a crash)."""
+        with self._cond:
+            return len(self._recs)
+
+    def record(self, radio, data):
+        """Queue one read of radio index `radio`; never blocks on file I/O."""
+        t = time.monotonic_ns() - self._mono
+        with self._cond:
+            self._recs.append((t, radio, data))
+            if len(self._recs) == 1:
+                self._cond.notify()
+
+    def event(self, radio, ev):
+        """Queue an EV_* event of radio index `radio`."""
+        self.record(radio, ev)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._recs and not self._closing:
+                    self._cond.wait()
+                if not self._closing:
+                    self._cond.wait_for(lambda: self._closing, timeout=self.flush_s)
+                recs, self._recs = self._recs, []
+                closing = self._closing
+            if recs:
+                buf = bytearray()
+                for t, radio, data in recs:
+                    if isinstance(data, int):
+                        buf += b'E' + _EVENT.pack(t, radio, data)
+                    else:
+                        buf += b'D' + _DATA.pack(t, radio, len(data))
+                        buf += data
+                self._f.write(buf)
+                self._f.flush()
+                self.records += len(recs)
+                self.bytes_written += len(buf)
+            if closing:
+                return
+
+    def close(self):
+        """Write everything still queued and close the file."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        self._f.close()
+
+
+def read_capture(path):
+    """Yield ('S', wall_ns, mono_ns, meta), ('D', t_ns, radio, data) and ('E', t_ns, radio, event)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a capture file")
+        while True:
+            kind = f.read(1)
+            if kind == b'S':
+                hdr = f.read(_SESSION.size)
+                if len(hdr) < _SESSION.size:
+                    return
+                wall, mono, n = _SESSION.unpack(hdr)
+                yield 'S', wall, mono, json.loads(f.read(n))
+            elif kind == b'D':
+                hdr = f.read(_DATA.size)
+                if len(hdr) < _DATA.size:
+                    return
+                t, radio, n = _DATA.unpack(hdr)
+                data = f.read(n)
+                if len(data) < n:
+                    return    # cut short by a crash: keep what is complete
+                yield 'D', t, radio, data
+            elif kind == b'E':
+                hdr = f.read(_EVENT.size)
+                if len(hdr) < _EVENT.size:
+                    return
+                yield ('E',) + _EVENT.unpack(hdr)
+            elif not kind:
+                return
+            else:
+                raise ValueError(f"{path}: bad record type {kind!r} at offset {f.tell() - 1}")
+
+
+class ReplayRadio:
+    """Stand-in for sx126x when replaying: radio parameters from the capture."""
+
+    def __init__(self, info):
+        self.id = info['id']
+        self.start_freq = info['start_freq']
+        self.offset_freq = info['offset_freq']
+        self.addr = info['addr']
+        self.rssi = info['rssi']
+        self.ser = None
+        self.sent = 0
+        self.config = types.SimpleNamespace(ok=True, source='captura', attempts=0, elapsed_ms=0.0)
+
+    def send(self, data):
+        """ACKs go nowhere; counted only."""
+        self.sent += 1
+
+
+class ReplayReceiver:
+    """SerialReceiver interface over the reads of one radio in a capture.
+
+    Each captured read is returned as one read, so the parser sees the
+    same chunks as in the field. With speed > 0 reads are delivered at the
+    captured pace (speed 2 = twice as fast); with speed 0 as fast as
+    possible, silences still being reported (None) where the capture had a
+    gap longer than the caller's timeout. After the last read: one None,
+    then EOFError.
+    """
+
+    def __init__(self, path, radio=None, speed=1.0, idle_timeout=0.03, max_burst=1024):
+        """radio: id of the radio to replay (default: the first of each session)."""
+        self.path = path
+        self.speed = speed
+        self.idle_timeout = idle_timeout
+        self.max_burst = max_burst
+        self.t_first_byte = 0.0
+        self.reads = 0
+        self.bytes = 0
+        self.parser = None         # FrameParser that gets the captured noise-query events
+        self._want = radio
+        self._recs = self._records()
+        self._next = None          # (session wall_ns, t_ns, data) not delivered yet
+        self._now = None           # capture time (session wall_ns, t_ns) reached
+        self._t0 = None            # (t_ns, monotonic) pacing reference
+        self._silent = False       # the gap before _next was already reported
+        self._done = False
+
+    def _records(self):
+        idx = None
+        for rec in read_capture(self.path):
+            if rec[0] == 'S':
+                wall, meta = rec[1], rec[3]
+                ids = [r['id'] for r in meta['radios']]
+                idx = ids.index(self._want) if self._want in ids else (0 if self._want is None else None)
+                yield 'S', meta
+            elif rec[2] == idx and rec[0] == 'E':
+                yield 'E', rec[3]
+            elif rec[2] == idx:
+                yield wall, rec[1], rec[3]
+
+    def first_session(self) -> dict:
+        """Header of the first session (framing and radio list)."""
+        for rec in self._recs:
+            if rec[0] == 'S':
+                return rec[1]
+        raise ValueError(f"{self.path}: empty capture")
+
+    def _peek(self):
+        while self._next is None:
+            rec = next(self._recs, None)
+            if rec is None:
+                return None
+            if rec[0] == 'S':
+                self._t0 = None       # restart pacing: the clocks of two runs are unrelated
+                continue
+            if rec[0] == 'E':
+                if self.parser is not None:
+                    if rec[1] == EV_NOISE_QUERY:
+                        self.parser.expect_noise()
+                    elif rec[1] == EV_NOISE_CANCEL:
+                        self.parser.cancel_noise()
+                continue
+            self._next = rec
+        return self._next
+
+    def wall_time(self) -> float:
+        """Capture wall-clock time (unix seconds) of the last delivered read."""
+        if self._now is None:
+            return time.time()
+        return (self._now[0] + self._now[1]) / 1e9
+
+    def _gap(self, rec) -> float:
+        """Seconds between the last delivered read and `rec`, inf across sessions."""
+        if self._now is None or rec[0] != self._now[0]:
+            return float('inf')
+        return (rec[1] - self._now[1]) / 1e9
+
+    def wait(self, timeout=None) -> bool:
+        rec = self._peek()
+        if rec is None:
+            if self._done:
+                raise EOFError
+            self._done = True
+            return False
+        if self.speed > 0 and self._t0 is not None and rec[0] == self._now[0]:
+            due = self._t0[1] + (rec[1] - self._t0[0]) / 1e9 / self.speed
+            delay = due - time.monotonic()
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                return False
+            if delay > 0:
+                time.sleep(delay)
+            return True
+        if timeout is not None and self._now is not None and not self._silent and self._gap(rec) > timeout:
+            # as fast as possible (or a new session): report the silence once, then deliver
+            self._silent = True
+            return False
+        return True
+
+    def read_available(self) -> bytes:
+        rec = self._peek()
+        if rec is None:
+            return b''
+        self._next = None
+        self._silent = False
+        self._now = (rec[0], rec[1])
+        if self._t0 is None:
+            self._t0 = (rec[1], time.monotonic())
+        self.reads += 1
+        self.bytes += len(rec[2])
+        return rec[2]
+
+    def readinto(self, buf) -> int:
+        """read_available() into a writable buffer; what does not fit is the next read."""
+        data = self.read_available()
+        n = min(len(data), len(buf))
+        buf[:n] = data if n == len(data) else data[:n]
+        if n < len(data):
+            # the rest follows at the same capture time, counted as the same read
+            self._next = self._now + (data[n:],)
+            self.reads -= 1
+            self.bytes -= len(data) - n
+        return n
+
+    def read_chunk(self, timeout=None):
+        if not self.wait(timeout):
+            return None
+        self.t_first_byte = time.monotonic()
+        return self.read_available()
+
+    def read_chunk_into(self, buf, timeout=None):
+        if not self.wait(timeout):
+            return None
+        self.t_first_byte = time.monotonic()
+        return self.readinto(buf)
+
+    def read_burst(self, timeout=None):
+        if not self.wait(timeout):
+            return None
+        self.t_first_byte = time.monotonic()
+        buf = bytearray(self.read_available())
+        while len(buf) < self.max_burst:
+            rec = self._peek()
+            if rec is None or self._gap(rec) > self.idle_timeout:
+                break
+            self.wait(self.idle_timeout)
+            buf += self.read_available()
+        return bytes(buf)
+
+    def close(self):
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Resumir o volcar una captura del UART')
+    ap.add_argument('path', nargs='?', default=os.getenv('RX_CAPTURE',''))
+    ap.add_argument('--hex', action='store_true', help='Una línea por lectura: tiempo, radio, bytes en hex')
+    args = ap.parse_args()
+    if not args.path:
+        ap.error('no capture: pass its path or set RX_CAPTURE')
+    radios, reads, events, size, t_last = [], 0, 0, 0, 0
+    for rec in read_capture(args.path):
+        if rec[0] == 'S':
+            wall, meta = rec[1], rec[3]
+            radios = [r['id'] for r in meta['radios']]
+            print(f"# sesión {time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(wall / 1e9))} "
+                  f"framing={meta['framing']} radios={','.join(map(str, radios))}")
+            continue
+        if rec[0] == 'E':
+            events += 1
+            if args.hex:
+                print(f"{rec[1] / 1e9:12.6f} {radios[rec[2]]} evento {rec[3]}")
+            continue
+        _, t, radio, data = rec
+        reads += 1
+        size += len(data)
+        t_last = max(t_last, t)
+        if args.hex:
+            print(f"{t / 1e9:12.6f} {radios[radio]} {data.hex()}")
+    print(f"# {reads} lecturas, {size} bytes, {events} eventos, {t_last / 1e9:.1f} s en la última sesión")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""Group-commit CSV sink for received frames.
+
+The receive loop only appends rows to an in-memory batch; a background
+thread writes and flushes the batch when it reaches `flush_rows`, when the
+oldest pending row is `flush_ms` old, or on close(). This replaces one
+write+flush syscall pair (and SD-card write) per frame with one per batch.
+
+Rotation (optional) also happens in that thread, between two batches, so it
+never blocks write() and no row can fall between two files. When the file
+reaches `max_bytes` or a `rotate_s` wall-clock boundary passes (3600 =
+on the hour, 86400 = at local midnight), it is renamed to a segment
+
+    rx_log.csv -> rx_log.20250816-120000.csv(.gz|.zst)
+
+(time of the rotation) and a new rx_log.csv is started with the header. A
+second thread compresses closed segments, so a slow SD card or CPU only
+delays the compression. Each closed segment gets a line in
+rx_log.manifest.csv (file, first_ts, last_ts, rows, bytes; the first
+column of the rows is taken as their timestamp), which segments() reads to
+pick the files covering a time range. Segments left uncompressed by a crash
+are compressed on the next start.
+
+A write, flush or rotation that fails (SD card full or gone) does not stop
+the thread: the file is cut back to its last complete flush, the rows that
+did not make it are put back in front of the batch and retried every
+RETRY_S seconds. At most MAX_BACKLOG rows are kept that way; older ones are
+dropped and counted.
+"""
+import csv, gzip, os, queue, re, shutil, subprocess, sys, threading, time
+import tracing
+
+COMPRESS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+MANIFEST_HEADER = ['file', 'first_ts', 'last_ts', 'rows', 'bytes']
+
+
+class CsvSink:
+    """Buffered CSV writer flushed from its own thread."""
+    RETRY_S = 5.0           # wait after a failed flush before the next attempt
+    MAX_BACKLOG = 100000    # rows kept for retries while writes keep failing
+
+    def __init__(self, path, header, flush_rows=20, flush_ms=1000, fsync=False,
+                 max_bytes=0, rotate_s=0, compress='gzip'):
+        """Args:
+            path: CSV file, opened in append mode (header written if empty).
+            header: column names.
+            flush_rows: flush as soon as this many rows are pending.
+            flush_ms: flush pending rows at most this many ms after they arrive.
+            fsync: also fsync() after each flush (durable, but slower).
+            max_bytes: rotate once the file reaches this size (0 = never).
+            rotate_s: rotate at every multiple of this many seconds, local time (0 = never).
+            compress: 'gzip', 'zstd' (needs the zstd program) or 'none' for closed segments.
+        """
+        if compress not in COMPRESS:
+            raise ValueError(f"unknown compression {compress!r} (use {', '.join(COMPRESS)})")
+        if compress == 'zstd' and (max_bytes or rotate_s) and not shutil.which('zstd'):
+            raise ValueError("compress='zstd' needs the zstd program (apt install zstd)")
+        self.path = path
+        self.header = header
+        self.flush_rows = max(1, flush_rows)
+        self.flush_s = flush_ms / 1000.0
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.rotate_s = rotate_s
+        self.compress = compress
+        root, ext = os.path.splitext(path)
+        self._seg_fmt = root + '.{}' + ext
+        self._seg_re = re.compile(re.escape(os.path.basename(root)) + r'\.\d{8}-\d{6}(-\d+)?'
+                                  + re.escape(ext) + '$')
+        self.manifest = root + '.manifest' + ext
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._good = 0           # size of self.path after the last complete flush
+        self._open()
+        self._rows = []
+        self._inflight = 0
+        self._closing = False
+        self._cond = threading.Condition()
+        self.rows_written = 0
+        self.flushes = 0
+        self.rotations = 0
+        self.compressed = 0
+        self.compress_errors = 0
+        self.errors = 0          # failed flushes and rotations
+        self.dropped = 0         # rows given up after failed flushes
+        self._done = 0           # rows of the current batch already flushed before a rotation
+        self._zq = None
+        if max_bytes or rotate_s:
+            self._zq = queue.Queue()
+            self._zthread = threading.Thread(target=self._compressor, name='csv-compress', daemon=True)
+            self._zthread.start()
+            for name in sorted(os.listdir(os.path.dirname(path) or '.')):
+                if compress != 'none' and self._seg_re.match(name):
+                    # closed by a previous run but not compressed (crash or kill)
+                    self._zq.put(os.path.join(os.path.dirname(path), name))
+        self._thread = threading.Thread(target=self._run, name='csv-sink', daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        self._f = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._f)
+        self._seg_first = self._seg_last = None
+        self._seg_rows = 0
+        if self._f.tell() == 0:
+            self._good = 0
+            self._writer.writerow(self.header)
+            self._f.flush()
+            self._seg_start = time.time()
+        elif self.max_bytes or self.rotate_s:
+            # file of a previous run: count its rows for the manifest, and rotate
+            # it first thing if it was last written before the current interval
+            with open(self.path, newline='') as f:
+                rows = csv.reader(f)
+                next(rows, None)
+                for row in rows:
+                    if self._seg_first is None and row:
+                        self._seg_first = row[0]
+                    self._seg_last = row[0] if row else self._seg_last
+                    self._seg_rows += 1
+            self._seg_start = os.stat(self.path).st_mtime
+        self._good = self._f.tell()
+        self._next_rotate = self._boundary(self._seg_start) if self.rotate_s else float('inf')
+
+    def _boundary(self, t):
+        """First multiple of rotate_s (in local time) after t."""
+        off = time.localtime(t).tm_gmtoff
+        return ((t + off) // self.rotate_s + 1) * self.rotate_s - off
+
+    @property
+    def at_risk(self) -> int:
+        """Rows accepted but not yet flushed to the OS (lost on a crash)."""
+        with self._cond:
+            return len(self._rows) + self._inflight
+
+    def write(self, row):
+        """Queue one row; never blocks on file I/O."""
+        with self._cond:
+            self._rows.append(row)
+            n = len(self._rows)
+            if n == 1 or n >= self.flush_rows:
+                self._cond.notify()  # start the flush_ms timer / flush a full batch
+
+    def _run(self):
+        retry = False
+        while True:
+            with self._cond:
+                if retry and not self._closing:
+                    # the last flush failed: give the card some time before the next one
+                    self._cond.wait_for(lambda: self._closing, timeout=self.RETRY_S)
+                elif not self._rows and not self._closing:
+                    self._cond.wait()  # idle: nothing to time out
+                if not retry and not self._closing and len(self._rows) < self.flush_rows:
+                    self._cond.wait_for(lambda: self._closing or len(self._rows) >= self.flush_rows,
+                                        timeout=self.flush_s)
+                batch, self._rows = self._rows, []
+                self._inflight = len(batch)
+                closing = self._closing
+            retry = False
+            if batch:
+                tr = tracing.TRACER
+                if tr: t0 = time.perf_counter_ns()
+                try:
+                    self._flush(batch)
+                except OSError as e:
+                    self._failed(batch, closing, e)
+                    retry = True
+                else:
+                    self.rows_written += len(batch)
+                    self.flushes += 1
+                if tr: tr.add('csv.flush', t0)
+            with self._cond:
+                self._inflight = 0
+            if closing:
+                return
+
+    def _flush(self, batch):
+        """Write and flush one batch (writer thread); may raise OSError."""
+        self._done = 0
+        if self._f is None:
+            self._open()
+        if self.max_bytes or self.rotate_s:
+            # a backlog can be far larger than flush_rows: check the size
+            # every flush_rows rows so segments stay close to max_bytes
+            for i in range(0, len(batch), self.flush_rows):
+                if self._seg_rows and (time.time() >= self._next_rotate
+                                       or self.max_bytes and self._f.tell() >= self.max_bytes):
+                    self._rotate(i)
+                    self._open()
+                self._write_rows(batch[i:i + self.flush_rows])
+        else:
+            self._writer.writerows(batch)
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        self._good = self._f.tell()
+
+    def _failed(self, batch, closing, e):
+        """Undo a failed flush and keep its rows for the next one."""
+        self.errors += 1
+        if self._f is not None:
+            try:
+                self._f.close()
+            except OSError:
+                pass  # the buffered rows are the ones being put back
+            self._f = None
+        try:
+            # cut a partly written row; _open() then recounts the segment from the file
+            if os.path.getsize(self.path) > self._good:
+                os.truncate(self.path, self._good)
+        except OSError:
+            pass
+        self.rows_written += self._done
+        rows = batch[self._done:]
+        if closing:
+            self.dropped += len(rows)
+            print(f"CSV: se pierden {len(rows)} filas: {e}", file=sys.stderr)
+            return
+        print(f"CSV: no se pudieron escribir {len(rows)} filas, reintento en {self.RETRY_S:g} s: {e}",
+              file=sys.stderr)
+        with self._cond:
+            self._rows[:0] = rows
+            excess = len(self._rows) - self.MAX_BACKLOG
+            if excess > 0:
+                del self._rows[:excess]
+                self.dropped += excess
+
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+        if self._seg_first is None:
+            self._seg_first = rows[0][0]
+        self._seg_last = rows[-1][0]
+        self._seg_rows += len(rows)
+
+    def _rotate(self, done):
+        """Close the current file as a segment (writer thread); the caller _open()s the next.
+
+        `done` rows of the batch are in the file once it is flushed: from then
+        on a failed close or rename must not put them back.
+        """
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        size = self._good = self._f.tell()
+        self._done = done
+        f, self._f = self._f, None
+        f.close()
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        seg, n = self._seg_fmt.format(stamp), 1
+        while any(os.path.exists(seg + z) for z in COMPRESS.values()):
+            n += 1
+            seg = self._seg_fmt.format(f"{stamp}-{n}")
+        os.rename(self.path, seg)
+        self._good = 0
+        try:
+            self._add_manifest([os.path.basename(seg) + COMPRESS[self.compress], self._seg_first,
+                                self._seg_last or '', self._seg_rows, size])
+        except OSError as e:
+            # the rows are safe in the segment; only segments() will not find it
+            self.errors += 1
+            print(f"CSV: no se pudo anotar {seg} en {self.manifest}: {e}", file=sys.stderr)
+        self.rotations += 1
+        self._zq.put(seg)
+        if tr: tr.add('csv.rotate', t0)
+
+    def _add_manifest(self, entry):
+        new = not os.path.exists(self.manifest)
+        with open(self.manifest, 'a', newline='') as f:
+            w = csv.writer(f)
+            if new:
+                w.writerow(MANIFEST_HEADER)
+            w.writerow(entry)
+
+    def _compressor(self):
+        while True:
+            seg = self._zq.get()
+            if seg is None:
+                return
+            try:
+                compress_file(seg, self.compress)
+                self.compressed += 1
+            except (OSError, subprocess.CalledProcessError) as e:
+                # the segment stays uncompressed and is retried on the next start
+                self.compress_errors += 1
+                print(f"CSV: no se pudo comprimir {seg}: {e}", file=sys.stderr)
+
+    def close(self):
+        """Flush everything still pending and close the file.
+
+        Segments still waiting for compression are finished first.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        if self._f is not None:
+            try:
+                self._f.close()
+            except OSError:
+                pass
+        if self._zq:
+            self._zq.put(None)
+            self._zthread.join()
+
+
+def compress_file(path, method):
+    """Compress `path` to path.gz / path.zst and remove it; 'none' keeps it as is."""
+    if method == 'none':
+        return
+    out = path + COMPRESS[method]
+    tmp = out + '.part'
+    if method == 'gzip':
+        with open(path, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+    else:
+        subprocess.run(['zstd', '-q', '-f', '-T1', path, '-o', tmp], check=True, stdin=subprocess.DEVNULL)
+    with open(tmp, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, out)
+    os.unlink(path)
+
+
+def segments(path, since=None, until=None):
+    """Closed segments of the CSV at `path` overlapping [since, until], oldest first.
+
+    since/until compare against the manifest's first_ts/last_ts strings
+    (ISO timestamps sort as text). Returns the paths that exist, compressed
+    or not; the live file at `path` is not included.
+    """
+    root, ext = os.path.splitext(path)
+    d = os.path.dirname(path)
+    try:
+        with open(root + '.manifest' + ext, newline='') as f:
+            entries = list(csv.DictReader(f))
+    except FileNotFoundError:
+        return []
+    out = []
+    for e in entries:
+        if since is not None and e['last_ts'] and e['last_ts'] < since:
+            continue
+        if until is not None and e['first_ts'] and e['first_ts'] > until:
+            continue
+        name = e['file']
+        base = re.sub(r'\.(gz|zst)$', '', name)
+        for z in COMPRESS.values():
+            # still being compressed, or compressed differently by an older run
+            if os.path.exists(os.path.join(d, base + z)):
+                name = base + z
+                break
+        out.append(os.path.join(d, name))
+    return out
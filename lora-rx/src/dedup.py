@@ -0,0 +1,110 @@
+"""Suppression of messages received more than once.
+
+Relay mode (relay=True in sx126x.set()) and retransmissions deliver the
+same message several times. DedupCache remembers the recently seen
+(source address, message key) pairs and reports repeats.
+
+The key of a message is the id its sender put in it: (station, seq,
+timestamp) of binary telemetry and of JSON objects with an integer "seq"
+(tx_sensors.py, tx_random.py --mode json), and (seq, timestamp) of
+MSG|seq|ts|... text (tx_random.py). The timestamp makes the key survive a
+sender restart resetting seq. A payload without an id is never taken for
+a repeat, since the same text may legitimately come again (a constant
+reading, a PING), unless `hash_unkeyed` keys it by a hash of its bytes
+(relayed copies are byte-identical). ARQ frames are filtered earlier by
+arq.ArqReceiver and fragments are keyed once reassembled.
+
+Entries live in insertion order, so the oldest is always at the front:
+expiry after `ttl_s` and eviction beyond `max_entries` pop from there in
+O(1), and lookups are one dict probe. Memory is bounded by `max_entries`
+keys plus one duplicate counter per source address.
+"""
+import collections, json, time
+import telemetry_codec
+
+
+def message_key(payload, hash_unkeyed=False):
+    """Identity of a complete message payload, or None if it carries no id.
+
+    See the module docstring; with hash_unkeyed, a payload without an id
+    is keyed by a hash of its bytes instead.
+    """
+    if telemetry_codec.is_binary(payload):
+        try:
+            return telemetry_codec.message_id(payload)
+        except ValueError:
+            pass
+    elif payload[:1] == b'{':
+        try:
+            obj = json.loads(bytes(payload))
+        except ValueError:
+            obj = None
+        if isinstance(obj, dict) and type(obj.get('seq')) is int:
+            station, ts = obj.get('station'), obj.get('ts')
+            return ('json', str(station) if station is not None else None, obj['seq'],
+                    ts if isinstance(ts, (str, int, float)) else None)
+    elif payload[:4] == b'MSG|':
+        parts = bytes(payload).split(b'|', 3)
+        if len(parts) >= 3:
+            return ('msg', parts[1], parts[2])
+    return hash(bytes(payload)) if hash_unkeyed else None
+
+
+class DedupCache:
+    """Recently seen (src, key) pairs with time and size bounds."""
+
+    def __init__(self, ttl_s=30.0, max_entries=4096, clock=time.monotonic, hash_unkeyed=False):
+        """Args:
+            ttl_s: a copy seen this long after the first one is not a repeat.
+            max_entries: messages remembered at most.
+            hash_unkeyed: also key payloads without a message id by their bytes.
+        """
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hash_unkeyed = hash_unkeyed
+        self._seen = collections.OrderedDict()   # (src, key) -> first seen
+        self.checked = 0
+        self.duplicates = 0
+        self.by_src = {}         # src -> duplicates suppressed
+        self.expired = 0         # entries dropped after ttl_s
+        self.evicted = 0         # entries dropped to stay within max_entries
+        self.unkeyed = 0         # messages without an id, let through unchecked
+
+    def __len__(self):
+        return len(self._seen)
+
+    def expire(self, now=None):
+        """Drop entries older than ttl_s."""
+        if now is None:
+            now = self.clock()
+        limit = now - self.ttl_s
+        seen = self._seen
+        while seen:
+            t = next(iter(seen.values()))
+            if t > limit:
+                break
+            seen.popitem(last=False)
+            self.expired += 1
+
+    def seen(self, src, payload) -> bool:
+        """Record a message; True if the same one was seen within ttl_s."""
+        now = self.clock()
+        self.expire(now)
+        self.checked += 1
+        key = message_key(payload, self.hash_unkeyed)
+        if key is None:
+            self.unkeyed += 1
+            return False
+        k = (src, key)
+        if k in self._seen:
+            # the window runs from the first copy, so a steady stream of
+            # repeats cannot keep an entry alive forever
+            self.duplicates += 1
+            self.by_src[src] = self.by_src.get(src, 0) + 1
+            return True
+        self._seen[k] = now
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            self.evicted += 1
+        return False
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Local fan-out of received records to any number of subscribers.
+
+FanoutServer listens on a UNIX-domain stream socket; every client that
+connects gets each published record as one line (NDJSON from rx_basic.py
+and rx_multi.py). publish() never touches a socket: it appends to each
+subscriber's bounded queue under a short lock and, when a queue goes from
+empty to non-empty, wakes the writer thread through a pipe. The writer
+thread sends with non-blocking sockets, so a stuck or slow consumer only
+fills its own queue, and the radio loop never waits on it.
+
+When a queue is full the slow-consumer policy applies:
+
+  drop-oldest  the oldest queued record is discarded (counted in `dropped`)
+  disconnect   the subscriber is closed; it can reconnect and resume
+
+Per subscriber at most `queue_max` records are queued plus one batch being
+written. Run the module to subscribe from a shell:
+
+    python src/fanout.py /tmp/lora-rx.sock
+"""
+import argparse, collections, os, selectors, socket, stat, sys, threading
+
+POLICIES = ('drop-oldest', 'disconnect')
+
+
+class _Sub:
+    __slots__ = ('sock', 'queue', 'out', 'off', 'closing', 'dropped', 'writing')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.queue = collections.deque()
+        self.out = b''          # batch taken off the queue, sent up to `off`
+        self.off = 0
+        self.closing = False
+        self.dropped = 0
+        self.writing = False    # registered for EVENT_WRITE
+
+
+class FanoutServer:
+    """Publish lines to every subscriber of a UNIX socket."""
+
+    def __init__(self, path, queue_max=1000, policy='drop-oldest'):
+        """Args:
+            path: socket path; a stale socket left there is replaced.
+            queue_max: records queued per subscriber before the policy applies.
+            policy: 'drop-oldest' or 'disconnect'.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"unknown slow-consumer policy {policy!r} (use {' or '.join(POLICIES)})")
+        self.path = path
+        self.queue_max = queue_max
+        self.policy = policy
+        self.published = 0
+        self.dropped = 0         # records discarded by drop-oldest
+        self.disconnects = 0     # subscribers closed by the disconnect policy
+        self.connects = 0
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self._lsock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._lsock.bind(path)
+        self._lsock.listen(16)
+        self._lsock.setblocking(False)
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self._lsock, selectors.EVENT_READ, None)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._subs = {}          # fd -> _Sub
+        self._lock = threading.Lock()
+        self._woken = False
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name='fanout', daemon=True)
+        self._thread.start()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+    @property
+    def active(self) -> bool:
+        """True if anyone is subscribed (callers can skip building the record)."""
+        return bool(self._subs)
+
+    def publish(self, line: bytes):
+        """Queue one record (newline-terminated bytes) for every subscriber."""
+        if not self._subs:
+            return
+        with self._lock:
+            self.published += 1
+            wake = False
+            for sub in self._subs.values():
+                if sub.closing:
+                    continue
+                q = sub.queue
+                if len(q) >= self.queue_max:
+                    if self.policy == 'disconnect':
+                        sub.closing = True
+                        self.disconnects += 1
+                        wake = True
+                        continue
+                    q.popleft()
+                    sub.dropped += 1
+                    self.dropped += 1
+                q.append(line)
+                if len(q) == 1 and not sub.writing:
+                    wake = True
+            if wake and not self._woken:
+                self._woken = True
+                try:
+                    os.write(self._wake_w, b'\0')
+                except BlockingIOError:
+                    pass
+
+    def _wake(self):
+        with self._lock:
+            self._woken = True
+        try:
+            os.write(self._wake_w, b'\0')
+        except BlockingIOError:
+            pass
+
+    def _run(self):
+        while not self._closing:
+            for key, events in self._sel.select(1.0):
+                obj = key.fileobj
+                if obj is self._lsock:
+                    self._accept()
+                elif obj == self._wake_r:
+                    try:
+                        while os.read(self._wake_r, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    with self._lock:
+                        self._woken = False
+                else:
+                    sub = key.data
+                    if events & selectors.EVENT_READ and not self._readable(sub):
+                        continue
+                    if events & selectors.EVENT_WRITE:
+                        self._flush(sub)
+            for sub in list(self._subs.values()):
+                if sub.closing:
+                    self._close(sub)
+                elif not sub.writing and sub.queue:
+                    self._flush(sub)
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._lsock.accept()
+            except BlockingIOError:
+                return
+            sock.setblocking(False)
+            sub = _Sub(sock)
+            with self._lock:
+                self._subs[sock.fileno()] = sub
+            self._sel.register(sock, selectors.EVENT_READ, sub)
+            self.connects += 1
+
+    def _readable(self, sub) -> bool:
+        """Discard anything a subscriber sends; False once it has closed."""
+        try:
+            if sub.sock.recv(4096):
+                return True
+        except BlockingIOError:
+            return True
+        except OSError:
+            pass
+        self._close(sub)
+        return False
+
+    def _flush(self, sub):
+        """Send what the subscriber can take now; wait for EVENT_WRITE for the rest."""
+        if sub.off == len(sub.out):
+            with self._lock:
+                if sub.closing:
+                    return
+                sub.out, sub.off = b''.join(sub.queue), 0
+                sub.queue.clear()
+        try:
+            while sub.off < len(sub.out):
+                sub.off += sub.sock.send(memoryview(sub.out)[sub.off:])
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._close(sub)
+            return
+        with self._lock:
+            pending = sub.off < len(sub.out) or bool(sub.queue)
+            changed, sub.writing = pending != sub.writing, pending
+        if changed:
+            self._sel.modify(sub.sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0), sub)
+
+    def _close(self, sub):
+        with self._lock:
+            self._subs.pop(sub.sock.fileno(), None)
+        try:
+            self._sel.unregister(sub.sock)
+        except (KeyError, ValueError):
+            pass
+        sub.sock.close()
+
+    def close(self):
+        """Stop the writer thread, close every subscriber and remove the socket."""
+        self._closing = True
+        self._wake()
+        self._thread.join()
+        for sub in list(self._subs.values()):
+            self._close(sub)
+        self._sel.close()
+        self._lsock.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Suscribirse al socket de reparto del receptor')
+    ap.add_argument('path', nargs='?', default=os.getenv('RX_FANOUT','/tmp/lora-rx.sock'))
+    args = ap.parse_args()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(args.path)
+    try:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
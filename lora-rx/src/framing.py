@@ -0,0 +1,225 @@
+"""Stream framing for LoRa frames carried over the SX126x UART.
+
+The transmitter adds a sync byte, a length byte and a checksum after the
+module's fixed-point address bytes, so the receiver can find frame
+boundaries in the UART byte stream no matter how reads are chunked:
+
+    TX UART: dest_hi dest_lo chan | src_hi src_lo chan SYNC LEN payload CHK
+    RX UART:                        src_hi src_lo chan SYNC LEN payload CHK [RSSI]
+
+The module consumes the destination/channel prefix and, when packet RSSI
+output is enabled, appends one RSSI byte after the frame. CHK is the sum
+of every byte from src_hi to the end of the payload, modulo 256.
+
+The noise RSSI query (NOISE_CMD, normal mode) is answered on the same UART
+with C1 00 02 noise last_rssi. After expect_noise() the parser takes that
+reply out of the stream between frames and hands it to `on_noise`, so a
+query can go out while frames keep arriving.
+"""
+
+SYNC = 0xA7
+HEADER_LEN = 5          # src_hi src_lo chan SYNC LEN
+MAX_PAYLOAD = 255
+_SYNC_BYTES = bytes([SYNC])
+NOISE_CMD = bytes([0xC0, 0xC1, 0xC2, 0xC3, 0x00, 0x02])
+NOISE_REPLY = bytes([0xC1, 0x00, 0x02])   # + noise, last packet RSSI
+NOISE_REPLY_LEN = 5
+MAX_FRAME = HEADER_LEN + MAX_PAYLOAD + 2   # + CHK and RSSI
+
+
+def encode(src_addr: int, chan: int, payload: bytes) -> bytes:
+    """Return the framed body (everything after the destination prefix)."""
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"payload too long for one frame: {len(payload)} > {MAX_PAYLOAD}")
+    head = bytes([(src_addr >> 8) & 0xFF, src_addr & 0xFF, chan & 0xFF, SYNC, len(payload)])
+    return head + payload + bytes([(sum(head) + sum(payload)) & 0xFF])
+
+
+class Frame:
+    """One received on-air packet."""
+    __slots__ = ('src_addr', 'chan', 'payload', 'rssi')
+
+    def __init__(self, src_addr, chan, payload, rssi=None):
+        self.src_addr = src_addr
+        self.chan = chan
+        self.payload = payload
+        self.rssi = rssi  # packet RSSI in dBm, None when not reported
+
+    @classmethod
+    def from_burst(cls, r: bytes, rssi: bool, views=False):
+        """Parse an unframed burst (legacy TX): src(2) chan(1) payload [rssi].
+
+        views: the payload is a memoryview of `r` instead of a copy.
+        """
+        payload = (memoryview(r) if views else r)[3:-1 if rssi else None]
+        return cls((r[0] << 8) + r[1], r[2], payload, -(256 - r[-1]) if rssi else None)
+
+    def __repr__(self):
+        return f"Frame(src={self.src_addr}, chan={self.chan}, len={len(self.payload)}, rssi={self.rssi})"
+
+
+class FrameParser:
+    """Incremental parser that turns arbitrary UART chunks into Frames.
+
+    Bytes are appended to a reusable bytearray; complete frames are cut out
+    of it and the consumed prefix is compacted away only when space runs out.
+    Partial frames stay buffered until the rest arrives. On a bad sync byte
+    or checksum the parser slides forward to the next candidate sync byte.
+
+    Instead of feed(), a reader can fill the buffer in place: readinto() the
+    view returned by reserve(), then commit() the byte count.
+    """
+
+    def __init__(self, rssi=False, bufsize=2048, on_noise=None, views=False):
+        """Args:
+            on_noise: callable(noise_dbm, last_rssi_dbm) for noise query replies.
+            views: hand out payloads as memoryviews into the buffer instead of
+                bytes copies. They are only valid until the next feed() or
+                reserve(): copy what must outlive the frame.
+        """
+        self.rssi = rssi
+        self.views = views
+        self.on_noise = on_noise
+        self.noise_expected = 0  # noise queries written and not answered yet
+        self.noise_replies = 0
+        self._buf = bytearray(max(bufsize, 2 * MAX_FRAME))
+        self._mv = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self.frames = 0
+        self.dropped_bytes = 0   # bytes discarded while resynchronising
+        self.bad_checksum = 0
+
+    def expect_noise(self):
+        """A noise query was (or is about to be) written: watch for its reply."""
+        self.noise_expected += 1
+
+    def cancel_noise(self):
+        """Stop waiting for an unanswered noise query."""
+        self.noise_expected = max(0, self.noise_expected - 1)
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered bytes not yet consumed by a frame."""
+        return self._end - self._start
+
+    def _make_room(self, n):
+        """Move the live bytes to the front, or to a larger buffer, so n more fit."""
+        buf = self._buf
+        live = self._end - self._start
+        if live + n > len(buf):
+            # a new buffer rather than extend(): views handed out keep the old one alive
+            self._buf = bytearray(live + n)
+            self._buf[0:live] = self._mv[self._start:self._end]
+            self._mv = memoryview(self._buf)
+        else:
+            buf[0:live] = buf[self._start:self._end]
+        self._start, self._end = 0, live
+
+    def _append(self, data):
+        n = len(data)
+        if self._end + n > len(self._buf):
+            self._make_room(n)
+        self._buf[self._end:self._end + n] = data
+        self._end += n
+
+    def reserve(self, n=MAX_FRAME) -> memoryview:
+        """Writable view of the free end of the buffer, at least n bytes long.
+
+        Read into a prefix of it and pass the byte count to commit(). Like
+        feed(), this may move buffered bytes and so ends the validity of the
+        payload views of earlier frames.
+        """
+        if len(self._buf) - self._end < n:
+            self._make_room(n)
+        return self._mv[self._end:]
+
+    def commit(self, n) -> list:
+        """Take n bytes written into the reserve()d view; return the frames completed."""
+        self._end += n
+        return self._parse()
+
+    def feed(self, data) -> list:
+        """Add a chunk read from the UART and return the frames it completed."""
+        if data:
+            self._append(data)
+        return self._parse()
+
+    def _parse(self) -> list:
+        out = []
+        buf, mv = self._buf, self._mv
+        tail = 2 if self.rssi else 1
+        while self._end - self._start >= HEADER_LEN:
+            s = self._start
+            if self.noise_expected and buf.startswith(NOISE_REPLY, s):
+                reply = self._noise_reply(s, tail)
+                if reply is None:
+                    break  # could still be a frame from 0xC100 on channel 2
+                if reply:
+                    continue
+            if buf[s + 3] != SYNC:
+                self._resync(s + 1)
+                continue
+            n = buf[s + 4]
+            end = s + HEADER_LEN + n
+            if self._end < end + tail:
+                break  # partial frame, wait for more bytes
+            if (sum(mv[s:end]) & 0xFF) != buf[end]:
+                self.bad_checksum += 1
+                self._resync(s + 1)
+                continue
+            payload = mv[s + HEADER_LEN:end] if self.views else bytes(mv[s + HEADER_LEN:end])
+            rssi = -(256 - buf[end + 1]) if self.rssi else None
+            out.append(Frame((buf[s] << 8) + buf[s + 1], buf[s + 2], payload, rssi))
+            self.frames += 1
+            self._start = end + tail
+        if self._start == self._end:
+            self._start = self._end = 0
+        return out
+
+    def _noise_reply(self, s, tail, force=False):
+        """Consume a noise reply at `s`: True if taken, False if it is a frame, None if undecided.
+
+        A frame from address 0xC100 on channel 2 starts with the same bytes;
+        it only wins when SYNC, LEN and checksum all match. A reply whose
+        noise byte equals SYNC stays undecided until a frame header shows
+        up right after it, more bytes settle the checksum, or flush().
+        """
+        buf = self._buf
+        if buf[s + 3] == SYNC and not force:
+            end = s + HEADER_LEN + buf[s + 4]
+            if self._end < end + tail:
+                nxt = s + NOISE_REPLY_LEN
+                if self._end - nxt < HEADER_LEN or buf[nxt + 3] != SYNC:
+                    return None
+            elif (sum(self._mv[s:end]) & 0xFF) == buf[end]:
+                return False
+        self._start = s + NOISE_REPLY_LEN
+        self.noise_expected -= 1
+        self.noise_replies += 1
+        if self.on_noise:
+            self.on_noise(-(256 - buf[s + 3]), -(256 - buf[s + 4]))
+        return True
+
+    def _resync(self, pos):
+        """Skip to the next byte that could be a sync byte at offset 3."""
+        i = self._buf.find(_SYNC_BYTES, pos + 3, self._end)
+        new_start = i - 3 if i >= 0 else max(pos, self._end - 3)
+        if self.noise_expected:
+            # a noise reply may also start before the next candidate frame
+            j = self._buf.find(NOISE_REPLY, pos, self._end)
+            if 0 <= j < new_start:
+                new_start = j
+        self.dropped_bytes += new_start - self._start
+        self._start = new_start
+
+    def flush(self) -> int:
+        """Discard a stale partial frame (e.g. after a long UART silence)."""
+        s = self._start
+        if self.noise_expected and self._end - s >= NOISE_REPLY_LEN and self._buf.startswith(NOISE_REPLY, s):
+            # an undecided noise reply: the silence settles it
+            self._noise_reply(s, 0, force=True)
+        n = self._end - self._start
+        self.dropped_bytes += n
+        self._start = self._end = 0
+        return n
@@ -0,0 +1,143 @@
+"""Prometheus metrics for the receiver and the transmitters, served over HTTP.
+
+The hot loop only does dict/list arithmetic: Counter.inc() adds to a dict
+keyed by the label value and Histogram.observe() bisects a short tuple of
+bucket bounds, about a microsecond each. Values owned elsewhere (parser
+drop counters, reassembly table, ...) are read at scrape time through
+Gauge/Counter callbacks, so they cost nothing per frame. The HTTP thread
+renders from copies of the dicts and never takes a lock the loop waits on.
+"""
+import bisect, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(name, value):
+    if name is None:
+        return ''
+    value = str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return f'{{{name}="{value}"}}'
+
+
+def _num(v):
+    if v == float('inf'):
+        return '+Inf'
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    """Monotonic counter, optionally with one label (e.g. the source address)."""
+    kind = 'counter'
+
+    def __init__(self, name, doc, label=None, fn=None):
+        """fn: callable returning the value (or {label: value}) at scrape time."""
+        self.name = name
+        self.doc = doc
+        self.label = label
+        self.fn = fn
+        self.values = {}
+        self.value = 0
+
+    def inc(self, n=1, key=None):
+        if key is None:
+            self.value += n
+        else:
+            self.values[key] = self.values.get(key, 0) + n
+
+    def samples(self):
+        if self.fn is not None:
+            v = self.fn()
+            items = v.items() if isinstance(v, dict) else [(None, v)]
+        elif self.label is not None:
+            items = dict(self.values).items()
+        else:
+            items = [(None, self.value)]
+        for key, v in items:
+            yield self.name + (_labels(self.label, key) if key is not None else ''), v
+
+
+class Gauge(Counter):
+    """Value that goes up and down; usually read through `fn`."""
+    kind = 'gauge'
+
+    def set(self, v, key=None):
+        if key is None:
+            self.value = v
+        else:
+            self.values[key] = v
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket upper bounds."""
+    kind = 'histogram'
+
+    def __init__(self, name, doc, buckets):
+        self.name = name
+        self.doc = doc
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)   # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, v):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+
+    def samples(self):
+        counts, total = list(self.counts), 0
+        for bound, n in zip(self.bounds + (float('inf'),), counts):
+            total += n
+            yield f'{self.name}_bucket{{le="{_num(bound)}"}}', total
+        yield f'{self.name}_sum', self.sum
+        yield f'{self.name}_count', total
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *a, **kw):
+        return self.add(Counter(*a, **kw))
+
+    def gauge(self, *a, **kw):
+        return self.add(Gauge(*a, **kw))
+
+    def histogram(self, *a, **kw):
+        return self.add(Histogram(*a, **kw))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        out = []
+        for m in self.metrics:
+            out.append(f'# HELP {m.name} {m.doc}')
+            out.append(f'# TYPE {m.name} {m.kind}')
+            out.extend(f'{name} {_num(v)}' for name, v in m.samples())
+        return '\n'.join(out) + '\n'
+
+    def serve(self, port, addr='127.0.0.1'):
+        """Serve /metrics from a daemon thread; return the server (shutdown() to stop)."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
@@ -0,0 +1,70 @@
+"""Periodic channel noise-floor sampling interleaved with reception.
+
+The module answers the noise RSSI query (framing.NOISE_CMD) on the same
+UART that carries received frames. NoiseSampler writes the query every
+`interval` seconds from the receive loop and never waits for it: the
+FrameParser, told to expect a reply, takes C1 00 02 noise last_rssi out of
+the stream between frames and calls back here. Nothing is flushed, so no
+buffered frame is lost, and the loop never sleeps on the module.
+
+Samples are kept as a (unix time, dBm) series of the last `history`
+values and passed to `on_sample` as they arrive.
+"""
+import collections, time
+
+
+class NoiseSampler:
+    """Schedule noise queries for one radio and collect the replies."""
+
+    def __init__(self, dev, parser, interval=60.0, timeout=1.0, history=1440, on_sample=None, on_query=None):
+        """Args:
+            dev: sx126x used to write the query (request_noise()).
+            parser: FrameParser fed with everything read from dev's UART.
+            interval: seconds between queries.
+            timeout: seconds after which an unanswered query is given up.
+            history: samples kept in `samples`.
+            on_sample: callable(unix_time, noise_dbm) for every reply.
+            on_query: callable(sent) when a query is sent (True) or given up (False).
+        """
+        self.dev = dev
+        self.parser = parser
+        self.interval = interval
+        self.timeout = timeout
+        self.on_sample = on_sample
+        self.on_query = on_query
+        self.samples = collections.deque(maxlen=history)
+        self.last = None          # latest noise floor (dBm)
+        self.sent = 0
+        self.timeouts = 0
+        self._sent_t = None       # monotonic time of the pending query
+        self._next = time.monotonic()
+        parser.on_noise = self._on_reply
+
+    def poll(self, now=None):
+        """Send a query when one is due and expire an unanswered one; call from the loop."""
+        if now is None:
+            now = time.monotonic()
+        if self._sent_t is not None:
+            if now - self._sent_t < self.timeout:
+                return
+            # the module never answered: stop watching the stream for it
+            self.parser.cancel_noise()
+            if self.on_query:
+                self.on_query(False)
+            self.timeouts += 1
+            self._sent_t = None
+        if now >= self._next:
+            self._next = now + self.interval
+            self._sent_t = now
+            self.sent += 1
+            if self.on_query:
+                self.on_query(True)
+            self.dev.request_noise(self.parser)
+
+    def _on_reply(self, noise, last_rssi):
+        self._sent_t = None
+        self.last = noise
+        t = time.time()
+        self.samples.append((t, noise))
+        if self.on_sample:
+            self.on_sample(t, noise)
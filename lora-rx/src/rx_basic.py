@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
-import os, argparse, time, csv
+import os, sys, argparse, time, signal, json, shutil
 from dotenv import load_dotenv
-from sx126x import sx126x
+from rx_engine import SerialReceiver
+from framing import Frame, FrameParser
+from csv_sink import CsvSink
+from sqlite_sink import SqliteSink
+import telemetry_codec
+from fragment import Reassembler, is_fragment
+import framing, arq, metrics, tracing, capture
+from noise_floor import NoiseSampler
+from dedup import DedupCache
+from fanout import FanoutServer
 
 load_dotenv()
 
@@ -14,51 +23,376 @@ def main():
     ap.add_argument('--airspeed', type=int, default=int(os.getenv('AIRSPEED','2400')))
     ap.add_argument('--csv', default=os.getenv('RX_CSV',''))
     ap.add_argument('--debug', type=int, default=int(os.getenv('RX_DEBUG','0')))
+    ap.add_argument('--quiet', type=int, default=int(os.getenv('RX_QUIET','0')),
+                    help='1: no imprimir cada trama')
+    ap.add_argument('--capture', default=os.getenv('RX_CAPTURE',''),
+                    help='Fichero donde grabar cada lectura del UART con su tiempo (vacío = no)')
+    ap.add_argument('--replay', default='',
+                    help='Reproducir una captura en lugar de leer la radio (sin puerto serie)')
+    ap.add_argument('--replay-speed', type=float, default=1.0,
+                    help='Velocidad de la reproducción: 1 = tiempo original, 0 = lo más rápido posible')
+    ap.add_argument('--replay-radio', default=None,
+                    help='Radio de la captura a reproducir (capturas de rx_multi.py; por defecto la primera)')
+    ap.add_argument('--idle-ms', type=float, default=float(os.getenv('RX_IDLE_MS','30')),
+                    help='Silencio entre bytes (ms) que marca el fin de una trama')
+    ap.add_argument('--framing', choices=['stream','burst'], default=os.getenv('RX_FRAMING','stream'),
+                    help='stream: tramas con SYNC/LEN (TX actual); burst: una trama por ráfaga (TX antiguo)')
+    ap.add_argument('--csv-flush-rows', type=int, default=int(os.getenv('RX_CSV_FLUSH_ROWS','20')),
+                    help='Volcar el CSV cada N filas')
+    ap.add_argument('--csv-flush-ms', type=float, default=float(os.getenv('RX_CSV_FLUSH_MS','1000')),
+                    help='Volcar el CSV como mucho T ms después de recibir una fila')
+    ap.add_argument('--csv-rotate-mb', type=float, default=float(os.getenv('RX_CSV_ROTATE_MB','0')),
+                    help='Rotar el CSV al llegar a N MB (0 = no)')
+    ap.add_argument('--csv-rotate-s', type=float, default=float(os.getenv('RX_CSV_ROTATE_S','0')),
+                    help='Rotar el CSV cada N segundos en punto, hora local: 3600, 86400... (0 = no)')
+    ap.add_argument('--csv-compress', choices=['gzip','zstd','none'], default=os.getenv('RX_CSV_COMPRESS','gzip'),
+                    help='Compresión de los segmentos cerrados (en un hilo aparte)')
+    ap.add_argument('--db', default=os.getenv('RX_DB',''),
+                    help='Base de datos SQLite donde guardar también los registros (vacío = no)')
+    ap.add_argument('--db-retention-days', type=float, default=float(os.getenv('RX_DB_RETENTION_DAYS','0')),
+                    help='Borrar de la base de datos los registros de más de N días (0 = guardar todo)')
+    ap.add_argument('--reasm-timeout', type=float, default=float(os.getenv('RX_REASM_TIMEOUT_S','30')),
+                    help='Segundos que se espera a los fragmentos de un mensaje antes de descartarlo')
+    ap.add_argument('--reasm-max', type=int, default=int(os.getenv('RX_REASM_MAX','64')),
+                    help='Mensajes fragmentados incompletos que se guardan como máximo')
+    ap.add_argument('--dedup-s', type=float, default=float(os.getenv('RX_DEDUP_S','30')),
+                    help='Descartar los mensajes repetidos (relé, reenvíos) vistos hace menos de N s (0 = no)')
+    ap.add_argument('--dedup-max', type=int, default=int(os.getenv('RX_DEDUP_MAX','4096')),
+                    help='Mensajes recordados como máximo para detectar repetidos')
+    ap.add_argument('--dedup-hash', type=int, default=int(os.getenv('RX_DEDUP_HASH','0')),
+                    help='1: tratar también como repetidos los mensajes sin seq idénticos byte a byte')
+    ap.add_argument('--arq-ack', type=int, default=int(os.getenv('RX_ARQ_ACK','1')),
+                    help='1: responder con ACK a las tramas fiables (TX con ARQ=1)')
+    ap.add_argument('--fanout', default=os.getenv('RX_FANOUT',''),
+                    help='Socket UNIX donde publicar cada registro como una línea JSON (vacío = no)')
+    ap.add_argument('--fanout-queue', type=int, default=int(os.getenv('RX_FANOUT_QUEUE','1000')),
+                    help='Registros en cola por suscriptor antes de aplicar la política')
+    ap.add_argument('--fanout-policy', choices=['drop-oldest','disconnect'],
+                    default=os.getenv('RX_FANOUT_POLICY','drop-oldest'),
+                    help='Suscriptor lento: descartar lo más antiguo o desconectarlo')
+    ap.add_argument('--metrics-port', type=int, default=int(os.getenv('RX_METRICS_PORT','0')),
+                    help='Puerto HTTP de las métricas Prometheus (/metrics); 0 = desactivado')
+    ap.add_argument('--metrics-addr', default=os.getenv('RX_METRICS_ADDR','127.0.0.1'),
+                    help='Dirección donde escuchar las métricas')
+    ap.add_argument('--noise-s', type=float, default=float(os.getenv('RX_NOISE_S','0')),
+                    help='Medir el ruido del canal cada N segundos sin parar la recepción (0 = no; sólo framing stream)')
+    ap.add_argument('--noise-csv', default=os.getenv('RX_NOISE_CSV',''),
+                    help='CSV donde guardar las medidas de ruido (ts,noise_dbm)')
+    ap.add_argument('--fast-start', type=int, default=int(os.getenv('FAST_START','1')),
+                    help='1: leer los registros del módulo y no reescribirlos si ya coinciden')
+    ap.add_argument('--cfg-cache', default=os.getenv('CFG_CACHE',''),
+                    help='Directorio de caché de la configuración aplicada por puerto (vacío = sin caché)')
     args = ap.parse_args()
 
     debug = bool(args.debug)
+    # LORA_TRACE=fichero: tiempos por etapa, volcados con SIGUSR1 y al salir
+    tracing.setup_from_env()
 
-    dev = sx126x(serial_num=args.serial, freq=args.freq, addr=args.addr,
-                 power=args.power, rssi=True, air_speed=args.airspeed, relay=False)
+    # Rotación por tamaño/hora: el hilo del CSV cambia de fichero entre dos volcados
+    # y otro hilo comprime el segmento cerrado (índice en <csv>.manifest.csv)
+    rotation = dict(max_bytes=int(args.csv_rotate_mb * 1e6), rotate_s=args.csv_rotate_s, compress=args.csv_compress)
+    if args.csv_compress == 'zstd' and (args.csv_rotate_mb or args.csv_rotate_s) and not shutil.which('zstd'):
+        ap.error('--csv-compress zstd needs the zstd program (apt install zstd)')
 
-    writer = None; f = None
+    t0 = time.monotonic()
+    replay = cap = None
+    if args.replay:
+        # Captura en lugar de UART y módulo: mismo parser, decodificación y salidas
+        replay = capture.ReplayReceiver(args.replay, args.replay_radio, args.replay_speed,
+                                        idle_timeout=args.idle_ms / 1000.0)
+        meta = replay.first_session()
+        radios = {r['id']: r for r in meta['radios']}
+        if args.replay_radio is not None and args.replay_radio not in radios:
+            ap.error(f"radio {args.replay_radio!r} not in the capture (has {', '.join(map(str, radios))})")
+        dev = capture.ReplayRadio(radios.get(args.replay_radio, meta['radios'][0]))
+        args.framing = meta['framing']
+        args.serial, args.freq = args.replay, dev.start_freq + dev.offset_freq
+        args.noise_s = 0   # las consultas de ruido grabadas se reproducen desde la captura
+    else:
+        # El driver (y lgpio) sólo hace falta con radio: una captura se reproduce en cualquier PC
+        from sx126x import sx126x
+        dev = sx126x(serial_num=args.serial, freq=args.freq, addr=args.addr,
+                     power=args.power, rssi=True, air_speed=args.airspeed, relay=False,
+                     fast_start=bool(args.fast_start), cfg_cache=args.cfg_cache or None)
+        if args.capture.strip():
+            # Cada lectura del UART tal cual, con tiempo monotónico (se escribe en un hilo aparte)
+            cap = capture.CaptureWriter(args.capture, [capture.radio_info(args.serial, dev)], args.framing)
+    startup_ms = (time.monotonic() - t0) * 1000
+    # Hora de los registros: la de la captura al reproducir
+    now = replay.wall_time if replay else time.time
+
+    sink = None
     if args.csv.strip():
-        os.makedirs(os.path.dirname(args.csv) or ".", exist_ok=True)
-        f = open(args.csv, 'a', newline='')
-        writer = csv.writer(f)
-        if f.tell() == 0:
-            writer.writerow(['ts','src_addr','freq_mhz','payload'])
+        # Escritura agrupada en un hilo aparte: el bucle de recepción no toca el disco
+        sink = CsvSink(args.csv, ['ts','src_addr','freq_mhz','payload'],
+                       flush_rows=args.csv_flush_rows, flush_ms=args.csv_flush_ms, **rotation)
+    db = None
+    if args.db.strip():
+        # Transacciones agrupadas en un hilo aparte, como el CSV
+        db = SqliteSink(args.db, retention_days=args.db_retention_days)
+    fanout = None
+    if args.fanout.strip():
+        # Reparto local: cada suscriptor tiene su cola acotada, nunca frena la lectura de la radio
+        fanout = FanoutServer(args.fanout, args.fanout_queue, args.fanout_policy)
+    # SIGTERM (systemd stop) termina como CTRL+C para volcar las filas pendientes
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    rx = replay or SerialReceiver(dev.ser, idle_timeout=args.idle_ms / 1000.0, capture=cap)
+    # Lectura directa al buffer del parser; las cargas útiles son vistas sobre él,
+    # válidas hasta la siguiente lectura (lo que se guarda más tiempo se copia)
+    parser = FrameParser(rssi=dev.rssi, views=True)
+    if replay:
+        replay.parser = parser
+    reasm = Reassembler(timeout_s=args.reasm_timeout, max_messages=args.reasm_max)
+    arq_rx = arq.ArqReceiver()
+    dedup = DedupCache(args.dedup_s, args.dedup_max, hash_unkeyed=bool(args.dedup_hash)) if args.dedup_s > 0 else None
+    noise = noise_sink = None
+    if args.noise_s > 0 and args.framing == 'stream':
+        # La consulta de ruido se intercala con la recepción: el parser separa la
+        # respuesta C1 00 02 de las tramas, sin vaciar el buffer ni esperar
+        if args.noise_csv.strip():
+            noise_sink = CsvSink(args.noise_csv, ['ts','noise_dbm'],
+                                 flush_rows=args.csv_flush_rows, flush_ms=args.csv_flush_ms, **rotation)
+
+        def on_noise(t, dbm):
+            if noise_sink:
+                noise_sink.write([time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(t)), dbm])
+            if debug:
+                print(f"DEBUG ruido {dbm} dBm")
+
+        def on_query(sent):
+            if cap:
+                cap.event(0, capture.EV_NOISE_QUERY if sent else capture.EV_NOISE_CANCEL)
+
+        noise = NoiseSampler(dev, parser, interval=args.noise_s, on_sample=on_noise, on_query=on_query)
 
-    print(f"RX @ {args.freq}.125 MHz | serial={args.serial} | air={args.airspeed}bps (CTRL+C para salir)")
+    # Métricas: contadores y histogramas baratos en el bucle, el resto se lee al consultar
+    reg = metrics.Registry()
+    m_frames = reg.counter('lora_rx_frames_total', 'Frames received, by source address', label='src')
+    m_bytes = reg.counter('lora_rx_bytes_total', 'Payload bytes received, by source address', label='src')
+    m_records = reg.counter('lora_rx_records_total', 'Records logged (after reassembly and ARQ duplicates)')
+    m_short = reg.counter('lora_rx_short_frames_total', 'Bursts too short to hold a frame (burst framing)')
+    reg.counter('lora_rx_bad_checksum_total', 'Frames dropped on a checksum mismatch', fn=lambda: parser.bad_checksum)
+    reg.counter('lora_rx_resync_bytes_total', 'Bytes skipped looking for a sync byte', fn=lambda: parser.dropped_bytes)
+    m_decode = reg.counter('lora_rx_decode_failures_total', 'Payloads logged as hex (not text nor telemetry)')
+    reg.counter('lora_rx_arq_duplicates_total', 'Reliable frames received again', fn=lambda: arq_rx.duplicates)
+    reg.counter('lora_rx_reasm_completed_total', 'Fragmented messages reassembled', fn=lambda: reasm.completed)
+    reg.counter('lora_rx_reasm_timeouts_total', 'Fragmented messages dropped incomplete',
+                fn=lambda: reasm.timeouts + reasm.evicted)
+    reg.gauge('lora_rx_reasm_pending', 'Fragmented messages waiting for fragments', fn=lambda: reasm.pending)
+    if dedup:
+        reg.counter('lora_rx_duplicates_total', 'Repeated messages suppressed, by source address', label='src',
+                    fn=lambda: dict(dedup.by_src))
+        reg.gauge('lora_rx_dedup_entries', 'Messages remembered for duplicate detection', fn=lambda: len(dedup))
+        reg.counter('lora_rx_dedup_evicted_total', 'Entries dropped before ttl to stay within the size bound',
+                    fn=lambda: dedup.evicted)
+    if fanout:
+        reg.gauge('lora_rx_fanout_subscribers', 'Clients connected to the fan-out socket',
+                  fn=lambda: fanout.subscribers)
+        reg.counter('lora_rx_fanout_dropped_total', 'Records dropped for slow fan-out subscribers',
+                    fn=lambda: fanout.dropped)
+        reg.counter('lora_rx_fanout_disconnects_total', 'Fan-out subscribers closed for falling behind',
+                    fn=lambda: fanout.disconnects)
+    if sink:
+        reg.counter('lora_rx_csv_rows_total', 'Rows written to the CSV', fn=lambda: sink.rows_written)
+        reg.gauge('lora_rx_csv_pending_rows', 'Rows not yet flushed to the CSV', fn=lambda: sink.at_risk)
+        reg.counter('lora_rx_csv_rotations_total', 'CSV segments closed by rotation', fn=lambda: sink.rotations)
+        reg.counter('lora_rx_csv_compress_errors_total', 'CSV segments that failed to compress',
+                    fn=lambda: sink.compress_errors)
+        reg.counter('lora_rx_csv_errors_total', 'CSV flushes and rotations that failed (retried)',
+                    fn=lambda: sink.errors)
+        reg.counter('lora_rx_csv_dropped_total', 'Rows given up after failed CSV flushes',
+                    fn=lambda: sink.dropped)
+    if db:
+        reg.counter('lora_rx_db_rows_total', 'Rows committed to the SQLite database', fn=lambda: db.rows_written)
+        reg.gauge('lora_rx_db_pending_rows', 'Rows not yet committed to the SQLite database', fn=lambda: db.at_risk)
+        reg.counter('lora_rx_db_errors_total', 'SQLite commits that failed (retried)', fn=lambda: db.errors)
+        reg.counter('lora_rx_db_dropped_total', 'Rows given up after failed SQLite commits',
+                    fn=lambda: db.dropped)
+        reg.counter('lora_rx_db_pruned_total', 'Rows deleted by the retention job', fn=lambda: db.pruned)
+    if noise:
+        reg.gauge('lora_rx_noise_floor_dbm', 'Channel noise floor from the last module query',
+                  fn=lambda: {} if noise.last is None else noise.last)
+        reg.counter('lora_rx_noise_queries_total', 'Noise floor queries sent', fn=lambda: noise.sent)
+        reg.counter('lora_rx_noise_timeouts_total', 'Noise floor queries left unanswered', fn=lambda: noise.timeouts)
+    m_rssi = reg.histogram('lora_rx_rssi_dbm', 'Packet RSSI', range(-130, -20, 10))
+    m_read = reg.histogram('lora_rx_serial_read_bytes', 'Bytes per UART read', [1 << i for i in range(11)])
+    m_latency = reg.histogram('lora_rx_sink_latency_seconds', 'First UART byte of a frame to its sink write',
+                              [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0])
+    if args.metrics_port:
+        reg.serve(args.metrics_port, args.metrics_addr)
+    # Momento del primer byte de las tramas devueltas y de la trama parcial en curso
+    t_start = t_pending = 0.0
+
+    def send_ack(src):
+        # ACK/NACK compacto (base + mapa de bits) de vuelta a la dirección del emisor
+        body = framing.encode(dev.addr, dev.offset_freq, arq_rx.ack(src))
+        dev.send(bytes([(src >> 8) & 0xFF, src & 0xFF, dev.offset_freq]) + body)
+
+    def read_frames():
+        """Block until at least one frame (or nothing, on timeout) is available."""
+        nonlocal t_start, t_pending
+        if args.framing == 'burst':
+            r = rx.read_burst()
+            if debug and r:
+                print(f"DEBUG raw len={len(r)} data={r.hex()}")
+            if r:
+                m_read.observe(len(r))
+            t_start = rx.t_first_byte
+            min_len = 4 + (1 if dev.rssi else 0)
+            if not r or len(r) < min_len:  # demasiado corto para contener addr, canal y payload
+                if r:
+                    m_short.inc()
+                return []
+            return [Frame.from_burst(r, dev.rssi, views=True)]
+        view = parser.reserve()
+        n = rx.read_chunk_into(view, timeout=1.0)
+        if n is None:
+            # Un segundo sin bytes: descartar cualquier trama parcial colgada
+            if parser.pending:
+                parser.flush()
+            return []
+        if debug:
+            print(f"DEBUG raw len={n} data={view[:n].hex()}")
+        m_read.observe(n)
+        if not parser.pending:
+            t_pending = rx.t_first_byte
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        frames = parser.commit(n)
+        if tr: tr.add('parse', t0)
+        # la primera trama completa empezó con el byte pendiente más antiguo
+        t_start = t_pending
+        if frames and parser.pending:
+            t_pending = rx.t_first_byte
+        return frames
+
+    print(f"RX @ {args.freq}.125 MHz | serial={args.serial} | air={args.airspeed}bps | framing={args.framing} (CTRL+C para salir)")
+    cfg = dev.config
+    print(f"Radio lista en {startup_ms:.0f} ms (registros: {cfg.source}, escrituras={cfg.attempts}, "
+          f"configuración {cfg.elapsed_ms:.0f} ms)")
+    if not cfg.ok:
+        print("⚠️  El módulo no confirmó la configuración (revisa jumpers, M0/M1 y el puerto serie)")
+    # La hora de los registros cambia una vez por segundo: se formatea sólo entonces
+    ts_sec, ts = None, ''
+    t_run = time.monotonic()
     try:
         while True:
-            if dev.ser.inWaiting() > 0:
-                time.sleep(0.5)
-                to_read = dev.ser.inWaiting()
-                r = dev.ser.read(to_read)
-                if debug:
-                    print(f"DEBUG raw len={len(r)} data={r.hex()}")
-                
-                min_len = 4 + (1 if dev.rssi else 0)
-                if len(r) < min_len:  # demasiado corto para contener addr, canal y payload
+            ack_to = set()
+            for fr in read_frames():
+                tr = tracing.TRACER
+                if tr: t_fr = time.perf_counter_ns()
+                m_frames.inc(1, fr.src_addr)
+                m_bytes.inc(len(fr.payload), fr.src_addr)
+                if fr.rssi is not None:
+                    m_rssi.observe(fr.rssi)
+                if arq.is_data(fr.payload):
+                    # Trama fiable: se confirma siempre (también los duplicados, su ACK se perdió)
+                    seq, fr.payload = arq.unwrap(fr.payload)
+                    ack_to.add(fr.src_addr)
+                    if not arq_rx.on_data(fr.src_addr, seq):
+                        continue
+                elif arq.is_ack(fr.payload):
+                    continue
+                if is_fragment(fr.payload):
+                    # Fragmento de un mensaje mayor que un paquete: se registra al completarse
+                    msg = reasm.add(fr.src_addr, fr.payload)
+                    if msg is None:
+                        continue
+                    fr.payload = msg
+                if dedup and dedup.seen(fr.src_addr, fr.payload):
+                    # Copia de un mensaje ya registrado (relé o reenvío)
+                    continue
+                if args.quiet and not sink and not db and not (fanout and fanout.active):
+                    # Nadie usa el texto ni la hora: ni se decodifica ni se formatea
+                    m_records.inc()
+                    m_latency.observe(time.monotonic() - t_start)
+                    if tr: tr.add('frame', t_fr)
                     continue
-                
-                src_addr = (r[0] << 8) + r[1]
-                freq_mhz = dev.start_freq + r[2]
-                payload = r[3:-1] if dev.rssi else r[3:]
+                freq_mhz = dev.start_freq + fr.chan
+                if tr: t0 = time.perf_counter_ns()
                 try:
-                    text = payload.decode()
+                    if telemetry_codec.is_binary(fr.payload):
+                        # Telemetría binaria: se registra como el JSON equivalente
+                        text = json.dumps(telemetry_codec.decode(fr.payload), separators=(',',':'))
+                    else:
+                        text = str(fr.payload, 'utf-8')
                 except Exception:
-                    text = payload.hex()
-                ts = time.strftime('%Y-%m-%dT%H:%M:%S')
-                print(f"RX {ts} | src={src_addr} @ {freq_mhz}.125 MHz | {text}")
-                if writer:
-                    writer.writerow([ts, src_addr, f"{freq_mhz}.125", text]); f.flush()
-            time.sleep(0.05)
-    except KeyboardInterrupt:
+                    text = fr.payload.hex()
+                    m_decode.inc()
+                if tr:
+                    t1 = time.perf_counter_ns()
+                    tr.add('decode', t0, t1)
+                t_rec = now()
+                if int(t_rec) != ts_sec:
+                    ts_sec = int(t_rec)
+                    ts = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts_sec))
+                if not args.quiet:
+                    print(f"RX {ts} | src={fr.src_addr} @ {freq_mhz}.125 MHz | {text}")
+                if tr:
+                    t0 = time.perf_counter_ns()
+                    tr.add('print', t1, t0)
+                if sink:
+                    sink.write([ts, fr.src_addr, f"{freq_mhz}.125", text])
+                    if tr: tr.add('sink.write', t0)
+                if db:
+                    db.write((t_rec, None, fr.src_addr, freq_mhz + 0.125, fr.rssi, text))
+                if fanout and fanout.active:
+                    fanout.publish(json.dumps({'ts': ts, 'src': fr.src_addr, 'freq_mhz': f"{freq_mhz}.125",
+                                               'rssi': fr.rssi, 'payload': text},
+                                              separators=(',',':')).encode() + b'\n')
+                m_records.inc()
+                m_latency.observe(time.monotonic() - t_start)
+                if tr: tr.add('frame', t_fr)
+            # Un ACK por emisor y por ráfaga recibida, no uno por trama
+            if args.arq_ack:
+                tr = tracing.TRACER
+                if tr and ack_to: t0 = time.perf_counter_ns()
+                for src in ack_to:
+                    send_ack(src)
+                if tr and ack_to: tr.add('ack', t0)
+            if noise:
+                noise.poll()
+    except (KeyboardInterrupt, EOFError):
         pass
     finally:
-        if f: f.close()
+        rx.close()
+        if cap:
+            cap.close()
+            print(f"Captura: {cap.records} lecturas, {cap.bytes_written} bytes en {cap.path}")
+        if replay:
+            dt = time.monotonic() - t_run
+            print(f"Reproducción: {replay.reads} lecturas, {replay.bytes} bytes, {m_records.value} registros "
+                  f"en {dt:.2f} s ({m_records.value / dt:.0f} registros/s), {dev.sent} ACK no enviados")
+        if arq_rx.received:
+            print(f"ARQ: {arq_rx.received} tramas fiables, {arq_rx.duplicates} duplicadas")
+        if dedup and dedup.duplicates:
+            print(f"Repetidos: {dedup.duplicates} descartados de {dedup.checked} mensajes")
+        if reasm.completed or reasm.pending:
+            print(f"Fragmentos: {reasm.completed} mensajes completos, {reasm.pending} incompletos, "
+                  f"{reasm.timeouts} caducados, {reasm.evicted} desalojados, {reasm.duplicates} duplicados")
+        if fanout:
+            fanout.close()
+            print(f"Reparto: {fanout.connects} suscriptores, {fanout.published} registros, "
+                  f"{fanout.dropped} descartados, {fanout.disconnects} desconexiones")
+        if noise:
+            print(f"Ruido: {len(noise.samples)} medidas de {noise.sent} consultas, última {noise.last} dBm")
+        if noise_sink:
+            noise_sink.close()
+        if sink:
+            pending = sink.at_risk
+            sink.close()
+            print(f"CSV: {sink.rows_written} filas en {sink.flushes} volcados ({pending} volcadas al cerrar)")
+            if sink.rotations:
+                print(f"CSV: {sink.rotations} rotaciones, {sink.compressed} segmentos comprimidos")
+            if sink.errors:
+                print(f"CSV: {sink.errors} errores de escritura, {sink.dropped} filas perdidas")
+        if db:
+            pending = db.at_risk
+            db.close()
+            print(f"SQLite: {db.rows_written} filas en {db.flushes} transacciones ({pending} al cerrar)")
+            if db.errors:
+                print(f"SQLite: {db.errors} errores al guardar, {db.dropped} filas perdidas")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,107 @@
+"""Event-driven UART receive engine for the SX126x HAT.
+
+Instead of polling inWaiting() and sleeping, the receiver blocks on the
+serial file descriptor with a selector and wakes up as soon as the first
+byte of a frame arrives. The end of a frame is detected by an inter-byte
+idle gap (the module writes a received packet to the UART back-to-back).
+
+read_chunk_into() reads straight into a caller's buffer (the parser's, see
+framing.FrameParser.reserve) through the raw fd: pyserial's readinto()
+reads into a new bytes object and copies it.
+"""
+import io, selectors, time
+import tracing
+
+
+class SerialReceiver:
+    """Wait for UART data with a selector and group it into bursts."""
+
+    def __init__(self, ser, idle_timeout=0.03, max_burst=1024, capture=None):
+        """Args:
+            ser: open serial.Serial (or any object with fileno/in_waiting/read).
+            idle_timeout: seconds without new bytes that close a burst.
+            max_burst: upper bound of bytes returned by a single burst.
+            capture: optional capture.CaptureWriter recording every read (radio 0).
+        """
+        self.ser = ser
+        self.idle_timeout = idle_timeout
+        self.max_burst = max_burst
+        self.capture = capture
+        self.t_first_byte = 0.0  # monotonic time the last burst/chunk started
+        self._raw = None         # unbuffered FileIO over the serial fd, for readinto()
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(ser.fileno(), selectors.EVENT_READ)
+
+    def wait(self, timeout=None) -> bool:
+        """Block until the serial fd is readable or the timeout expires."""
+        return bool(self._sel.select(timeout))
+
+    def read_available(self) -> bytes:
+        """Read whatever the driver has buffered without blocking."""
+        n = self.ser.in_waiting
+        if not n:
+            return b''
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        data = self.ser.read(n)
+        if tr: tr.add('ser.read', t0)
+        if self.capture:
+            self.capture.record(0, data)
+        return data
+
+    def readinto(self, buf) -> int:
+        """Read what the driver has buffered into `buf` without blocking; return the count."""
+        n = min(self.ser.in_waiting, len(buf))
+        if not n:
+            return 0
+        if self._raw is None:
+            self._raw = io.FileIO(self.ser.fileno(), 'rb', closefd=False)
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        n = self._raw.readinto(buf[:n]) or 0   # None: EAGAIN on the non-blocking fd
+        if tr: tr.add('ser.read', t0)
+        if self.capture and n:
+            self.capture.record(0, bytes(buf[:n]))
+        return n
+
+    def read_chunk_into(self, buf, timeout=None):
+        """read_chunk() into a writable buffer: the byte count, None on timeout."""
+        if not self.wait(timeout):
+            return None
+        self.t_first_byte = time.monotonic()
+        return self.readinto(buf)
+
+    def read_chunk(self, timeout=None):
+        """Return whatever arrived as soon as the fd becomes readable.
+
+        Used with a stream parser, which does its own frame delimiting.
+        Returns None on timeout.
+        """
+        if not self.wait(timeout):
+            return None
+        self.t_first_byte = time.monotonic()
+        return self.read_available()
+
+    def read_burst(self, timeout=None):
+        """Return the next burst of bytes.
+
+        Returns None if nothing arrived within `timeout` seconds (None waits
+        forever) and b'' if the fd woke up without data (e.g. hangup).
+        """
+        if not self.wait(timeout):
+            return None
+        self.t_first_byte = time.monotonic()
+        buf = bytearray(self.read_available())
+        if not buf:
+            return b''
+        while len(buf) < self.max_burst and self.wait(self.idle_timeout):
+            chunk = self.read_available()
+            if not chunk:
+                break
+            buf += chunk
+        return bytes(buf)
+
+    def close(self):
+        self._sel.close()
+        if self._raw is not None:
+            self._raw.close()   # closefd=False: the port itself stays open
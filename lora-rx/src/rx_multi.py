@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""Receiver daemon for a gateway with several HATs.
+
+One process and one selector for every radio: each UART is registered with
+the same selector and keeps its own FrameParser, Reassembler and ARQ state,
+so a quiet radio costs nothing and a busy one never waits for another.
+Every record is tagged with the id of the radio that heard it and all
+radios share one CSV sink (and SQLite database). Decoding payloads to text
+(binary telemetry to JSON) can be spread over a process pool with
+--workers; records are still printed and logged in arrival order.
+
+Radios are given with --radio (repeatable) or RX_RADIOS (';'-separated):
+
+    id=serial[,freq=868][,air=2400][,addr=0][,power=22][,m0=22][,m1=27]
+
+Missing fields take the global --freq/--airspeed/--addr/--power. Modules on
+the Pi's GPIO header need their own M0/M1 pins; USB adapters usually have
+them strapped with jumpers and ignore the pins.
+"""
+import os, sys, argparse, time, signal, json, selectors, collections, shutil
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from sx126x import sx126x
+from framing import FrameParser
+from csv_sink import CsvSink
+from sqlite_sink import SqliteSink
+import telemetry_codec
+from fragment import Reassembler, is_fragment
+import framing, arq, tracing, capture
+from noise_floor import NoiseSampler
+from dedup import DedupCache
+from fanout import FanoutServer
+
+load_dotenv()
+
+_SPEC_KEYS = {'freq': int, 'air': int, 'addr': int, 'power': int, 'm0': int, 'm1': int}
+
+
+def parse_radio(spec: str, defaults: dict) -> dict:
+    """Parse 'id=serial,key=value,...' into a dict of radio settings."""
+    head, *opts = [p.strip() for p in spec.split(',') if p.strip()]
+    rid, sep, port = head.partition('=')
+    if not sep or not rid or not port:
+        raise ValueError(f"radio '{spec}': expected id=serial[,freq=..,air=..]")
+    cfg = dict(defaults, id=rid, serial=port)
+    for opt in opts:
+        key, sep, value = opt.partition('=')
+        if not sep or key not in _SPEC_KEYS:
+            raise ValueError(f"radio '{spec}': unknown option '{opt}' (valid: {', '.join(_SPEC_KEYS)})")
+        cfg[key] = _SPEC_KEYS[key](value)
+    return cfg
+
+
+def payload_text(payload) -> str:
+    """Text of a payload as logged: binary telemetry as JSON, text as is, else hex."""
+    try:
+        if telemetry_codec.is_binary(payload):
+            return json.dumps(telemetry_codec.decode(payload), separators=(',',':'))
+        return payload.decode()
+    except Exception:
+        return payload.hex()
+
+
+def decode_batch(payloads) -> list:
+    """payload_text() over a batch (runs in a worker process)."""
+    return [payload_text(p) for p in payloads]
+
+
+class Radio:
+    """One HAT: its driver, stream parser and per-radio protocol state."""
+
+    def __init__(self, rid, dev, reasm_timeout=30.0, reasm_max=64, arq_ack=True, dedup=None):
+        """dedup: DedupCache, usually shared by every radio of the gateway."""
+        self.id = rid
+        self.dev = dev
+        self.parser = FrameParser(rssi=dev.rssi)
+        self.reasm = Reassembler(timeout_s=reasm_timeout, max_messages=reasm_max)
+        self.arq_rx = arq.ArqReceiver()
+        self.arq_ack = arq_ack
+        self.dedup = dedup
+        self.t_last = time.monotonic()    # last time bytes arrived
+        self.noise = None                 # optional NoiseSampler on self.parser
+        self.capture = None               # optional CaptureWriter, this radio being index `cap_idx`
+        self.cap_idx = 0
+        self.frames = 0
+        self.records = 0
+
+    def read(self) -> list:
+        """Read what the UART has and return the records it completes.
+
+        A record is (frame, payload) with fragments reassembled and the ARQ
+        header removed; duplicates and ACK frames are consumed here.
+        """
+        ser = self.dev.ser
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        data = ser.read(ser.in_waiting or 1)
+        if not data:
+            return []
+        self.t_last = time.monotonic()
+        if tr: tr.add('ser.read', t0)
+        if self.capture:
+            self.capture.record(self.cap_idx, data)
+        out, ack_to = [], set()
+        for fr in self.parser.feed(data):
+            self.frames += 1
+            payload = fr.payload
+            if arq.is_data(payload):
+                # acknowledged even when it is a duplicate: its ACK was lost
+                seq, payload = arq.unwrap(payload)
+                ack_to.add(fr.src_addr)
+                if not self.arq_rx.on_data(fr.src_addr, seq):
+                    continue
+            elif arq.is_ack(payload):
+                continue
+            if is_fragment(payload):
+                payload = self.reasm.add(fr.src_addr, payload)
+                if payload is None:
+                    continue
+            if self.dedup and self.dedup.seen(fr.src_addr, payload):
+                continue
+            out.append((fr, payload))
+        if tr: tr.add(f'read {self.id}', t0)
+        if self.arq_ack:
+            # one ACK per sender and per chunk, as rx_basic.py does per burst
+            for src in ack_to:
+                body = framing.encode(self.dev.addr, self.dev.offset_freq, self.arq_rx.ack(src))
+                self.dev.send(bytes([(src >> 8) & 0xFF, src & 0xFF, self.dev.offset_freq]) + body)
+        self.records += len(out)
+        return out
+
+    def idle(self, now, timeout=1.0):
+        """Drop a partial frame left hanging after `timeout` seconds of silence."""
+        if self.parser.pending and now - self.t_last >= timeout:
+            self.parser.flush()
+        if self.noise:
+            self.noise.poll(now)
+
+
+class Gateway:
+    """Multiplex several Radio objects on one selector into shared outputs."""
+
+    def __init__(self, radios, on_record, workers=0, idle_timeout=1.0):
+        """Args:
+            radios: Radio objects (their serial ports must expose fileno()).
+            on_record: callable(ts, radio_id, frame, text), in arrival order.
+            workers: decoding processes (0 decodes inline in the loop).
+            idle_timeout: silence after which a partial frame is dropped.
+        """
+        self.radios = radios
+        self.on_record = on_record
+        self.idle_timeout = idle_timeout
+        self._sel = selectors.DefaultSelector()
+        for r in radios:
+            self._sel.register(r.dev.ser.fileno(), selectors.EVENT_READ, r)
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._queue = collections.deque()    # (records, future) in arrival order
+        if self._pool:
+            # finished batches wake the selector through this pipe
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            os.set_blocking(self._wake_w, False)
+            self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def _emit(self, records, texts):
+        for (ts, rid, fr, payload), text in zip(records, texts):
+            self.on_record(ts, rid, fr, text)
+
+    def _wake(self, _fut):
+        # Runs in the pool's result thread: never block it. A full pipe already
+        # holds a wake-up; after close() the fd is -1 and the write just fails.
+        try:
+            os.write(self._wake_w, b'\0')
+        except OSError:
+            pass
+
+    def _drain(self):
+        """Emit decoded batches from the head of the queue, in order."""
+        while self._queue and self._queue[0][1].done():
+            records, fut = self._queue.popleft()
+            self._emit(records, fut.result())
+
+    def poll(self, timeout=1.0):
+        """Wait for data on any radio (or a finished batch) and handle it."""
+        batch = []
+        for key, _ in self._sel.select(timeout):
+            radio = key.data
+            if radio is None:
+                try:
+                    os.read(self._wake_r, 512)
+                except BlockingIOError:
+                    pass
+                continue
+            ts = time.strftime('%Y-%m-%dT%H:%M:%S')
+            batch.extend((ts, radio.id, fr, payload) for fr, payload in radio.read())
+        now = time.monotonic()
+        for radio in self.radios:
+            radio.idle(now, self.idle_timeout)
+        if batch:
+            if self._pool:
+                fut = self._pool.submit(decode_batch, [rec[3] for rec in batch])
+                fut.add_done_callback(self._wake)
+                self._queue.append((batch, fut))
+            else:
+                tr = tracing.TRACER
+                if tr: t0 = time.perf_counter_ns()
+                texts = [payload_text(rec[3]) for rec in batch]
+                if tr: tr.add('decode', t0)
+                self._emit(batch, texts)
+        self._drain()
+
+    def close(self):
+        """Emit what is still being decoded and release the selector/pool."""
+        if self._pool:
+            for records, fut in self._queue:
+                self._emit(records, fut.result())
+            self._queue.clear()
+            # only once the pool is down can no done-callback write to the pipe
+            self._pool.shutdown(wait=True)
+            wake_r, wake_w = self._wake_r, self._wake_w
+            self._wake_r = self._wake_w = -1
+            self._sel.unregister(wake_r)
+            os.close(wake_r)
+            os.close(wake_w)
+        self._sel.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Receptor para varios HAT en un mismo gateway')
+    ap.add_argument('--radio', action='append', default=None,
+                    help='id=serial[,freq=..,air=..,addr=..,power=..,m0=..,m1=..] (repetible)')
+    ap.add_argument('--freq', type=int, default=int(os.getenv('FREQ','915')))
+    ap.add_argument('--addr', type=int, default=int(os.getenv('ADDR','0')))
+    ap.add_argument('--power', type=int, default=int(os.getenv('POWER','22')))
+    ap.add_argument('--airspeed', type=int, default=int(os.getenv('AIRSPEED','2400')))
+    ap.add_argument('--csv', default=os.getenv('RX_CSV',''))
+    ap.add_argument('--csv-flush-rows', type=int, default=int(os.getenv('RX_CSV_FLUSH_ROWS','20')),
+                    help='Volcar el CSV cada N filas')
+    ap.add_argument('--csv-flush-ms', type=float, default=float(os.getenv('RX_CSV_FLUSH_MS','1000')),
+                    help='Volcar el CSV como mucho T ms después de recibir una fila')
+    ap.add_argument('--csv-rotate-mb', type=float, default=float(os.getenv('RX_CSV_ROTATE_MB','0')),
+                    help='Rotar el CSV al llegar a N MB (0 = no)')
+    ap.add_argument('--csv-rotate-s', type=float, default=float(os.getenv('RX_CSV_ROTATE_S','0')),
+                    help='Rotar el CSV cada N segundos en punto, hora local: 3600, 86400... (0 = no)')
+    ap.add_argument('--csv-compress', choices=['gzip','zstd','none'], default=os.getenv('RX_CSV_COMPRESS','gzip'),
+                    help='Compresión de los segmentos cerrados (en un hilo aparte)')
+    ap.add_argument('--db', default=os.getenv('RX_DB',''),
+                    help='Base de datos SQLite donde guardar también los registros (vacío = no)')
+    ap.add_argument('--db-retention-days', type=float, default=float(os.getenv('RX_DB_RETENTION_DAYS','0')),
+                    help='Borrar de la base de datos los registros de más de N días (0 = guardar todo)')
+    ap.add_argument('--reasm-timeout', type=float, default=float(os.getenv('RX_REASM_TIMEOUT_S','30')),
+                    help='Segundos que se espera a los fragmentos de un mensaje antes de descartarlo')
+    ap.add_argument('--reasm-max', type=int, default=int(os.getenv('RX_REASM_MAX','64')),
+                    help='Mensajes fragmentados incompletos que se guardan como máximo (por radio)')
+    ap.add_argument('--dedup-s', type=float, default=float(os.getenv('RX_DEDUP_S','30')),
+                    help='Descartar los mensajes repetidos vistos hace menos de N s, por cualquier radio (0 = no)')
+    ap.add_argument('--dedup-max', type=int, default=int(os.getenv('RX_DEDUP_MAX','4096')),
+                    help='Mensajes recordados como máximo para detectar repetidos')
+    ap.add_argument('--dedup-hash', type=int, default=int(os.getenv('RX_DEDUP_HASH','0')),
+                    help='1: tratar también como repetidos los mensajes sin seq idénticos byte a byte')
+    ap.add_argument('--arq-ack', type=int, default=int(os.getenv('RX_ARQ_ACK','1')),
+                    help='1: responder con ACK a las tramas fiables (TX con ARQ=1)')
+    ap.add_argument('--workers', type=int, default=int(os.getenv('RX_WORKERS','0')),
+                    help='Procesos para decodificar las cargas (0 = en el propio bucle)')
+    ap.add_argument('--quiet', type=int, default=int(os.getenv('RX_QUIET','0')),
+                    help='1: no imprimir cada trama (sólo CSV)')
+    ap.add_argument('--noise-s', type=float, default=float(os.getenv('RX_NOISE_S','0')),
+                    help='Medir el ruido de cada radio cada N segundos sin parar la recepción (0 = no)')
+    ap.add_argument('--noise-csv', default=os.getenv('RX_NOISE_CSV',''),
+                    help='CSV donde guardar las medidas de ruido (ts,radio,noise_dbm)')
+    ap.add_argument('--fanout', default=os.getenv('RX_FANOUT',''),
+                    help='Socket UNIX donde publicar cada registro como una línea JSON (vacío = no)')
+    ap.add_argument('--fanout-queue', type=int, default=int(os.getenv('RX_FANOUT_QUEUE','1000')),
+                    help='Registros en cola por suscriptor antes de aplicar la política')
+    ap.add_argument('--fanout-policy', choices=['drop-oldest','disconnect'],
+                    default=os.getenv('RX_FANOUT_POLICY','drop-oldest'),
+                    help='Suscriptor lento: descartar lo más antiguo o desconectarlo')
+    ap.add_argument('--capture', default=os.getenv('RX_CAPTURE',''),
+                    help='Fichero donde grabar cada lectura de cada UART con su tiempo e id de radio (vacío = no)')
+    ap.add_argument('--fast-start', type=int, default=int(os.getenv('FAST_START','1')),
+                    help='1: leer los registros del módulo y no reescribirlos si ya coinciden')
+    ap.add_argument('--cfg-cache', default=os.getenv('CFG_CACHE',''),
+                    help='Directorio de caché de la configuración aplicada por puerto (vacío = sin caché)')
+    args = ap.parse_args()
+    tracing.setup_from_env()
+
+    specs = args.radio or [s for s in os.getenv('RX_RADIOS','').split(';') if s.strip()]
+    if not specs:
+        ap.error('no radios: use --radio id=serial[,...] or RX_RADIOS')
+    defaults = {'freq': args.freq, 'air': args.airspeed, 'addr': args.addr, 'power': args.power,
+                'm0': None, 'm1': None}
+    try:
+        cfgs = [parse_radio(s, defaults) for s in specs]
+    except ValueError as e:
+        ap.error(str(e))
+    if len({c['id'] for c in cfgs}) != len(cfgs):
+        ap.error('radio ids must be unique')
+    # Rotación por tamaño/hora: el hilo del CSV cambia de fichero entre dos volcados
+    # y otro hilo comprime el segmento cerrado (índice en <csv>.manifest.csv)
+    rotation = dict(max_bytes=int(args.csv_rotate_mb * 1e6), rotate_s=args.csv_rotate_s, compress=args.csv_compress)
+    if args.csv_compress == 'zstd' and (args.csv_rotate_mb or args.csv_rotate_s) and not shutil.which('zstd'):
+        ap.error('--csv-compress zstd needs the zstd program (apt install zstd)')
+
+    # Un mismo mensaje oído por dos radios (o repetido por un relé) se registra una vez
+    dedup = DedupCache(args.dedup_s, args.dedup_max, hash_unkeyed=bool(args.dedup_hash)) if args.dedup_s > 0 else None
+    # Se configuran uno tras otro: módulos que compartan M0/M1 pasan juntos por configuración
+    radios = []
+    for c in cfgs:
+        t0 = time.monotonic()
+        dev = sx126x(serial_num=c['serial'], freq=c['freq'], addr=c['addr'], power=c['power'],
+                     rssi=True, air_speed=c['air'], relay=False,
+                     fast_start=bool(args.fast_start), cfg_cache=args.cfg_cache or None,
+                     m0_pin=c['m0'], m1_pin=c['m1'])
+        dev.ser.timeout = 0
+        cfg = dev.config
+        print(f"Radio {c['id']}: {c['serial']} @ {c['freq']}.125 MHz air={c['air']}bps lista en "
+              f"{(time.monotonic() - t0) * 1000:.0f} ms (registros: {cfg.source}, escrituras={cfg.attempts})")
+        if not cfg.ok:
+            print(f"⚠️  {c['id']}: el módulo no confirmó la configuración (revisa jumpers, M0/M1 y el puerto serie)")
+        radios.append(Radio(c['id'], dev, args.reasm_timeout, args.reasm_max, bool(args.arq_ack), dedup))
+    by_id = {r.id: r for r in radios}
+    cap = None
+    if args.capture.strip():
+        cap = capture.CaptureWriter(args.capture, [capture.radio_info(r.id, r.dev) for r in radios])
+        for i, r in enumerate(radios):
+            r.capture, r.cap_idx = cap, i
+
+    sink = None
+    if args.csv.strip():
+        sink = CsvSink(args.csv, ['ts','radio','src_addr','freq_mhz','rssi','payload'],
+                       flush_rows=args.csv_flush_rows, flush_ms=args.csv_flush_ms, **rotation)
+    db = SqliteSink(args.db, retention_days=args.db_retention_days) if args.db.strip() else None
+    noise_sink = None
+    if args.noise_s > 0:
+        if args.noise_csv.strip():
+            noise_sink = CsvSink(args.noise_csv, ['ts','radio','noise_dbm'],
+                                 flush_rows=args.csv_flush_rows, flush_ms=args.csv_flush_ms, **rotation)
+        for i, r in enumerate(radios):
+            def on_noise(t, dbm, rid=r.id):
+                if noise_sink:
+                    noise_sink.write([time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(t)), rid, dbm])
+
+            def on_query(sent, i=i):
+                if cap:
+                    cap.event(i, capture.EV_NOISE_QUERY if sent else capture.EV_NOISE_CANCEL)
+            r.noise = NoiseSampler(r.dev, r.parser, interval=args.noise_s, on_sample=on_noise, on_query=on_query)
+    fanout = None
+    if args.fanout.strip():
+        fanout = FanoutServer(args.fanout, args.fanout_queue, args.fanout_policy)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    def on_record(ts, rid, fr, text):
+        freq_mhz = by_id[rid].dev.start_freq + fr.chan
+        if not args.quiet:
+            print(f"RX {ts} | radio={rid} | src={fr.src_addr} @ {freq_mhz}.125 MHz | {text}")
+        if sink:
+            sink.write([ts, rid, fr.src_addr, f"{freq_mhz}.125", '' if fr.rssi is None else fr.rssi, text])
+        if db:
+            db.write((time.time(), rid, fr.src_addr, freq_mhz + 0.125, fr.rssi, text))
+        if fanout and fanout.active:
+            fanout.publish(json.dumps({'ts': ts, 'radio': rid, 'src': fr.src_addr, 'freq_mhz': f"{freq_mhz}.125",
+                                       'rssi': fr.rssi, 'payload': text}, separators=(',',':')).encode() + b'\n')
+
+    gw = Gateway(radios, on_record, workers=args.workers)
+    print(f"RX multi: {len(radios)} radios, workers={args.workers} (CTRL+C para salir)")
+    try:
+        while True:
+            gw.poll(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gw.close()
+        for r in radios:
+            r.dev.ser.close()
+            print(f"{r.id}: {r.frames} tramas, {r.records} registros, ARQ {r.arq_rx.duplicates} duplicadas, "
+                  f"fragmentos {r.reasm.completed} completos / {r.reasm.pending} incompletos, "
+                  f"{r.parser.bad_checksum} checksum erróneos")
+            if r.noise:
+                print(f"{r.id}: ruido {len(r.noise.samples)} medidas de {r.noise.sent} consultas, "
+                      f"última {r.noise.last} dBm")
+        if noise_sink:
+            noise_sink.close()
+        if cap:
+            cap.close()
+            print(f"Captura: {cap.records} lecturas, {cap.bytes_written} bytes en {cap.path}")
+        if fanout:
+            fanout.close()
+            print(f"Reparto: {fanout.connects} suscriptores, {fanout.published} registros, "
+                  f"{fanout.dropped} descartados, {fanout.disconnects} desconexiones")
+        if dedup and dedup.duplicates:
+            print(f"Repetidos: {dedup.duplicates} descartados de {dedup.checked} mensajes")
+        if sink:
+            pending = sink.at_risk
+            sink.close()
+            print(f"CSV: {sink.rows_written} filas en {sink.flushes} volcados ({pending} volcadas al cerrar)")
+            if sink.rotations:
+                print(f"CSV: {sink.rotations} rotaciones, {sink.compressed} segmentos comprimidos")
+            if sink.errors:
+                print(f"CSV: {sink.errors} errores de escritura, {sink.dropped} filas perdidas")
+        if db:
+            pending = db.at_risk
+            db.close()
+            print(f"SQLite: {db.rows_written} filas en {db.flushes} transacciones ({pending} al cerrar)")
+            if db.errors:
+                print(f"SQLite: {db.errors} errores al guardar, {db.dropped} filas perdidas")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""SQLite sink for received records, with indexed queries.
+
+Same contract as CsvSink: the receive loop only appends rows to an
+in-memory batch and a background thread commits it, here as one
+transaction (executemany) per batch, when it reaches `flush_rows`, when the
+oldest pending row is `flush_ms` old, or on close(). The database is in WAL
+mode with synchronous=NORMAL, so a commit is an append to the WAL and
+readers (the query CLI, dashboards) never block the writer.
+
+    frames(id, ts, radio, src_addr, freq_mhz, rssi, station, seq, payload)
+
+ts is unix time (seconds), radio the rx_multi.py radio id (NULL from
+rx_basic.py). station and seq come from the payload (JSON
+text, including decoded binary telemetry) and are NULL for anything else;
+they are extracted in the writer thread, not in the receive loop. Indexes
+on ts, (src_addr, ts), (station, ts) and (station, seq) answer "last 24 h
+of station REVN" or "seq 1234 of tx01" without a table scan.
+
+With `retention_days`, the writer thread deletes older rows every
+PRUNE_EVERY_S seconds in chunks of PRUNE_CHUNK rows, between batches, and
+hands the freed pages back with an incremental vacuum.
+
+A batch that fails to commit (file locked past the busy timeout, disk
+full) is rolled back and put back in front of the pending rows, and the
+commit is retried every RETRY_S seconds. At most MAX_BACKLOG rows are kept
+that way; older ones, and whatever still fails on close(), are dropped and
+counted.
+
+Run the module to query a database:
+
+    python src/sqlite_sink.py rx.db --station REVN --since 24h
+    python src/sqlite_sink.py rx.db --src 101 --last 20 --format json
+"""
+import argparse, csv, json, os, sqlite3, sys, threading, time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    id       INTEGER PRIMARY KEY,
+    ts       REAL NOT NULL,
+    radio    TEXT,
+    src_addr INTEGER NOT NULL,
+    freq_mhz REAL,
+    rssi     INTEGER,
+    station  TEXT,
+    seq      INTEGER,
+    payload  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frames_ts ON frames(ts);
+CREATE INDEX IF NOT EXISTS frames_src_ts ON frames(src_addr, ts);
+CREATE INDEX IF NOT EXISTS frames_station_ts ON frames(station, ts);
+CREATE INDEX IF NOT EXISTS frames_station_seq ON frames(station, seq);
+"""
+INSERT = ("INSERT INTO frames (ts, radio, src_addr, freq_mhz, rssi, station, seq, payload) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+COLUMNS = ('ts', 'radio', 'src_addr', 'freq_mhz', 'rssi', 'station', 'seq', 'payload')
+
+
+def connect(path, readonly=False) -> sqlite3.Connection:
+    """Open `path` in WAL mode with the schema in place."""
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    # auto_vacuum only takes effect on a new database (before the first table)
+    db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def station_seq(text):
+    """(station, seq) of a JSON payload, (None, None) for anything else."""
+    if not text.startswith('{'):
+        return None, None
+    try:
+        obj = json.loads(text)
+    except ValueError:
+        return None, None
+    if not isinstance(obj, dict):
+        return None, None
+    station, seq = obj.get('station'), obj.get('seq')
+    return (str(station) if station is not None else None,
+            seq if isinstance(seq, int) else None)
+
+
+class SqliteSink:
+    """Batched SQLite writer committing from its own thread."""
+    PRUNE_EVERY_S = 3600.0
+    PRUNE_CHUNK = 5000
+    RETRY_S = 5.0           # wait after a failed commit before the next attempt
+    MAX_BACKLOG = 100000    # rows kept for retries while commits keep failing
+
+    def __init__(self, path, flush_rows=200, flush_ms=1000, retention_days=0):
+        """Args:
+            path: database file (created with the schema if missing).
+            flush_rows: commit as soon as this many rows are pending.
+            flush_ms: commit pending rows at most this many ms after they arrive.
+            retention_days: delete rows older than this (0 = keep everything).
+        """
+        self.path = path
+        self.flush_rows = max(1, flush_rows)
+        self.flush_s = flush_ms / 1000.0
+        self.retention_s = retention_days * 86400.0
+        self._db = connect(path)
+        self._rows = []
+        self._inflight = 0
+        self._closing = False
+        self._cond = threading.Condition()
+        self._next_prune = time.monotonic()
+        self.rows_written = 0
+        self.flushes = 0
+        self.pruned = 0
+        self.errors = 0
+        self.dropped = 0         # rows given up after failed commits
+        self._thread = threading.Thread(target=self._run, name='sqlite-sink', daemon=True)
+        self._thread.start()
+
+    @property
+    def at_risk(self) -> int:
+        """Rows accepted but not yet committed (lost on a crash)."""
+        with self._cond:
+            return len(self._rows) + self._inflight
+
+    def write(self, row):
+        """Queue one (ts, radio, src_addr, freq_mhz, rssi, payload) row; never blocks on I/O."""
+        with self._cond:
+            self._rows.append(row)
+            n = len(self._rows)
+            if n == 1 or n >= self.flush_rows:
+                self._cond.notify()  # start the flush_ms timer / commit a full batch
+
+    def _run(self):
+        retry = False
+        while True:
+            with self._cond:
+                if retry and not self._closing:
+                    # the last commit failed: give the lock holder or the disk some time
+                    self._cond.wait_for(lambda: self._closing, timeout=self.RETRY_S)
+                elif not self._rows and not self._closing:
+                    # idle: only wake up for the retention job
+                    self._cond.wait(self.PRUNE_EVERY_S if self.retention_s else None)
+                if not retry and self._rows and not self._closing and len(self._rows) < self.flush_rows:
+                    self._cond.wait_for(lambda: self._closing or len(self._rows) >= self.flush_rows,
+                                        timeout=self.flush_s)
+                batch, self._rows = self._rows, []
+                self._inflight = len(batch)
+                closing = self._closing
+            retry = bool(batch) and not self._commit(batch, closing)
+            with self._cond:
+                self._inflight = 0
+            if self.retention_s and time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + self.PRUNE_EVERY_S
+                self.prune(time.time() - self.retention_s)
+            if closing:
+                self._db.close()
+                return
+
+    def _commit(self, batch, closing=False) -> bool:
+        """Commit one batch; on failure put it back for a retry (or drop it on close)."""
+        rows = []
+        for ts, radio, src, freq, rssi, text in batch:
+            station, seq = station_seq(text)
+            rows.append((ts, radio, src, freq, rssi, station, seq, text))
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany(INSERT, rows)
+            self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            # keep receiving (and the CSV, if any) when the disk is full or the file is locked
+            self.errors += 1
+            try:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            if closing:
+                self.dropped += len(batch)
+                print(f"SQLite: se pierden {len(batch)} filas: {e}", file=sys.stderr)
+                return False
+            print(f"SQLite: no se pudieron guardar {len(batch)} filas, reintento en {self.RETRY_S:g} s: {e}",
+                  file=sys.stderr)
+            with self._cond:
+                self._rows[:0] = batch
+                excess = len(self._rows) - self.MAX_BACKLOG
+                if excess > 0:
+                    del self._rows[:excess]
+                    self.dropped += excess
+            return False
+        self.rows_written += len(rows)
+        self.flushes += 1
+        return True
+
+    def prune(self, before) -> int:
+        """Delete rows with ts < `before`, giving way to a full batch of new rows."""
+        def busy():
+            with self._cond:
+                return len(self._rows) >= self.flush_rows
+        try:
+            n = prune(self._db, before, self.PRUNE_CHUNK, busy)
+        except sqlite3.Error as e:
+            # locked by another pruner (--prune-days) or disk full: retry next round,
+            # the writer thread must survive to keep committing
+            self.errors += 1
+            print(f"SQLite: no se pudieron borrar filas antiguas: {e}", file=sys.stderr)
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            return 0
+        self.pruned += n
+        return n
+
+    def close(self):
+        """Commit everything still pending and close the database."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+
+
+def prune(db, before, chunk=5000, busy=lambda: False) -> int:
+    """Delete rows with ts < `before` in transactions of `chunk` rows.
+
+    Stops early (the rest goes on the next round) when busy() is true.
+    Returns the number of rows deleted.
+    """
+    total = 0
+    while not busy():
+        n = db.execute("DELETE FROM frames WHERE id IN "
+                       "(SELECT id FROM frames WHERE ts < ? ORDER BY ts LIMIT ?)", (before, chunk)).rowcount
+        total += n
+        if n < chunk:
+            break
+    if total:
+        db.execute("PRAGMA incremental_vacuum")
+    return total
+
+
+def parse_age(s) -> float:
+    """'90s', '15m', '24h', '7d' (or plain seconds) -> seconds."""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if s and s[-1] in units:
+        return float(s[:-1]) * units[s[-1]]
+    return float(s)
+
+
+def build_query(station=None, src=None, seq=None, radio=None, since=None, until=None, last=None):
+    """(sql, args) selecting COLUMNS, oldest first, matching every given filter."""
+    where, args = [], []
+    for col, op, v in (('station', '=', station), ('src_addr', '=', src), ('seq', '=', seq),
+                       ('radio', '=', radio), ('ts', '>=', since), ('ts', '<', until)):
+        if v is not None:
+            where.append(f"{col} {op} ?")
+            args.append(v)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM frames"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if last:
+        sql = f"SELECT * FROM ({sql} ORDER BY ts DESC LIMIT {int(last)}) ORDER BY ts"
+    else:
+        sql += " ORDER BY ts"
+    return sql, args
+
+
+def query(db, **filters):
+    """Cursor over the rows matching `filters` (see build_query)."""
+    return db.execute(*build_query(**filters))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Consultar la base de datos SQLite del receptor')
+    ap.add_argument('db', nargs='?', default=os.getenv('RX_DB',''))
+    ap.add_argument('--station', help='Estación (campo station de la telemetría)')
+    ap.add_argument('--src', type=int, help='Dirección de origen')
+    ap.add_argument('--seq', type=int, help='Número de secuencia')
+    ap.add_argument('--radio', help='Radio que lo recibió (rx_multi.py)')
+    ap.add_argument('--since', help='Desde hace cuánto: 90s, 15m, 24h, 7d')
+    ap.add_argument('--until', help='Hasta hace cuánto (mismo formato)')
+    ap.add_argument('--last', type=int, help='Sólo las N filas más recientes')
+    ap.add_argument('--format', choices=['csv','json','count'], default='csv')
+    ap.add_argument('--explain', action='store_true', help='Mostrar el plan de la consulta (índices usados)')
+    ap.add_argument('--prune-days', type=float, default=0, help='Borrar las filas de más de N días y salir')
+    args = ap.parse_args()
+    if not args.db:
+        ap.error('no database: pass its path or set RX_DB')
+    if not os.path.exists(args.db):
+        ap.error(f'{args.db}: no such database')
+    if args.prune_days:
+        db = connect(args.db)
+        n = prune(db, time.time() - args.prune_days * 86400)
+        db.close()
+        print(f"{n} filas borradas")
+        return
+    db = connect(args.db, readonly=True)
+    now = time.time()
+    filters = dict(station=args.station, src=args.src, seq=args.seq, radio=args.radio, last=args.last,
+                   since=now - parse_age(args.since) if args.since else None,
+                   until=now - parse_age(args.until) if args.until else None)
+    if args.explain:
+        sql, sql_args = build_query(**filters)
+        for row in db.execute("EXPLAIN QUERY PLAN " + sql, sql_args):
+            print(row[-1], file=sys.stderr)
+    t0 = time.perf_counter()
+    rows = query(db, **filters)
+    if args.format == 'count':
+        n = sum(1 for _ in rows)
+        print(n)
+    elif args.format == 'json':
+        n = 0
+        for r in rows:
+            print(json.dumps(dict(zip(COLUMNS, r)), ensure_ascii=False, separators=(',',':')))
+            n += 1
+    else:
+        out = csv.writer(sys.stdout)
+        out.writerow(COLUMNS)
+        n = 0
+        for r in rows:
+            out.writerow((time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(r[0])),) + r[1:])
+            n += 1
+    print(f"{n} filas en {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,11 +3,35 @@
 import RPi.GPIO as GPIO
 import serial
 import time
+import collections
+import json
+import os
+from airtime import frame_airtime, uart_time
+from framing import FrameParser, NOISE_CMD
+import tracing
+
+# Resultado de sx126x.set(): qué registros tiene el módulo y cuánto costó
+class ConfigResult:
+    __slots__ = ('ok', 'source', 'reg', 'attempts', 'elapsed_ms')
+
+    def __init__(self, ok, source, reg, attempts, elapsed_ms):
+        self.ok = ok                    # el módulo tiene los registros pedidos
+        self.source = source            # memory | cache | readback | written | failed
+        self.reg = reg                  # 9 registros de parámetros (00H-08H) aplicados
+        self.attempts = attempts        # escrituras enviadas (0 si se omitió)
+        self.elapsed_ms = elapsed_ms
+
+    def __repr__(self):
+        return 'ConfigResult(ok=%s, source=%s, attempts=%d, elapsed_ms=%.1f, reg=%s)' % (
+            self.ok, self.source, self.attempts, self.elapsed_ms, ' '.join('%02X' % b for b in self.reg))
 
 class sx126x:
 
     M0 = 22
     M1 = 27
+    # niveles M0/M1 de cada modo: normal (LOW/LOW) y configuración (HIGH/HIGH, E22/E32)
+    MODE_NORMAL = (GPIO.LOW,GPIO.LOW)
+    MODE_CONFIG = (GPIO.HIGH,GPIO.HIGH)
     # if the header is 0xC0, then the LoRa register settings dont lost when it poweroff, and 0xC2 will be lost. 
     # cfg_reg = [0xC0,0x00,0x09,0x00,0x00,0x00,0x62,0x00,0x17,0x43,0x00,0x00]
     cfg_reg = [0xC2,0x00,0x09,0x00,0x00,0x00,0x62,0x00,0x12,0x43,0x00,0x00]
@@ -16,6 +40,23 @@ class sx126x:
     addr = 65535
     serial_n = ""
     addr_temp = 0
+    parser = None
+    mode = None         # last M0/M1 levels driven (None = unknown)
+    _mode_t = 0.0       # monotonic time of the last M0/M1 change
+    CONFIG_SETTLE = 0.1  # seconds the module needs after entering config mode
+    fast_start = False  # read registers back and skip the write when they match
+    cfg_cache = None    # directory of the per-port cache of applied registers
+    cfg_source = None   # how set() got the registers (see ConfigResult.source)
+    config = None       # ConfigResult of the last set()
+    _applied = None     # cfg_reg the module acknowledged in this process
+    CONFIG_TRIES = 3    # register writes per set() before giving up
+    ACK_TIMEOUT = 0.3   # deadline for the 12-byte 0xC1 answer to each write
+    aux = None          # optional BCM pin wired to the module AUX output
+    NOISE_INTERVAL = 10.0  # seconds between the noise queries receive() sends
+    noise_rssi = None   # last noise floor reported by the module (dBm)
+    _noise_t = 0.0
+    # frames allowed between the UART and the air before send() waits
+    MAX_INFLIGHT = 2
 
     #
     # start frequence of two lora module
@@ -79,20 +120,37 @@ class sx126x:
 
     def __init__(self,serial_num,freq,addr,power,rssi,air_speed=2400,\
                  net_id=0,buffer_size = 240,crypt=0,\
-                 skip_config=False, relay=False,lbt=False,wor=False):
+                 skip_config=False, relay=False,lbt=False,wor=False,aux_pin=None,\
+                 fast_start=False,cfg_cache=None,m0_pin=None,m1_pin=None):
         self.rssi = rssi
         self.addr = addr
         self.freq = freq
         self.serial_n = serial_num
         self.power = power
+        self.air_speed = air_speed
+        self.buffer_size = buffer_size
+        # Arranque rápido: no reescribir registros que el módulo ya tiene
+        self.fast_start = fast_start
+        self.cfg_cache = cfg_cache
+        # Pines M0/M1 propios (otro módulo en el mismo gateway); por defecto 22/27
+        if m0_pin is not None:
+            self.M0 = m0_pin
+        if m1_pin is not None:
+            self.M1 = m1_pin
         # Initial the GPIO for M0 and M1 Pin
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
         GPIO.setup(self.M0,GPIO.OUT)
         GPIO.setup(self.M1,GPIO.OUT)
-        # Entrar a modo configuración al iniciar: M0=HIGH, M1=HIGH (E22/E32)
-        GPIO.output(self.M0,GPIO.HIGH)
-        GPIO.output(self.M1,GPIO.HIGH)
+        # Pin AUX opcional del módulo (HIGH = libre)
+        if aux_pin is not None:
+            GPIO.setup(aux_pin,GPIO.IN)
+            self.aux = aux_pin
+        self._inflight = collections.deque()   # estimated end of air time per frame
+        self._backlog = []   # tramas leídas por get_channel_rssi() para receive()
+        self._uart_done = 0.0
+        # M0/M1 los fija set() (configuración, M0=HIGH, M1=HIGH) o el modo normal de abajo;
+        # así un arranque rápido con registros ya aplicados no pasa por configuración
 
         # The hardware UART of Pi3B+,Pi4B is /dev/ttyS0
         self.ser = serial.Serial(serial_num,9600)
@@ -108,20 +166,36 @@ class sx126x:
                 self.start_freq = 410
                 self.offset_freq = freq - 410
             # Poner modo normal
-            GPIO.output(self.M0,GPIO.LOW)
-            GPIO.output(self.M1,GPIO.LOW)
-            time.sleep(0.1)
+            self.enter_mode(self.MODE_NORMAL)
 
-    def set(self,freq,addr,power,rssi,air_speed=2400,\
-            net_id=0,buffer_size = 240,crypt=0,\
-            relay=False,lbt=False,wor=False):
-        self.send_to = addr
-        self.addr = addr
-        # Entrar a modo configuración: M0=HIGH, M1=HIGH
-        GPIO.output(self.M0,GPIO.HIGH)
-        GPIO.output(self.M1,GPIO.HIGH)
-        time.sleep(0.1)
+    def set_mode(self,mode):
+        # Devuelve True si M0/M1 cambiaron (el llamador debe esperar a que el módulo se asiente)
+        if self.mode == mode:
+            return False
+        GPIO.output(self.M0,mode[0])
+        GPIO.output(self.M1,mode[1])
+        self.mode = mode
+        self._mode_t = time.monotonic()
+        return True
+
+    def enter_mode(self,mode,settle=0.1):
+        # Cambia de modo si hace falta y espera lo que falte de `settle` s desde el último cambio
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        changed = self.mode != mode
+        if changed:
+            self.wait_tx_done()
+            self.set_mode(mode)
+        delay = self._mode_t + settle - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if tr and (changed or delay > 0):
+            tr.add('mode', t0)
 
+    def build_cfg_reg(self,freq,addr,power,rssi,air_speed=2400,\
+                      net_id=0,buffer_size = 240,crypt=0,relay=False):
+        # Build the 12-byte register block (also updates start_freq/offset_freq)
+        reg = list(self.cfg_reg)
         low_addr = addr & 0xff
         high_addr = addr >> 8 & 0xff
         net_id_temp = net_id & 0xff
@@ -155,76 +229,178 @@ class sx126x:
         h_crypt = crypt >> 8 & 0xff
         
         if relay==False:
-            self.cfg_reg[3] = high_addr
-            self.cfg_reg[4] = low_addr
-            self.cfg_reg[5] = net_id_temp
-            self.cfg_reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
+            reg[3] = high_addr
+            reg[4] = low_addr
+            reg[5] = net_id_temp
+            reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
             # 
             # it will enable to read noise rssi value when add 0x20 as follow
             # 
-            self.cfg_reg[7] = buffer_size_temp + power_temp + 0x20
-            self.cfg_reg[8] = freq_temp
+            reg[7] = buffer_size_temp + power_temp + 0x20
+            reg[8] = freq_temp
             #
             # it will output a packet rssi value following received message
             # when enable eighth bit with 06H register(rssi_temp = 0x80)
             #
-            self.cfg_reg[9] = 0x43 + rssi_temp
-            self.cfg_reg[10] = h_crypt
-            self.cfg_reg[11] = l_crypt
+            reg[9] = 0x43 + rssi_temp
+            reg[10] = h_crypt
+            reg[11] = l_crypt
         else:
-            self.cfg_reg[3] = 0x01
-            self.cfg_reg[4] = 0x02
-            self.cfg_reg[5] = 0x03
-            self.cfg_reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
+            reg[3] = 0x01
+            reg[4] = 0x02
+            reg[5] = 0x03
+            reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
             # 
             # it will enable to read noise rssi value when add 0x20 as follow
             # 
-            self.cfg_reg[7] = buffer_size_temp + power_temp + 0x20
-            self.cfg_reg[8] = freq_temp
+            reg[7] = buffer_size_temp + power_temp + 0x20
+            reg[8] = freq_temp
             #
             # it will output a packet rssi value following received message
             # when enable eighth bit with 06H register(rssi_temp = 0x80)
             #
-            self.cfg_reg[9] = 0x03 + rssi_temp
-            self.cfg_reg[10] = h_crypt
-            self.cfg_reg[11] = l_crypt
+            reg[9] = 0x03 + rssi_temp
+            reg[10] = h_crypt
+            reg[11] = l_crypt
+        return reg
+
+    def set(self,freq,addr,power,rssi,air_speed=2400,\
+            net_id=0,buffer_size = 240,crypt=0,\
+            relay=False,lbt=False,wor=False):
+        # Cada intento escribe los 12 bytes y lee exactamente la respuesta 0xC1 de 12 bytes
+        # con plazo ACK_TIMEOUT (sin esperas fijas salvo el asentamiento del modo).
+        # Devuelve un ConfigResult en vez de imprimir.
+        t0 = time.monotonic()
+        tr = tracing.TRACER
+        if tr: t_ns = time.perf_counter_ns()
+        self.send_to = addr
+        self.addr = addr
+        self.cfg_reg = self.build_cfg_reg(freq,addr,power,rssi,air_speed,net_id,buffer_size,crypt,relay)
+        attempts = 0
+        # Arranque rápido: si el módulo ya tiene estos registros no se reescriben
+        if self.fast_start and self._cfg_is_current():
+            reg = self.cfg_reg[3:]
+        else:
+            reg = None
+            # Entrar a modo configuración: M0=HIGH, M1=HIGH
+            self.enter_mode(self.MODE_CONFIG,self.CONFIG_SETTLE)
+            while attempts < self.CONFIG_TRIES and reg is None:
+                attempts += 1
+                reg = self.check_cfg_ack(self._command(bytes(self.cfg_reg),len(self.cfg_reg),self.ACK_TIMEOUT))
+        self.enter_mode(self.MODE_NORMAL)
+        self.record_cfg(reg,attempts,t0,freq,addr,power,rssi,air_speed,buffer_size)
+        if tr: tr.add('set', t_ns)
+        return self.config
+
+    def check_cfg_ack(self,resp):
+        # Valida la respuesta a una escritura de self.cfg_reg: el módulo devuelve el
+        # bloque de 12 bytes con 0xC1 en lugar de la cabecera. Devuelve los 9
+        # registros aplicados o None si la respuesta es corta, falta o es de otro comando
+        if len(resp) == len(self.cfg_reg) and resp[0] == 0xC1 and list(resp[1:3]) == self.cfg_reg[1:3]:
+            return list(resp[3:])
+        return None
+
+    def record_cfg(self,reg,attempts,t0,freq,addr,power,rssi,air_speed,buffer_size):
+        # Registra el resultado de aplicar self.cfg_reg y devuelve el ConfigResult.
+        # reg: registros confirmados (None si nunca respondió); attempts=0 si el
+        # arranque rápido los encontró ya aplicados. Lo usan set() y
+        # AsyncSX126x.configure(): la memoria del arranque rápido, la caché en disco
+        # y los parámetros con que send() estima el airtime quedan al día
+        ok = reg is not None
+        if attempts:
+            self.cfg_source = 'written' if ok else 'failed'
+            self._save_cfg_cache(ok)
+        self._applied = list(self.cfg_reg) if ok else None
+        if ok:
+            self.freq, self.addr, self.send_to, self.power = freq, addr, addr, power
+            self.rssi, self.air_speed, self.buffer_size = rssi, air_speed, buffer_size
+        self.config = ConfigResult(ok,self.cfg_source,reg or [],attempts,(time.monotonic() - t0) * 1000)
+        return self.config
+
+    def _command(self,cmd,size,timeout):
+        # Escribe un comando y lee exactamente `size` bytes de respuesta (menos si vence el plazo)
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
         self.ser.flushInput()
+        self.ser.write(cmd)
+        old = self.ser.timeout
+        self.ser.timeout = timeout
+        try:
+            return self.ser.read(size)
+        finally:
+            self.ser.timeout = old
+            if tr: tr.add('command', t0)
 
-        for i in range(2):
-            self.ser.write(bytes(self.cfg_reg))
-            r_buff = 0
-            time.sleep(0.2)
-            if self.ser.inWaiting() > 0:
-                time.sleep(0.1)
-                r_buff = self.ser.read(self.ser.inWaiting())
-                if r_buff[0] == 0xC1:
-                    pass
-                    # print("parameters setting is :",end='')
-                    # for i in self.cfg_reg:
-                        # print(hex(i),end=' ')
-                        
-                    # print('\r\n')
-                    # print("parameters return is  :",end='')
-                    # for i in r_buff:
-                        # print(hex(i),end=' ')
-                    # print('\r\n')
-                else:
-                    pass
-                    #print("parameters setting fail :",r_buff)
-                break
-            else:
-                print("setting fail,setting again")
-                self.ser.flushInput()
-                time.sleep(0.2)
-                print('\x1b[1A',end='\r')
-                if i == 1:
-                    print("setting fail,Press Esc to Exit and run again")
-                    # time.sleep(2)
-                    # print('\x1b[1A',end='\r')
-
-        GPIO.output(self.M0,GPIO.LOW)
-        GPIO.output(self.M1,GPIO.LOW)
-        time.sleep(0.1)
+    def read_cfg_reg(self,timeout=0.3):
+        # Lee los registros con C1 00 09 (modo configuración); devuelve las 12 bytes o None
+        self.enter_mode(self.MODE_CONFIG,self.CONFIG_SETTLE)
+        buf = self._command(bytes([0xC1,0x00,0x09]),12,timeout)
+        if len(buf) == 12 and buf[:3] == bytes([0xC1,0x00,0x09]):
+            return list(buf[:12])
+        return None
+
+    def _cfg_is_current(self):
+        # ¿El módulo ya tiene self.cfg_reg? Primero lo aplicado por este proceso,
+        # luego la caché en disco y por último la lectura de registros
+        if self._applied == self.cfg_reg:
+            self.cfg_source = 'memory'
+            return True
+        if self._load_cfg_cache() == self.cfg_reg:
+            self.cfg_source = 'cache'
+            return True
+        # La clave crypt (registros 7-8) no se puede leer: no se puede verificar
+        if self.cfg_reg[10] or self.cfg_reg[11]:
+            return False
+        cur = self.read_cfg_reg()
+        if cur is not None and cur[3:10] == self.cfg_reg[3:10]:
+            self.cfg_source = 'readback'
+            self._save_cfg_cache(True)
+            return True
+        return False
+
+    def _cfg_cache_path(self):
+        name = os.path.basename(self.serial_n) or 'serial'
+        return os.path.join(self.cfg_cache, 'sx126x-%s.json' % name)
+
+    @staticmethod
+    def _boot_id():
+        # Los registros 0xC2 se pierden al apagar: la caché sólo vale dentro del mismo arranque
+        try:
+            with open('/proc/sys/kernel/random/boot_id') as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    def _load_cfg_cache(self):
+        if not self.cfg_cache:
+            return None
+        try:
+            with open(self._cfg_cache_path()) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('port') != self.serial_n or entry.get('boot_id') != self._boot_id():
+            return None
+        return entry.get('reg')
+
+    def _save_cfg_cache(self,ok):
+        # Guarda self.cfg_reg como aplicado (ok) u olvida la entrada
+        if not self.cfg_cache:
+            return
+        path = self._cfg_cache_path()
+        try:
+            if not ok:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            os.makedirs(self.cfg_cache, exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'port': self.serial_n, 'boot_id': self._boot_id(), 'reg': self.cfg_reg}, f)
+            os.replace(tmp, path)
+        except OSError:
+            # La caché es sólo una optimización
+            pass
 
     def get_settings(self):
         # the pin M1 of lora HAT must be high when enter setting mode and get parameters
@@ -254,49 +430,100 @@ class sx126x:
 # the data format like as following
 # "node address,frequence,payload"
 # "20,868,Hello World"
-    def send(self,data):
-        GPIO.output(self.M1,GPIO.LOW)
-        GPIO.output(self.M0,GPIO.LOW)
-        time.sleep(0.1)
-
+    def send(self,data,block=False):
+        # Sólo cambia/espera M0/M1 si el modo cambia; escrituras en cadena:
+        # espera únicamente si hay MAX_INFLIGHT tramas aún en el UART o en el aire
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        self.enter_mode(self.MODE_NORMAL)
+        self._wait_slot()
+        if tr:
+            t1 = time.perf_counter_ns()
+            tr.add('send.wait', t0, t1)
         self.ser.write(data)
-        # if self.rssi == True:
-            # self.get_channel_rssi()
-        time.sleep(0.1)
+        if tr: tr.add('send.write', t1)
+        self._uart_done = max(time.monotonic(), self._uart_done) + uart_time(len(data))
+        prev = self._inflight[-1] if self._inflight else 0.0
+        done = max(self._uart_done, prev) + frame_airtime(len(data), self.air_speed, self.buffer_size)
+        self._inflight.append(done)
+        if block:
+            self.wait_tx_done()
+        if tr: tr.add('send', t0)
+
+    def _wait_slot(self):
+        now = time.monotonic()
+        while self._inflight and self._inflight[0] <= now:
+            self._inflight.popleft()
+        if len(self._inflight) >= self.MAX_INFLIGHT:
+            if self.aux is not None:
+                self.wait_tx_done()
+            else:
+                time.sleep(max(self._inflight.popleft() - now, 0.0))
 
+    def wait_tx_done(self,timeout=5.0):
+        # Espera a que salgan todas las tramas escritas (AUX en LOW = ocupado)
+        if self.aux is not None:
+            end = time.monotonic() + timeout
+            while GPIO.input(self.aux) == GPIO.LOW and time.monotonic() < end:
+                time.sleep(0.002)
+        elif self._inflight:
+            time.sleep(max(self._inflight[-1] - time.monotonic(), 0.0))
+        self._inflight.clear()
 
     def receive(self):
+        # Con rssi, cada NOISE_INTERVAL s sale una consulta de ruido sin esperarla;
+        # el parser separa la respuesta de las tramas y se imprime al llegar
+        parser = self._get_parser()
+        frames, self._backlog = self._backlog, []
         if self.ser.inWaiting() > 0:
-            time.sleep(0.5)
-            r_buff = self.ser.read(self.ser.inWaiting())
+            # Frames are delimited by the SYNC/LEN header, so partial reads stay
+            # buffered in the parser instead of waiting a fixed time here
+            frames += parser.feed(self.ser.read(self.ser.inWaiting()))
+        for fr in frames:
+            print("receive message from node address with frequence\033[1;32m %d,%d.125MHz\033[0m"%(fr.src_addr,fr.chan+self.start_freq),end='\r\n',flush = True)
+            print("message is "+str(fr.payload),end='\r\n')
 
-            print("receive message from node address with frequence\033[1;32m %d,%d.125MHz\033[0m"%((r_buff[0]<<8)+r_buff[1],r_buff[2]+self.start_freq),end='\r\n',flush = True)
-            print("message is "+str(r_buff[3:-1]),end='\r\n')
-            
             # print the rssi
             if self.rssi:
-                # print('\x1b[3A',end='\r')
-                print("the packet rssi value: -{0}dBm".format(256-r_buff[-1:][0]))
-                self.get_channel_rssi()
-            else:
-                pass
-                #print('\x1b[2A',end='\r')
+                print("the packet rssi value: {0}dBm".format(fr.rssi))
+        now = time.monotonic()
+        if self.rssi and now - self._noise_t >= self.NOISE_INTERVAL:
+            if parser.noise_expected:
+                parser.cancel_noise()   # la consulta anterior no tuvo respuesta
+            self._noise_t = now
+            self.request_noise()
 
-    def get_channel_rssi(self):
-        GPIO.output(self.M1,GPIO.LOW)
-        GPIO.output(self.M0,GPIO.LOW)
-        time.sleep(0.1)
-        self.ser.flushInput()
-        self.ser.write(bytes([0xC0,0xC1,0xC2,0xC3,0x00,0x02]))
-        time.sleep(0.5)
-        re_temp = bytes(5)
-        if self.ser.inWaiting() > 0:
-            time.sleep(0.1)
-            re_temp = self.ser.read(self.ser.inWaiting())
-        if re_temp[0] == 0xC1 and re_temp[1] == 0x00 and re_temp[2] == 0x02:
-            print("the current noise rssi value: -{0}dBm".format(256-re_temp[3]))
-            # print("the last receive packet rssi value: -{0}dBm".format(256-re_temp[4]))
-        else:
-            # pass
+    def _get_parser(self):
+        if self.parser is None:
+            self.parser = FrameParser(rssi=self.rssi, on_noise=self._on_noise)
+        return self.parser
+
+    def _on_noise(self, noise, last_rssi):
+        self.noise_rssi = noise
+        print("the current noise rssi value: {0}dBm".format(noise))
+
+    def request_noise(self,parser=None):
+        # Sólo escribe la consulta de ruido; la respuesta la separa `parser`
+        # (por defecto el de receive()), que debe leer todo lo que llega del UART
+        self.enter_mode(self.MODE_NORMAL)
+        (parser or self._get_parser()).expect_noise()
+        self.ser.write(NOISE_CMD)
+
+    def get_channel_rssi(self,timeout=1.0):
+        # Ruido del canal en dBm (None sin respuesta). No vacía el buffer: las
+        # tramas que llegan mientras se espera quedan para el siguiente receive()
+        parser = self._get_parser()
+        replies = parser.noise_replies
+        self.request_noise()
+        end = time.monotonic() + timeout
+        while parser.noise_replies == replies and time.monotonic() < end:
+            n = self.ser.inWaiting()
+            if n:
+                self._backlog += parser.feed(self.ser.read(n))
+            else:
+                time.sleep(0.01)
+        if parser.noise_replies == replies:
+            parser.cancel_noise()
             print("receive rssi value fail")
-            # print("receive rssi value fail: ",re_temp)
+            return None
+        return self.noise_rssi
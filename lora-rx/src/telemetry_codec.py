@@ -0,0 +1,157 @@
+"""Compact binary codec for rain/seismic telemetry frames.
+
+Replaces the JSON payload of tx_sensors.py (~200+ bytes) with a versioned,
+struct-packed record of about 30 bytes. All integers are little-endian.
+
+    offset size  field
+    0      1     0xB0 | VERSION (never '{', so JSON and binary can coexist)
+    1      1     flags: bit0 rain block, bit1 seismic block, bit2 seismic batch block
+    2      1     station id (index in STATIONS; 0xFF = name follows)
+    [3     1+n   station name length and ASCII bytes, only when id is 0xFF]
+    +0     4     seq (uint32)
+    +4     4     timestamp, epoch seconds (uint32)
+    rain block (7 bytes):
+           2     intensity in 0.01 mm/h (uint16)
+           1     bucket size in 0.01 mm (uint8)
+           4     bucket tips total (uint32); rain total = tips * bucket
+    seismic block (11 bytes):
+           1     decimal exponent e: values are stored in units of 10^-e g
+           10    ax, ay, az, pga, rms (int16 each)
+    seismic batch block (4 + 6n bytes, flags bit2):
+           1     decimal exponent e (as above)
+           2     sample interval in ms (uint16)
+           1     sample count n
+           6n    n x (ax, ay, az) int16, oldest first, ending at the timestamp
+
+The decoder returns the same dict layout tx_sensors.py used for JSON.
+"""
+import struct, time
+
+VERSION = 1
+MARKER = 0xB0
+FLAG_RAIN = 0x01
+FLAG_SEISMIC = 0x02
+FLAG_BATCH = 0x04
+STATION_INLINE = 0xFF
+
+# Station id table. Ids go on the air: only append, never reorder.
+STATIONS = ('tx01', 'REVN')
+_STATION_IDS = {name: i for i, name in enumerate(STATIONS)}
+
+_HEAD = struct.Struct('<BBB')
+_SEQ_TS = struct.Struct('<II')
+_RAIN = struct.Struct('<HBI')
+_SEIS = struct.Struct('<B5h')
+_BATCH = struct.Struct('<BHB')
+SEIS_FIELDS = ('ax_g', 'ay_g', 'az_g', 'pga_g', 'rms_g')
+
+
+def is_binary(payload) -> bool:
+    """True if the payload starts with a binary telemetry marker."""
+    return len(payload) > 0 and (payload[0] & 0xF0) == MARKER
+
+
+def _clamp(v, lo, hi):
+    return lo if v < lo else hi if v > hi else v
+
+
+def _exponent(peak):
+    """Finest decimal exponent (down to 1e-5 g) that keeps `peak` within int16."""
+    e = 5
+    while e > 0 and peak * 10 ** e > 32767:
+        e -= 1
+    return e
+
+
+def batch_capacity(budget: int) -> int:
+    """How many batch samples fit in `budget` payload bytes (max 255)."""
+    return max(0, min(255, (budget - _BATCH.size) // 6))
+
+
+def encode(seq: int, ts: float, station: str, rain=None, seismic=None, batch=None) -> bytes:
+    """Pack one telemetry sample.
+
+    `rain`/`seismic` are the simulate_rain() and window_stats() dicts; `batch` is an
+    optional (interval_ms, samples) pair with samples as (ax, ay, az) rows.
+    """
+    flags = (FLAG_RAIN if rain else 0) | (FLAG_SEISMIC if seismic else 0) | (FLAG_BATCH if batch else 0)
+    sid = _STATION_IDS.get(station, STATION_INLINE)
+    out = bytearray(_HEAD.pack(MARKER | VERSION, flags, sid))
+    if sid == STATION_INLINE:
+        name = station.encode('ascii', 'replace')[:32]
+        out.append(len(name)); out += name
+    out += _SEQ_TS.pack(seq & 0xFFFFFFFF, int(ts) & 0xFFFFFFFF)
+    if rain:
+        out += _RAIN.pack(_clamp(round(rain['intensity_mm_h'] * 100), 0, 0xFFFF),
+                          _clamp(round(rain['bucket_mm'] * 100), 1, 0xFF),
+                          rain['bucket_tips_total'] & 0xFFFFFFFF)
+    if seismic:
+        vals = [seismic[k] for k in SEIS_FIELDS]
+        e = _exponent(max(abs(v) for v in vals))
+        scale = 10 ** e
+        out += _SEIS.pack(e, *(_clamp(round(v * scale), -32768, 32767) for v in vals))
+    if batch:
+        interval_ms, samples = batch
+        flat = [float(v) for row in samples[:255] for v in row]
+        e = _exponent(max((abs(v) for v in flat), default=0.0))
+        scale = 10 ** e
+        out += _BATCH.pack(e, _clamp(round(interval_ms), 0, 0xFFFF), len(flat) // 3)
+        out += struct.pack(f'<{len(flat)}h', *(_clamp(round(v * scale), -32768, 32767) for v in flat))
+    return bytes(out)
+
+
+def message_id(payload) -> tuple:
+    """(station, seq, timestamp) from the header, without decoding the blocks.
+
+    Raises ValueError on a truncated header.
+    """
+    try:
+        _, _, sid = _HEAD.unpack_from(payload, 0)
+        off = _HEAD.size
+        if sid == STATION_INLINE:
+            n = payload[off]
+            station = bytes(payload[off + 1:off + 1 + n])
+            off += 1 + n
+        else:
+            station = sid
+        return (station,) + _SEQ_TS.unpack_from(payload, off)
+    except (struct.error, IndexError) as ex:
+        raise ValueError(f"truncated telemetry header: {ex}") from None
+
+
+def decode(payload) -> dict:
+    """Unpack a binary telemetry payload into the JSON-equivalent dict.
+
+    Raises ValueError on an unknown version or truncated payload.
+    """
+    try:
+        marker, flags, sid = _HEAD.unpack_from(payload, 0)
+        if marker != MARKER | VERSION:
+            raise ValueError(f"unsupported telemetry version 0x{marker:02x}")
+        off = _HEAD.size
+        if sid == STATION_INLINE:
+            n = payload[off]
+            station = bytes(payload[off + 1:off + 1 + n]).decode('ascii', 'replace')
+            off += 1 + n
+        else:
+            station = STATIONS[sid] if sid < len(STATIONS) else f"id{sid}"
+        seq, ts = _SEQ_TS.unpack_from(payload, off); off += _SEQ_TS.size
+        obj = {'ts': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)),
+               'seq': seq, 'station': station}
+        if flags & FLAG_RAIN:
+            inten, bucket, tips = _RAIN.unpack_from(payload, off); off += _RAIN.size
+            bucket_mm = bucket / 100.0
+            obj['rain'] = {'intensity_mm_h': inten / 100.0, 'bucket_mm': bucket_mm,
+                           'bucket_tips_total': tips, 'rain_mm_total': round(tips * bucket_mm, 3)}
+        if flags & FLAG_SEISMIC:
+            e, *vals = _SEIS.unpack_from(payload, off); off += _SEIS.size
+            obj['seismic'] = {k: round(v / 10 ** e, e) for k, v in zip(SEIS_FIELDS, vals)}
+        if flags & FLAG_BATCH:
+            e, interval_ms, n = _BATCH.unpack_from(payload, off); off += _BATCH.size
+            flat = struct.unpack_from(f'<{3 * n}h', payload, off); off += 6 * n
+            obj['seismic_batch'] = {'interval_ms': interval_ms,
+                                    'samples': [[round(v / 10 ** e, e) for v in flat[i:i + 3]]
+                                                for i in range(0, 3 * n, 3)]}
+    except (struct.error, IndexError) as ex:
+        raise ValueError(f"truncated telemetry payload: {ex}") from None
+    return obj
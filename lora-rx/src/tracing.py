@@ -0,0 +1,130 @@
+"""Optional per-stage timing into a fixed-size ring buffer.
+
+Disabled (the default) the hooks cost one global lookup: call sites read
+`tracing.TRACER` and skip everything when it is None.
+
+    tr = tracing.TRACER
+    if tr: t0 = perf_counter_ns()
+    ...stage...
+    if tr: tr.add('parse', t0)
+
+Enabled, every stage appends (name, start, duration, thread) to
+preallocated lists that wrap around, so memory stays fixed and the
+newest `size` spans are kept. dump() writes them as a Chrome trace
+(chrome://tracing, Perfetto, speedscope) or, for a path ending in
+.folded, as collapsed stacks for flamegraph.pl (self time in ns,
+nesting taken from the span intervals).
+
+setup_from_env() turns it on from LORA_TRACE=<path> (LORA_TRACE_SIZE
+spans, default 65536) and dumps on SIGUSR1 and at exit.
+"""
+import atexit, json, os, signal, threading
+from time import perf_counter_ns
+
+__all__ = ['TRACER', 'Tracer', 'enable', 'disable', 'setup_from_env', 'perf_counter_ns']
+
+TRACER = None
+
+
+class Tracer:
+    """Ring buffer of completed spans."""
+
+    def __init__(self, size=65536):
+        self.size = size
+        self.n = 0                       # spans recorded since start (may exceed size)
+        self._name = [None] * size
+        self._t0 = [0] * size
+        self._dur = [0] * size
+        self._tid = [0] * size
+
+    def add(self, name, t0, t1=None):
+        """Record a span that started at perf_counter_ns() value t0 and ends now (or at t1)."""
+        if t1 is None:
+            t1 = perf_counter_ns()
+        i = self.n % self.size
+        self._name[i] = name
+        self._t0[i] = t0
+        self._dur[i] = t1 - t0
+        self._tid[i] = threading.get_ident()
+        self.n += 1
+
+    def spans(self) -> list:
+        """Recorded spans, oldest first, as (name, t0_ns, dur_ns, thread id)."""
+        n, size = self.n, self.size
+        idx = range(n) if n <= size else [(n + k) % size for k in range(size)]
+        return [(self._name[i], self._t0[i], self._dur[i], self._tid[i]) for i in idx]
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        spans = self.spans()
+        events = [{'name': name, 'ph': 'X', 'ts': t0 / 1000.0, 'dur': dur / 1000.0, 'pid': pid, 'tid': tid}
+                  for name, t0, dur, tid in spans]
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                    'args': {'name': names.get(tid, str(tid))}} for tid in {s[3] for s in spans}]
+        return {'traceEvents': events, 'displayTimeUnit': 'ns',
+                'otherData': {'spans_recorded': self.n, 'spans_kept': min(self.n, self.size)}}
+
+    def folded(self) -> dict:
+        """Self time in ns per stack ('outer;inner'), nesting from the intervals."""
+        out = {}
+        by_tid = {}
+        for s in self.spans():
+            by_tid.setdefault(s[3], []).append(s)
+        for spans in by_tid.values():
+            # parents start first; on equal starts the longer one is the parent
+            spans.sort(key=lambda s: (s[1], -s[2]))
+            stack = []   # [name, end, self time, path]
+            for name, t0, dur, _ in spans:
+                while stack and stack[-1][1] <= t0:
+                    _, _, own, path = stack.pop()
+                    out[path] = out.get(path, 0) + own
+                if stack:
+                    stack[-1][2] -= dur
+                path = (stack[-1][3] + ';' if stack else '') + name
+                stack.append([name, t0 + dur, dur, path])
+            for _, _, own, path in stack:
+                out[path] = out.get(path, 0) + own
+        return out
+
+    def dump(self, path):
+        """Write the spans to `path` (Chrome trace JSON, or collapsed stacks for *.folded)."""
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            if path.endswith('.folded'):
+                for stack, ns in sorted(self.folded().items()):
+                    f.write(f'{stack} {max(ns, 0)}\n')
+            else:
+                json.dump(self.chrome_trace(), f)
+        os.replace(tmp, path)
+        return path
+
+
+def enable(size=65536) -> Tracer:
+    global TRACER
+    TRACER = Tracer(size)
+    return TRACER
+
+
+def disable():
+    global TRACER
+    TRACER = None
+
+
+def setup_from_env():
+    """Enable tracing if LORA_TRACE is set; dump on SIGUSR1 and at exit."""
+    path = os.getenv('LORA_TRACE', '')
+    if not path:
+        return None
+    tracer = enable(int(os.getenv('LORA_TRACE_SIZE', '65536')))
+
+    def dump(*_):
+        try:
+            tracer.dump(path)
+            print(f"trace: {min(tracer.n, tracer.size)} spans -> {path}", flush=True)
+        except OSError as e:
+            print(f"trace: cannot write {path}: {e}", flush=True)
+
+    signal.signal(signal.SIGUSR1, dump)
+    atexit.register(dump)
+    return tracer
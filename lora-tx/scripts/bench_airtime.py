@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Airtime table, formula self-check and duty-cycle scheduler simulation.
+
+1. Checks lora_airtime() against reference values of the Semtech/TTN
+   airtime calculators (exits non-zero on mismatch).
+2. Prints frame airtime per air speed for a few payload sizes.
+3. Simulates DutyCycleLimiter on a virtual clock: a sender trying to send
+   one frame per period, reporting achieved rate and utilisation.
+
+Example:
+    python scripts/bench_airtime.py --duty 0.01 --payload 29 --airspeed 2400
+"""
+import argparse, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import framing
+from airtime import LORA_PARAMS, lora_airtime, frame_airtime, FIXED_PREFIX
+from duty_cycle import DutyCycleLimiter
+
+# (payload bytes, SF, BW Hz) -> expected ms (CR 4/5, preamble 8, header+CRC)
+REFERENCE = [
+    ((10, 7, 125000), 41.216),
+    ((13, 9, 125000), 164.864),
+    ((51, 12, 125000), 2465.792),
+]
+
+
+def self_check():
+    ok = True
+    for (pl, sf, bw), expected in REFERENCE:
+        got = lora_airtime(pl, sf, bw) * 1000.0
+        flag = abs(got - expected) < 0.01
+        ok &= flag
+        print(f"  SF{sf} BW{bw // 1000}k {pl:>3} B: {got:9.3f} ms (ref {expected:9.3f}) {'OK' if flag else 'FAIL'}")
+    return ok
+
+
+class VirtualClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, s):
+        self.t += s
+
+
+def simulate(duty, window, airspeed, payload, period, seconds):
+    clock = VirtualClock()
+    lim = DutyCycleLimiter(duty, window, clock=clock)
+    frame_len = FIXED_PREFIX + framing.HEADER_LEN + payload + 1
+    at = frame_airtime(frame_len, airspeed)
+    while clock.t < seconds:
+        lim.acquire(at, sleep=clock.sleep)
+        clock.sleep(max(period, at))
+    print(f"  {duty:.1%} duty, {payload} B @ {airspeed} bps (airtime {at * 1000:.1f} ms), period {period}s: "
+          f"{lim.frames} frames in {seconds:.0f}s = {lim.frames / seconds:.3f} fps, "
+          f"waited {lim.total_wait:.0f}s, utilisation(last window)={lim.utilisation():.3%}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description='LoRa airtime and duty-cycle report')
+    ap.add_argument('--duty', type=float, default=0.01)
+    ap.add_argument('--window', type=float, default=3600.0)
+    ap.add_argument('--airspeed', type=int, default=2400)
+    ap.add_argument('--payload', type=int, default=29)
+    ap.add_argument('--period', type=float, default=1.0)
+    ap.add_argument('--hours', type=float, default=3.0)
+    args = ap.parse_args()
+
+    print("formula self-check:")
+    ok = self_check()
+
+    sizes = (16, 35, 64, 128, 240)
+    print("\nframe airtime (ms) by on-air bytes:")
+    print(f"{'air bps':>8} {'SF':>3} {'BW kHz':>7} " + ''.join(f"{n:>9}" for n in sizes))
+    for bps, (sf, bw) in sorted(LORA_PARAMS.items()):
+        row = ''.join(f"{frame_airtime(FIXED_PREFIX + n, bps) * 1000:>9.1f}" for n in sizes)
+        print(f"{bps:>8} {sf:>3} {bw // 1000:>7} {row}")
+
+    print("\nduty-cycle scheduler (virtual clock):")
+    simulate(args.duty, args.window, args.airspeed, args.payload, args.period, args.hours * 3600)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""AsyncSX126x against simulated modules on a pty pair.
+
+Two sx126x drivers (LORA_GPIO=sim) open the ptys of a sim_radio.SimChannel
+in this process and are driven through AsyncSX126x on one event loop:
+
+  - configure() both at --airspeed: the module's echo is validated and the
+    result recorded on the driver (dev.config, air_speed, fast-start memory)
+  - a blocking set() with the same settings is then free ('memory'), one
+    with other settings writes the module again
+  - --frames frames go TX -> RX through send() / recv(), with packet RSSI
+  - a noise query answered while frames keep arriving
+  - configure() with a module that never answers fails and leaves the
+    driver as it was
+
+Reports the time of each step and exits non-zero if a check fails.
+
+Example:
+    python scripts/bench_async.py --frames 50 --time-scale 20
+"""
+import argparse, asyncio, os, sys, time, tty
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+FAILS = []
+
+
+def check(name, cond):
+    print(f"  {'ok  ' if cond else 'FAIL'} {name}")
+    if not cond:
+        FAILS.append(name)
+
+
+def frame(dev, dest, payload):
+    return bytes([(dest >> 8) & 0xFF, dest & 0xFF, dev.offset_freq]) \
+        + framing.encode(dev.addr, dev.offset_freq, payload)
+
+
+async def run(args, tx_dev, rx_dev, mute_dev):
+    async with AsyncSX126x(tx_dev) as tx, AsyncSX126x(rx_dev) as rx:
+        t0 = time.perf_counter()
+        ok = await tx.configure(868, 101, 22, False, args.airspeed)
+        ok &= await rx.configure(868, 102, 22, True, args.airspeed)
+        print(f"  configure x2: {(time.perf_counter() - t0) * 1000:.0f} ms")
+        check('configure() accepted by both modules', ok)
+        check('configure() recorded on the driver',
+              tx_dev.config.ok and tx_dev.config.source == 'written' and tx_dev.config.attempts == 1
+              and tx_dev.air_speed == args.airspeed and tx_dev._applied == tx_dev.cfg_reg
+              and rx_dev.rssi and rx.parser.rssi)
+
+        t0 = time.perf_counter()
+        for i in range(args.frames):
+            await tx.send(frame(tx_dev, 102, b'async %d' % i))
+        got = []
+        while len(got) < args.frames:
+            fr = await rx.recv(timeout=2.0)
+            if fr is None:
+                break
+            got.append(fr)
+        secs = time.perf_counter() - t0
+        print(f"  {len(got)}/{args.frames} frames in {secs:.2f} s ({len(got) / secs:.1f} frames/s)")
+        check('every frame arrives in order with its RSSI',
+              [bytes(f.payload) for f in got] == [b'async %d' % i for i in range(args.frames)]
+              and all(f.src_addr == 101 and f.rssi is not None for f in got))
+
+        t0 = time.perf_counter()
+        sending = asyncio.ensure_future(tx.send(frame(tx_dev, 102, b'during noise')))
+        noise = await rx.noise_rssi()
+        await sending
+        fr = await rx.recv(timeout=2.0)
+        print(f"  noise query: {noise} dBm in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        check('noise query answered, frame still delivered',
+              noise is not None and fr is not None and bytes(fr.payload) == b'during noise')
+
+    t0 = time.perf_counter()
+    tx_dev.fast_start = True
+    res = tx_dev.set(868, 101, 22, False, args.airspeed)
+    check('blocking set() after configure() with the same settings is free',
+          res.ok and res.source == 'memory' and res.attempts == 0)
+    other = 9600 if args.airspeed != 9600 else 2400
+    res = tx_dev.set(868, 101, 22, False, other)
+    check('blocking set() with other settings writes the module',
+          res.ok and res.source == 'written' and tx_dev.air_speed == other)
+    print(f"  set() x2: {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    # a lone 0xC1 or the reply to another command (a noise query) is no ack
+    check('check_cfg_ack() rejects short and foreign answers',
+          tx_dev.check_cfg_ack(b'\xc1') is None
+          and tx_dev.check_cfg_ack(bytes([0xC1, 0x00, 0x02]) + bytes(9)) is None
+          and tx_dev.check_cfg_ack(bytes([0xC1]) + bytes(tx_dev.cfg_reg[1:])) == tx_dev.cfg_reg[3:])
+    async with AsyncSX126x(mute_dev) as mute:
+        ok = await mute.configure(868, 103, 22, False, other, retries=2, timeout=0.05)
+    check('configure() against a silent module fails and changes nothing',
+          not ok and not mute_dev.config.ok and mute_dev.config.source == 'failed'
+          and mute_dev.config.attempts == 2 and mute_dev._applied is None
+          and mute_dev.air_speed == args.airspeed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='AsyncSX126x on a simulated channel')
+    ap.add_argument('--frames', type=int, default=50)
+    ap.add_argument('--airspeed', type=int, default=2400)
+    ap.add_argument('--time-scale', type=float, default=20.0)
+    args = ap.parse_args()
+    os.environ['LORA_GPIO'] = 'sim'
+    os.environ['LORA_TIME_SCALE'] = str(args.time_scale)
+    global framing, AsyncSX126x
+    import framing
+    from sim_radio import SimChannel
+    from sx126x import sx126x
+    from sx126x_async import AsyncSX126x
+
+    ch = SimChannel(args.time_scale)
+    tx_port, rx_port = ch.attach('tx'), ch.attach('rx')
+    # a pty with no module behind it
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    tx_dev = sx126x(tx_port, 868, 101, 22, False, args.airspeed, skip_config=True)
+    rx_dev = sx126x(rx_port, 868, 102, 22, True, args.airspeed, skip_config=True)
+    mute_dev = sx126x(os.ttyname(slave), 868, 103, 22, False, args.airspeed, skip_config=True)
+    try:
+        asyncio.run(run(args, tx_dev, rx_dev, mute_dev))
+    finally:
+        ch.close()
+        os.close(master)
+        os.close(slave)
+    sys.exit(1 if FAILS else 0)
+
+
+if __name__ == '__main__':
+    main()
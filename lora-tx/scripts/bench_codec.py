@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare JSON vs binary telemetry payloads: size, round trip and airtime.
+
+Generates samples like tx_sensors.py (simulated rain, window_stats() of a
+window of simulated accelerometer readings), encodes each one both ways,
+checks that the binary codec round-trips within its quantisation and
+prints bytes/frame plus the airtime saved at every module air speed.
+Airtime is airtime.frame_airtime() of each framed payload (LoRa preamble,
+header, CRC and coding rate included), averaged over the samples.
+
+Runs off the Pi: tx_sensors.py imports the driver, so LORA_GPIO defaults
+to the in-memory GPIO (sim); no pin is touched.
+
+Example:
+    python scripts/bench_codec.py --samples 2000 --station REVN
+"""
+import argparse, json, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('LORA_GPIO', 'sim')
+import numpy as np
+import framing, telemetry_codec
+from airtime import FIXED_PREFIX, LORA_PARAMS, frame_airtime
+from seismic import simulated_accel, window_stats
+from tx_sensors import simulate_rain, now_iso
+
+# Bytes the module puts on air per frame besides the payload:
+# src_hi src_lo chan SYNC LEN ... CHK (the dest/channel prefix is consumed)
+FRAME_OVERHEAD = framing.HEADER_LEN + 1
+
+
+def check_round_trip(seq, ts, station, rain, seis, blob):
+    d = telemetry_codec.decode(blob)
+    assert d['seq'] == seq and d['station'] == station
+    assert d['ts'] == time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(ts)))
+    for k in ('intensity_mm_h', 'bucket_mm', 'bucket_tips_total', 'rain_mm_total'):
+        assert abs(d['rain'][k] - rain[k]) <= 0.0051, (k, d['rain'][k], rain[k])
+    for k in telemetry_codec.SEIS_FIELDS:
+        assert abs(d['seismic'][k] - seis[k]) <= 1e-5, (k, d['seismic'][k], seis[k])
+
+
+def mean_airtime(sizes, bps):
+    """Mean time on air (s) of frames carrying payloads of these sizes."""
+    return sum(frame_airtime(FIXED_PREFIX + n + FRAME_OVERHEAD, bps) for n in sizes) / len(sizes)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Telemetry codec size/airtime report')
+    ap.add_argument('--samples', type=int, default=1000)
+    ap.add_argument('--station', default='REVN')
+    ap.add_argument('--period', type=float, default=1.0)
+    ap.add_argument('--bucket-mm', type=float, default=0.2)
+    ap.add_argument('--sample-hz', type=float, default=100.0, help='accelerometer samples per second')
+    args = ap.parse_args()
+
+    total_mm, tips = 0.0, 0
+    window = max(1, int(args.sample_hz * args.period))   # accelerometer samples per frame
+    json_sizes, bin_sizes = [], []
+    for seq in range(args.samples):
+        ts = time.time()
+        rain, total_mm, tips = simulate_rain(args.period, args.bucket_mm, total_mm, tips)
+        seis = window_stats(np.array([simulated_accel() for _ in range(window)]))
+        js = json.dumps({'ts': now_iso(), 'seq': seq, 'station': args.station,
+                         'rain': rain, 'seismic': seis}, separators=(',', ':')).encode()
+        blob = telemetry_codec.encode(seq, ts, args.station, rain, seis)
+        check_round_trip(seq, ts, args.station, rain, seis, blob)
+        json_sizes.append(len(js)); bin_sizes.append(len(blob))
+
+    j = sum(json_sizes) / len(json_sizes); b = sum(bin_sizes) / len(bin_sizes)
+    print(f"round trip OK for {args.samples} samples")
+    print(f"payload bytes/frame: json={j:.1f} (max {max(json_sizes)})  bin={b:.1f} (max {max(bin_sizes)})  "
+          f"-> {100 * (1 - b / j):.0f}% smaller")
+    print(f"on-air bytes/frame (+{FRAME_OVERHEAD} framing): json={j + FRAME_OVERHEAD:.1f}  bin={b + FRAME_OVERHEAD:.1f}")
+    print(f"{'air bps':>8} {'json ms':>9} {'bin ms':>9} {'saved ms':>9}")
+    for bps in sorted(LORA_PARAMS):
+        tj = 1000.0 * mean_airtime(json_sizes, bps)
+        tb = 1000.0 * mean_airtime(bin_sizes, bps)
+        print(f"{bps:>8} {tj:>9.1f} {tb:>9.1f} {tj - tb:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
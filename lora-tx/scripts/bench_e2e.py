@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""End-to-end throughput/latency benchmark, TX driver -> RX pipeline.
+
+Every case starts a sim_radio.SimChannel, runs lora-rx/src/rx_basic.py as
+a subprocess on one of its ptys (LORA_GPIO=sim) and drives an sx126x on
+the other pty from this process the way tx_random.py does: JSON payloads
+padded to --payloads bytes, fragment.split() to the packet size, framed
+and sent at the given period (0 = back to back). Each payload carries its
+send time, and RX stdout lines are timestamped as they arrive, so latency
+covers queueing, UART, air, parsing and reassembly.
+
+The sweep is the product of --airspeeds, --payloads, --packet-sizes and
+--periods. Per case it reports frames/s, goodput, p50/p99 latency,
+delivery and the receiver's CPU% and peak RSS. Rates and latencies are in
+air time: wall-clock figures multiplied by --time-scale. Results go to
+--out as JSON. With --baseline, the run is compared with an earlier file
+and exits non-zero on any metric worse by more than --tolerance.
+
+Example:
+    python scripts/bench_e2e.py --frames 40 --out e2e.json
+    python scripts/bench_e2e.py --frames 40 --baseline e2e.json
+"""
+import argparse, itertools, json, os, platform, signal, subprocess, sys, threading, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TX_SRC = os.path.join(HERE, '..', 'src')
+RX_DIR = os.path.join(HERE, '..', '..', 'lora-rx')
+sys.path.insert(0, TX_SRC)
+
+# lower is better for these, higher for the rest of METRICS
+LOWER_IS_BETTER = ('latency_p50_ms', 'latency_p99_ms', 'rx_cpu_pct', 'rx_rss_kb')
+METRICS = ('frames_per_s', 'goodput_bps', 'delivery') + LOWER_IS_BETTER
+# changes smaller than this are noise (CPU ticks are 10 ms, scheduling jitter)
+NOISE = {'latency_p50_ms': 20.0, 'latency_p99_ms': 20.0, 'rx_cpu_pct': 5.0, 'rx_rss_kb': 1024}
+
+
+def proc_stats(pid):
+    """(cpu seconds, peak RSS kB) of a process from /proc."""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    rss = 0
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                rss = int(line.split()[1])
+    return cpu, rss
+
+
+def pct(v, q):
+    return v[min(len(v) - 1, int(q * len(v)))] if v else None
+
+
+def run_case(args, air, size, packet, period):
+    from sim_radio import SimChannel
+    from sx126x import sx126x
+    import framing, fragment
+
+    scale = args.time_scale
+    ch = SimChannel(scale, args.loss, seed=args.seed)
+    tx_port, rx_port = ch.attach('tx'), ch.attach('rx')
+    env = dict(os.environ, LORA_GPIO='sim', PYTHONUNBUFFERED='1')
+    rx = subprocess.Popen([sys.executable, 'src/rx_basic.py', '--serial', rx_port, '--freq', '868',
+                           '--addr', '102', '--airspeed', str(air), '--fast-start', '0', '--cfg-cache', '',
+                           '--csv', ''],
+                          cwd=RX_DIR, env=env, stdout=subprocess.PIPE, text=True)
+    got, ready, last = {}, threading.Event(), [0]
+
+    def reader():
+        for line in rx.stdout:
+            t = time.monotonic_ns()
+            if line.startswith('Radio lista'):
+                ready.set()
+            if line.startswith('RX ') and '| {' in line:
+                try:
+                    msg = json.loads(line.split('| ', 2)[2])
+                except ValueError:
+                    continue
+                got.setdefault(msg.get('seq'), (t - msg['t']) / 1e6)
+                last[0] = t
+
+    th = threading.Thread(target=reader, daemon=True)
+    th.start()
+    dev = sx126x(tx_port, 868, 101, 22, False, air_speed=air, buffer_size=packet)
+    ready.wait(30)      # receiver configured and listening
+    cpu0, _ = proc_stats(rx.pid)
+    t0, t0_ns = time.monotonic(), time.monotonic_ns()
+    pad = 'x' * size
+    for seq in range(args.frames):
+        head = {'t': time.monotonic_ns(), 'seq': seq, 'pad': ''}
+        body = json.dumps(head, separators=(',', ':'))
+        head['pad'] = pad[:max(0, size - len(body))]
+        payload = json.dumps(head, separators=(',', ':')).encode()
+        for part in fragment.split(payload, seq, packet):
+            dev.send(bytes([0, 102, dev.offset_freq]) + framing.encode(dev.addr, dev.offset_freq, part))
+        if period:
+            time.sleep(max(0.0, t0 + (seq + 1) * period / scale - time.monotonic()))
+    dev.wait_tx_done()
+    # let the last frames through the air and the receiver
+    end = time.monotonic() + args.drain
+    while len(got) < args.frames and time.monotonic() < end:
+        time.sleep(0.05)
+    wall = time.monotonic() - t0
+    cpu1, rss = proc_stats(rx.pid)
+    rx.send_signal(signal.SIGINT)
+    rx.wait(timeout=30)
+    th.join(timeout=5)
+    dev.ser.close()
+    ch.close()
+
+    lat = sorted(v * scale for v in got.values())
+    # rates up to the last arrival, not the drain wait
+    air_s = max(last[0] - t0_ns, 1) / 1e9 * scale
+    return {
+        'airspeed': air, 'payload': size, 'packet_size': packet, 'period_s': period,
+        'frames': args.frames, 'received': len(got),
+        'delivery': round(len(got) / args.frames, 4),
+        'frames_per_s': round(len(got) / air_s, 3),
+        'goodput_bps': round(len(got) * size * 8 / air_s, 1),
+        'latency_p50_ms': round(pct(lat, 0.5), 1) if lat else None,
+        'latency_p99_ms': round(pct(lat, 0.99), 1) if lat else None,
+        'rx_cpu_pct': round((cpu1 - cpu0) / wall * 100, 1),
+        'rx_rss_kb': rss,
+        'channel': ch.stats(),
+    }
+
+
+def case_key(c):
+    return (c['airspeed'], c['payload'], c['packet_size'], c['period_s'])
+
+
+def compare(results, baseline, tol):
+    """Return the list of regressions of `results` against `baseline`."""
+    old = {case_key(c): c for c in baseline['cases']}
+    out = []
+    for c in results['cases']:
+        b = old.get(case_key(c))
+        if not b:
+            continue
+        for m in METRICS:
+            new_v, old_v = c.get(m), b.get(m)
+            if new_v is None or old_v is None or abs(new_v - old_v) <= NOISE.get(m, 0):
+                continue
+            if not old_v:
+                old_v = NOISE.get(m, 1e-9)
+            worse = (new_v - old_v) / old_v if m in LOWER_IS_BETTER else (old_v - new_v) / old_v
+            if worse > tol:
+                out.append(f"{case_key(c)} {m}: {old_v} -> {new_v} ({worse:+.0%})")
+    return out
+
+
+def ints(s):
+    return [int(x) for x in s.split(',')]
+
+
+def main():
+    ap = argparse.ArgumentParser(description='End-to-end TX -> RX benchmark on a simulated channel')
+    ap.add_argument('--airspeeds', type=ints, default=ints('2400,9600'))
+    ap.add_argument('--payloads', type=ints, default=ints('32,200,600'), help='payload bytes')
+    ap.add_argument('--packet-sizes', type=ints, default=ints('240,64'))
+    ap.add_argument('--periods', default='0,2.0', help='seconds of air time between sends (0 = back to back)')
+    ap.add_argument('--frames', type=int, default=30, help='payloads per case')
+    ap.add_argument('--time-scale', type=float, default=20.0)
+    ap.add_argument('--loss', type=float, default=0.0)
+    ap.add_argument('--drain', type=float, default=5.0, help='wall seconds to wait for the last frames')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--out', default='', help='write the JSON results here (default: stdout)')
+    ap.add_argument('--baseline', default='', help='earlier JSON results to compare with')
+    ap.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = ap.parse_args()
+
+    # set before sx126x/airtime are imported: both sides pace in scaled time
+    os.environ['LORA_GPIO'] = 'sim'
+    os.environ['LORA_TIME_SCALE'] = str(args.time_scale)
+    periods = [float(x) for x in args.periods.split(',')]
+    cases = []
+    for air, size, packet, period in itertools.product(args.airspeeds, args.payloads, args.packet_sizes, periods):
+        c = run_case(args, air, size, packet, period)
+        cases.append(c)
+        print(f"air={air:5d} payload={size:4d} packet={packet:3d} period={period:4.1f}s: "
+              f"{c['received']}/{c['frames']} {c['frames_per_s']:6.2f} fr/s {c['goodput_bps']:7.0f} bps "
+              f"p50={c['latency_p50_ms']} p99={c['latency_p99_ms']} ms "
+              f"cpu={c['rx_cpu_pct']}% rss={c['rx_rss_kb']} kB", file=sys.stderr)
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                             text=True).stdout.strip()
+    except OSError:
+        rev = ''
+    results = {
+        'meta': {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'git': rev, 'python': platform.python_version(),
+                 'machine': platform.machine(), 'cpus': os.cpu_count(), 'time_scale': args.time_scale,
+                 'frames': args.frames, 'loss': args.loss},
+        'cases': cases,
+    }
+    text = json.dumps(results, indent=1)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Seismic sampler benchmark: deadline keeping and window statistics cost.
+
+Runs SeismicSampler at each requested rate while the main thread behaves
+like the TX loop (drain + window_stats + encode once per period), then
+reports the achieved rate, missed slots, inter-sample jitter and the time
+spent computing the window summary with NumPy vs a pure-Python loop.
+
+Example (on the Pi):
+    python scripts/bench_seismic.py --rates 100 200 --seconds 30
+"""
+import argparse, math, os, statistics, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import telemetry_codec
+from seismic import SeismicSampler, simulated_accel, window_stats, decimate
+
+
+def python_stats(rows):
+    """Reference pure-Python version of window_stats (for timing only)."""
+    n = len(rows)
+    mean = [sum(r[i] for r in rows) / n for i in range(3)]
+    peaks, sq = [0.0, 0.0, 0.0], 0.0
+    for r in rows:
+        for i in range(3):
+            v = r[i] - mean[i]
+            sq += v * v
+            if abs(v) > abs(peaks[i]):
+                peaks[i] = v
+    return peaks, max(abs(p) for p in peaks), math.sqrt(sq / (3 * n))
+
+
+def run(rate, seconds, period):
+    stamps = []
+
+    def read():
+        stamps.append(time.monotonic())
+        return simulated_accel()
+
+    s = SeismicSampler(rate_hz=rate, read_fn=read).start()
+    np_t, py_t, enc_t, windows, seq = [], [], [], 0, 0
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        time.sleep(period)
+        w = s.drain()
+        t0 = time.perf_counter()
+        stats = window_stats(w)
+        t1 = time.perf_counter()
+        batch = decimate(w, telemetry_codec.batch_capacity(180))
+        telemetry_codec.encode(seq, time.time(), 'REVN', None, stats, batch=(10, batch))
+        np_t.append(t1 - t0); enc_t.append(time.perf_counter() - t1)
+        rows = w.tolist()
+        t0 = time.perf_counter()
+        python_stats(rows)
+        py_t.append(time.perf_counter() - t0)
+        windows += 1; seq += 1
+    s.stop()
+
+    gaps = sorted((b - a) * 1000.0 for a, b in zip(stamps, stamps[1:]))
+    p99 = gaps[int(0.99 * (len(gaps) - 1))]
+    achieved = (len(stamps) - 1) / (stamps[-1] - stamps[0])
+    print(f"{rate:>5.0f} Hz: achieved {achieved:7.2f} Hz | samples={s.count} missed={s.missed} "
+          f"overrun={s.overrun} max_late={s.max_late * 1000:.2f} ms | "
+          f"interval ms p50={statistics.median(gaps):.3f} p99={p99:.3f} max={gaps[-1]:.3f}")
+    print(f"         window ({len(rows)} samples): numpy stats {statistics.fmean(np_t) * 1000:.3f} ms "
+          f"| pure python stats {statistics.fmean(py_t) * 1000:.3f} ms "
+          f"| decimate+encode {statistics.fmean(enc_t) * 1000:.3f} ms | {windows} windows")
+
+
+def main():
+    ap = argparse.ArgumentParser(description='SeismicSampler deadline benchmark')
+    ap.add_argument('--rates', type=float, nargs='+', default=[100.0, 200.0])
+    ap.add_argument('--seconds', type=float, default=10.0)
+    ap.add_argument('--period', type=float, default=1.0, help='TX period (window length)')
+    args = ap.parse_args()
+    for rate in args.rates:
+        run(rate, args.seconds, args.period)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Send rate of sx126x.send(): fixed sleeps vs mode caching + pipelined writes.
+
+Runs the real driver against a pty (the "module" side just drains the
+bytes) and an in-script fake RPi.GPIO, so no HAT is needed. The legacy
+send toggles M0/M1 and sleeps 0.1 s before and after every write; the new
+send only waits for the UART drain and computed airtime of the frames
+already in flight. At slow air speeds the legacy loop can look faster than
+the channel: it is then overrunning the module buffer, not sending more.
+
+Example:
+    python scripts/bench_send_rate.py --frames 50 --payload 29
+"""
+import argparse, os, sys, threading, time, types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class FakeGPIO(types.ModuleType):
+    """Minimal RPi.GPIO stand-in that counts pin writes."""
+    BCM, OUT, IN, LOW, HIGH = 11, 0, 1, 0, 1
+
+    def __init__(self):
+        super().__init__('RPi.GPIO')
+        self.writes = 0
+
+    def setmode(self, mode): pass
+    def setwarnings(self, flag): pass
+    def setup(self, pin, direction): pass
+    def input(self, pin): return self.HIGH
+
+    def output(self, pin, level):
+        self.writes += 1
+
+
+GPIO = FakeGPIO()
+sys.modules['RPi'] = types.ModuleType('RPi')
+sys.modules['RPi'].GPIO = GPIO
+sys.modules['RPi.GPIO'] = GPIO
+
+import framing
+from sx126x import sx126x
+from airtime import frame_airtime, uart_time
+
+
+def legacy_send(dev, data):
+    """The previous send(): unconditional pin writes and two fixed sleeps."""
+    GPIO.output(dev.M1, GPIO.LOW)
+    GPIO.output(dev.M0, GPIO.LOW)
+    time.sleep(0.1)
+    dev.ser.write(data)
+    time.sleep(0.1)
+
+
+def drain(fd, stop):
+    while not stop.is_set():
+        try:
+            os.read(fd, 4096)
+        except OSError:
+            break
+
+
+def run(name, send, dev, frame, n):
+    GPIO.writes = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        send(frame)
+    dev.wait_tx_done()
+    dt = time.perf_counter() - t0
+    print(f"  {name:<9} {n / dt:7.2f} frames/s  ({dt * 1000 / n:6.1f} ms/frame, {GPIO.writes} pin writes)")
+    return n / dt
+
+
+def main():
+    ap = argparse.ArgumentParser(description='sx126x.send() rate: legacy vs pipelined')
+    ap.add_argument('--frames', type=int, default=50)
+    ap.add_argument('--payload', type=int, default=29, help='payload bytes (29 = binary telemetry)')
+    ap.add_argument('--airspeeds', default='2400,9600,62500')
+    args = ap.parse_args()
+
+    master, slave = os.openpty()
+    stop = threading.Event()
+    threading.Thread(target=drain, args=(master, stop), daemon=True).start()
+    dev = sx126x(os.ttyname(slave), 868, 0, 22, False, skip_config=True)
+    payload = bytes(args.payload)
+    frame = bytes([0, 0, dev.offset_freq]) + framing.encode(0, dev.offset_freq, payload)
+    print(f"frame {len(frame)} B, {args.frames} frames per run")
+    for speed in (int(s) for s in args.airspeeds.split(',')):
+        dev.air_speed = speed
+        at = frame_airtime(len(frame), speed, dev.buffer_size)
+        # the UART and the air overlap, so the slower of the two sets the ceiling
+        ceiling = 1 / max(at, uart_time(len(frame)))
+        print(f"air speed {speed} bps (airtime {at * 1000:.1f} ms, ceiling {ceiling:.1f} frames/s)")
+        old = run('legacy', lambda d: legacy_send(dev, d), dev, frame, args.frames)
+        new = run('pipelined', dev.send, dev, frame, args.frames)
+        print(f"  speed-up x{new / old:.1f}")
+    stop.set()
+    dev.ser.close()
+    os.close(master)
+
+
+if __name__ == '__main__':
+    main()
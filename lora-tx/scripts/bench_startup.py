@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Startup time of sx126x(): always write vs readback vs on-disk cache.
+
+A fake module on a pty answers the register write (C0/C2 ... -> C1 ...)
+and the readback (C1 00 09 -> C1 00 09 + registers) after --reply-ms, and
+an in-script fake RPi.GPIO replaces the M0/M1 pins, so no HAT is needed.
+
+Scenarios:
+    write      fast_start=False, registers rewritten on every start
+    fresh      fast_start=True on a module with other registers (readback + write)
+    restart    fast_start=True, registers already applied (readback only)
+    fill       fast_start=True with an empty cfg_cache (readback, then cached)
+    cached     fast_start=True with cfg_cache, same boot (no config mode at all)
+    silent     module never answers: worst case, all writes time out
+
+Example:
+    python scripts/bench_startup.py --runs 3
+"""
+import argparse, os, shutil, sys, tempfile, threading, time, types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class FakeGPIO(types.ModuleType):
+    """Minimal RPi.GPIO stand-in."""
+    BCM, OUT, IN, LOW, HIGH = 11, 0, 1, 0, 1
+
+    def __init__(self):
+        super().__init__('RPi.GPIO')
+
+    def setmode(self, mode): pass
+    def setwarnings(self, flag): pass
+    def setup(self, pin, direction): pass
+    def output(self, pin, level): pass
+    def input(self, pin): return self.HIGH
+
+
+GPIO = FakeGPIO()
+sys.modules['RPi'] = types.ModuleType('RPi')
+sys.modules['RPi'].GPIO = GPIO
+sys.modules['RPi.GPIO'] = GPIO
+
+from sx126x import sx126x
+
+
+class FakeModule(threading.Thread):
+    """Register file behind the master side of a pty."""
+
+    def __init__(self, fd, reply_s):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.reply_s = reply_s
+        self.regs = bytearray(9)
+        self.writes = 0
+        self.reads = 0
+        self.mute = False
+
+    def run(self):
+        buf = bytearray()
+        while True:
+            try:
+                buf += os.read(self.fd, 64)
+            except OSError:
+                return
+            while buf:
+                if buf[0] in (0xC0, 0xC2) and len(buf) >= 12:
+                    self.regs[:] = buf[3:12]
+                    self.writes += 1
+                    self._reply(bytes([0xC1]) + bytes(buf[1:12]))
+                    del buf[:12]
+                elif buf[:3] == b'\xc1\x00\x09':
+                    self.reads += 1
+                    # the crypt key reads back as zero
+                    self._reply(b'\xc1\x00\x09' + bytes(self.regs[:7]) + b'\x00\x00')
+                    del buf[:3]
+                elif buf[0] in (0xC0, 0xC1, 0xC2):
+                    break   # incomplete command
+                else:
+                    del buf[:1]
+
+    def _reply(self, data):
+        if self.mute:
+            return
+        time.sleep(self.reply_s)
+        os.write(self.fd, data)
+
+
+def start(port, **kw):
+    t0 = time.perf_counter()
+    dev = sx126x(port, 868, 101, 22, False, air_speed=2400, **kw)
+    dt = (time.perf_counter() - t0) * 1000
+    dev.ser.close()
+    return dt, dev.config.source
+
+
+def main():
+    ap = argparse.ArgumentParser(description='sx126x() startup time per configuration path')
+    ap.add_argument('--runs', type=int, default=3)
+    ap.add_argument('--reply-ms', type=float, default=20.0, help='module answer delay')
+    args = ap.parse_args()
+
+    master, slave = os.openpty()
+    port = os.ttyname(slave)
+    module = FakeModule(master, args.reply_ms / 1000.0)
+    module.start()
+    cache = tempfile.mkdtemp(prefix='lora-cfg-')
+
+    def scenario(name, reset, **kw):
+        times = []
+        for _ in range(args.runs):
+            if reset:
+                module.regs[:] = bytes(9)
+                for f in os.listdir(cache):
+                    os.remove(os.path.join(cache, f))
+            w, r = module.writes, module.reads
+            dt, source = start(port, **kw)
+            times.append(dt)
+        print(f"  {name:<8} {min(times):7.0f} ms min {max(times):7.0f} ms max  "
+              f"cfg={source:<8} writes={module.writes - w} reads={module.reads - r}")
+        return min(times)
+
+    print(f"fake module on {port}, reply {args.reply_ms:.0f} ms, {args.runs} runs each")
+    base = scenario('write', True)
+    scenario('fresh', True, fast_start=True)
+    fast = scenario('restart', False, fast_start=True)
+    scenario('fill', False, fast_start=True, cfg_cache=cache)     # first run writes the cache
+    cached = scenario('cached', False, fast_start=True, cfg_cache=cache)
+    module.mute = True
+    scenario('silent', True, fast_start=True)
+    print(f"restart x{base / fast:.1f} faster, with cache x{base / cached:.1f}")
+    os.close(master)
+    shutil.rmtree(cache)
+
+
+if __name__ == '__main__':
+    main()
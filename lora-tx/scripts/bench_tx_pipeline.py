@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Sampling regularity under radio stalls: one TX loop vs TxPipeline.
+
+A fake radio takes --air-ms per message and stalls for --stall-s every
+--stall-every messages (a duty-cycle wait, a full ARQ window, a slow UART).
+The old transmitter loop (sample, send, sleep(period)) and TxPipeline with
+each overflow policy run for --seconds at --period. For each it reports
+the samples taken out of those due, the worst gap between two samples, the
+messages handed to the radio and how many samples they carry (a coalesced
+message carries several), the dropped and coalesced samples and how long
+messages waited in the queue.
+
+Example:
+    python scripts/bench_tx_pipeline.py --period 0.05 --stall-every 20 --stall-s 1
+"""
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from tx_pipeline import TxPipeline
+
+
+class FakeRadio:
+    def __init__(self, args):
+        self.air_s = args.air_ms / 1000.0
+        self.stall_every = args.stall_every
+        self.stall_s = args.stall_s
+        self.sent = 0
+        self.carried = 0
+
+    def send(self, msg):
+        self.sent += 1
+        self.carried += msg['n']
+        time.sleep(self.air_s + (self.stall_s if self.stall_every and self.sent % self.stall_every == 0 else 0))
+
+
+def report(name, args, times, radio, extra=''):
+    due = int(args.seconds / args.period) + 1
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    print(f"  {name:20s}: {len(times):4d}/{due} samples, worst gap {max(gaps) * 1000:6.0f} ms, "
+          f"{radio.sent:4d} sent carrying {radio.carried:4d} samples{extra}")
+
+
+def sequential(args):
+    radio, times = FakeRadio(args), []
+    end = time.monotonic() + args.seconds
+    while time.monotonic() < end:
+        times.append(time.monotonic())
+        radio.send({'n': 1})
+        time.sleep(args.period)
+    report('one loop', args, times, radio)
+
+
+def pipeline(args, policy):
+    radio, times = FakeRadio(args), []
+
+    def sample():
+        times.append(time.monotonic())
+        return {'n': 1}
+
+    def merge(old, new):
+        new['n'] += old['n']
+        return new
+
+    pipe = TxPipeline(sample, radio.send, args.period, depth=args.queue, policy=policy, merge=merge).start()
+    time.sleep(args.seconds)
+    left = len(pipe)
+    pipe.close(timeout=0)
+    w = sorted(pipe.waits)
+    report(f'pipeline {policy}', args, times, radio,
+           f", {pipe.dropped} dropped, {pipe.coalesced} coalesced, {left} queued at the end, "
+           f"wait p50={w[len(w) // 2] * 1000:.0f} max={w[-1] * 1000:.0f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description='TX sampling regularity with radio stalls')
+    ap.add_argument('--seconds', type=float, default=10.0)
+    ap.add_argument('--period', type=float, default=0.05)
+    ap.add_argument('--air-ms', type=float, default=20.0, help='radio time per message')
+    ap.add_argument('--stall-every', type=int, default=20, help='stall every N messages (0 = never)')
+    ap.add_argument('--stall-s', type=float, default=1.0)
+    ap.add_argument('--queue', type=int, default=8)
+    args = ap.parse_args()
+    print(f"{args.seconds:g} s at {args.period * 1000:g} ms, {args.air_ms:g} ms per message, "
+          f"{args.stall_s:g} s stall every {args.stall_every} messages, queue {args.queue}")
+    sequential(args)
+    for policy in ('drop-oldest', 'coalesce'):
+        pipeline(args, policy)
+
+
+if __name__ == '__main__':
+    main()
@@ -49,14 +49,29 @@ DEST="${DEST:-65535}"
 POWER="${POWER:-22}"
 AIRSPEED="${AIRSPEED:-2400}"
 PERIOD="${PERIOD:-1.0}"
+DUTY_CYCLE="${DUTY_CYCLE:-0}"
+DUTY_WINDOW_S="${DUTY_WINDOW_S:-3600}"
 MODE="${MODE:-json}"
 STATION="${STATION:-tx01}"
 BUCKET_MM="${BUCKET_MM:-0.2}"
+PAYLOAD_FORMAT="${PAYLOAD_FORMAT:-bin}"
+SAMPLE_HZ="${SAMPLE_HZ:-100}"
+SEISMIC_MODE="${SEISMIC_MODE:-window}"
+PACKET_SIZE="${PACKET_SIZE:-240}"
+BATCH_PACKETS="${BATCH_PACKETS:-1}"
+FAST_START="${FAST_START:-1}"
+CFG_CACHE="${CFG_CACHE:-}"
+ARQ="${ARQ:-0}"
+ARQ_WINDOW="${ARQ_WINDOW:-8}"
+TX_QUEUE="${TX_QUEUE:-8}"
+TX_QUEUE_POLICY="${TX_QUEUE_POLICY:-drop-oldest}"
+TX_METRICS_PORT="${TX_METRICS_PORT:-0}"
+TX_METRICS_ADDR="${TX_METRICS_ADDR:-127.0.0.1}"
 
 if [[ "$TX_TYPE_LOWER" == "random" ]]; then
   echo "🚀 Ejecutando TRANSMISOR (random):"
   echo "    SERIAL=$SERIAL  FREQ=${FREQ}MHz  ADDR=$ADDR  DEST=$DEST"
-  echo "    POWER=${POWER}dBm  AIRSPEED=$AIRSPEED  MODE=$MODE  PERIOD=${PERIOD}s"
+  echo "    POWER=${POWER}dBm  AIRSPEED=$AIRSPEED  MODE=$MODE  PERIOD=${PERIOD}s  DUTY=$DUTY_CYCLE  ARQ=$ARQ  QUEUE=$TX_QUEUE/$TX_QUEUE_POLICY"
 
   exec python src/tx_random.py \
     --serial "$SERIAL" \
@@ -66,13 +81,24 @@ if [[ "$TX_TYPE_LOWER" == "random" ]]; then
     --power "$POWER" \
     --airspeed "$AIRSPEED" \
     --mode "$MODE" \
-    --period "$PERIOD"
+    --period "$PERIOD" \
+    --duty "$DUTY_CYCLE" \
+    --duty-window "$DUTY_WINDOW_S" \
+    --fast-start "$FAST_START" \
+    --cfg-cache "$CFG_CACHE" \
+    --arq "$ARQ" \
+    --arq-window "$ARQ_WINDOW" \
+    --queue "$TX_QUEUE" \
+    --queue-policy "$TX_QUEUE_POLICY" \
+    --metrics-port "$TX_METRICS_PORT" \
+    --metrics-addr "$TX_METRICS_ADDR"
 
 else
   echo "🚀 Ejecutando TRANSMISOR (sensors):"
   echo "    SERIAL=$SERIAL  FREQ=${FREQ}MHz  ADDR=$ADDR  DEST=$DEST"
-  echo "    POWER=${POWER}dBm  AIRSPEED=$AIRSPEED  PERIOD=${PERIOD}s"
-  echo "    STATION=$STATION  BUCKET_MM=$BUCKET_MM  (sin --mode)"
+  echo "    POWER=${POWER}dBm  AIRSPEED=$AIRSPEED  PERIOD=${PERIOD}s  DUTY=$DUTY_CYCLE  ARQ=$ARQ  QUEUE=$TX_QUEUE/$TX_QUEUE_POLICY"
+  echo "    STATION=$STATION  BUCKET_MM=$BUCKET_MM  FORMAT=$PAYLOAD_FORMAT  (sin --mode)"
+  echo "    SAMPLE_HZ=$SAMPLE_HZ  SEISMIC_MODE=$SEISMIC_MODE  PACKET_SIZE=$PACKET_SIZE  BATCH_PACKETS=$BATCH_PACKETS"
 
   exec python src/tx_sensors.py \
     --serial "$SERIAL" \
@@ -82,6 +108,21 @@ else
     --power "$POWER" \
     --airspeed "$AIRSPEED" \
     --period "$PERIOD" \
+    --duty "$DUTY_CYCLE" \
+    --duty-window "$DUTY_WINDOW_S" \
     --station "$STATION" \
-    --bucket-mm "$BUCKET_MM"
+    --bucket-mm "$BUCKET_MM" \
+    --format "$PAYLOAD_FORMAT" \
+    --sample-hz "$SAMPLE_HZ" \
+    --seismic-mode "$SEISMIC_MODE" \
+    --packet-size "$PACKET_SIZE" \
+    --batch-packets "$BATCH_PACKETS" \
+    --fast-start "$FAST_START" \
+    --cfg-cache "$CFG_CACHE" \
+    --arq "$ARQ" \
+    --arq-window "$ARQ_WINDOW" \
+    --queue "$TX_QUEUE" \
+    --queue-policy "$TX_QUEUE_POLICY" \
+    --metrics-port "$TX_METRICS_PORT" \
+    --metrics-addr "$TX_METRICS_ADDR"
 fi
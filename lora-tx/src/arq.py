@@ -0,0 +1,320 @@
+"""Sliding-window ARQ between a transmitter and a receiver.
+
+Reliable data frames carry a 3-byte header in front of their payload and
+the receiver answers with compact ACK frames addressed to the sender:
+
+    data: 0x90 | VERSION, seq (uint16 LE), payload
+    ack:  0xA0 | VERSION, base (uint16 LE), bitmap (uint32 LE)
+
+Both markers are UTF-8 continuation bytes, so no text payload starts with
+them (nor JSON, binary telemetry 0xB_ or a fragment 0xF9).
+
+`base` is the next sequence number the receiver is missing (everything
+before it arrived) and bit i of `bitmap` means base + 1 + i arrived too.
+Holes below the highest bit set are negative acknowledgments: the sender
+retransmits them at once instead of waiting for the timeout.
+
+ArqSender keeps up to `window` unacknowledged frames and derives its
+retransmission timeout from the measured round trips (RFC 6298 smoothing,
+Karn's rule), never below the airtime of the frame plus its ACK.
+ArqReceiver filters duplicates and builds the ACKs. ArqLink drives an
+ArqSender over an sx126x: it sends, reads ACKs from the UART and resends.
+"""
+import collections, selectors, struct, time
+import framing
+from framing import FrameParser
+from airtime import frame_airtime
+
+VERSION = 1
+DATA_MARKER = 0x90
+ACK_MARKER = 0xA0
+_DATA = struct.Struct('<BH')
+_ACK = struct.Struct('<BHI')
+DATA_HEADER = _DATA.size
+ACK_BITS = 32
+SEQ_MOD = 1 << 16
+RESYNC = 1024           # a jump this large in seq means the sender restarted
+
+
+def _diff(a, b):
+    """Signed distance a - b in the 16-bit sequence space."""
+    return (a - b + SEQ_MOD // 2) % SEQ_MOD - SEQ_MOD // 2
+
+
+def is_data(payload) -> bool:
+    return len(payload) >= DATA_HEADER and payload[0] == DATA_MARKER | VERSION
+
+
+def is_ack(payload) -> bool:
+    return len(payload) == _ACK.size and payload[0] == ACK_MARKER | VERSION
+
+
+def wrap(seq: int, payload: bytes) -> bytes:
+    return _DATA.pack(DATA_MARKER | VERSION, seq % SEQ_MOD) + payload
+
+
+def unwrap(payload):
+    """Return (seq, inner payload) of a reliable data frame."""
+    return _DATA.unpack_from(payload, 0)[1], payload[DATA_HEADER:]
+
+
+def encode_ack(base: int, bitmap: int) -> bytes:
+    return _ACK.pack(ACK_MARKER | VERSION, base % SEQ_MOD, bitmap & 0xFFFFFFFF)
+
+
+def decode_ack(payload):
+    """Return (base, bitmap) of an ACK frame."""
+    _, base, bitmap = _ACK.unpack_from(payload, 0)
+    return base, bitmap
+
+
+class _Pending:
+    __slots__ = ('payload', 'airtime', 't_first', 't_sent', 'tries', 'nacked')
+
+    def __init__(self, payload, airtime, now):
+        self.payload = payload
+        self.airtime = airtime
+        self.t_first = now
+        self.t_sent = now
+        self.tries = 1
+        self.nacked = False
+
+
+class ArqSender:
+    """Window of unacknowledged frames with adaptive retransmission timeout."""
+
+    def __init__(self, window=8, ack_airtime=0.05, max_tries=6, rto_max=30.0,
+                 margin=0.2, first_seq=0, clock=time.monotonic):
+        """Args:
+            window: frames that may be unacknowledged at once (<= ACK_BITS).
+            ack_airtime: airtime of one ACK frame, part of the minimum RTO.
+            max_tries: transmissions of a frame before it is given up.
+            rto_max: upper bound of the backed-off timeout, seconds.
+            margin: minimum slack over the smoothed RTT (receiver idle gap,
+                UART transfers), as RFC 6298's clock granularity term.
+            first_seq: initial sequence number (randomise it across restarts).
+            clock: monotonic time source (injectable for simulations).
+        """
+        self.window = min(window, ACK_BITS)
+        self.ack_airtime = ack_airtime
+        self.max_tries = max_tries
+        self.rto_max = rto_max
+        self.margin = margin
+        self.clock = clock
+        self._next = first_seq % SEQ_MOD
+        self._out = collections.OrderedDict()   # seq -> _Pending, oldest first
+        self.srtt = None
+        self.rttvar = None
+        self.sent = 0
+        self.retransmissions = 0
+        self.acked = 0
+        self.failed = 0          # frames given up after max_tries
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._out)
+
+    def full(self) -> bool:
+        return len(self._out) >= self.window
+
+    def push(self, payload: bytes, airtime: float):
+        """Assign the next seq to `payload`; return (seq, wrapped payload)."""
+        seq = self._next
+        self._next = (seq + 1) % SEQ_MOD
+        data = wrap(seq, payload)
+        self._out[seq] = _Pending(data, airtime, self.clock())
+        self.sent += 1
+        return seq, data
+
+    def rto(self, p) -> float:
+        """Timeout of a pending frame, backed off for each retransmission."""
+        floor = p.airtime + self.ack_airtime
+        if self.srtt is None:
+            # no round trip measured yet: both airtimes twice, plus UART and turnaround
+            base = 2.0 * floor + self.margin
+        else:
+            base = max(self.srtt + max(4.0 * self.rttvar, self.margin), floor)
+        return min(base * (1 << (p.tries - 1)), self.rto_max)
+
+    def _sample(self, rtt):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2.0
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def on_ack(self, base: int, bitmap: int) -> list:
+        """Apply an ACK; return [(seq, latency since first send)] of frames it confirmed."""
+        now = self.clock()
+        done, last_sent = [], None
+        for seq, p in self._out.items():
+            d = _diff(seq, base)
+            if d < 0 or (0 < d <= ACK_BITS and (bitmap >> (d - 1)) & 1):
+                done.append(seq)
+                if last_sent is None or p.t_sent > last_sent:
+                    last_sent = p.t_sent
+        out = []
+        for seq in done:
+            p = self._out.pop(seq)
+            if p.tries == 1:
+                self._sample(now - p.t_sent)   # Karn: only unambiguous samples
+            out.append((seq, now - p.t_first))
+        self.acked += len(done)
+        if last_sent is not None:
+            # NACK: still missing although a frame sent after it got through
+            for p in self._out.values():
+                if p.t_sent < last_sent:
+                    p.nacked = True
+        return out
+
+    def next_deadline(self):
+        """Earliest time a pending frame needs attention (None if none)."""
+        if not self._out:
+            return None
+        return min(p.t_sent if p.nacked else p.t_sent + self.rto(p) for p in self._out.values())
+
+    def due(self) -> list:
+        """Return the wrapped payloads to retransmit now (NACKed or timed out)."""
+        now = self.clock()
+        out = []
+        for seq in list(self._out):
+            p = self._out[seq]
+            if not p.nacked and now < p.t_sent + self.rto(p):
+                continue
+            if p.tries >= self.max_tries:
+                del self._out[seq]
+                self.failed += 1
+                continue
+            p.tries += 1
+            p.t_sent = now
+            p.nacked = False
+            self.retransmissions += 1
+            out.append((seq, p.payload))
+        return out
+
+
+class ArqReceiver:
+    """Per-source duplicate filter and ACK state.
+
+    The first frame seen from a source (or after a jump of more than RESYNC
+    sequence numbers, i.e. a sender restart) opens its window ACK_BITS
+    behind it, so frames the sender still holds from before are asked for;
+    numbers it never used just age out of the bitmap.
+    """
+
+    def __init__(self):
+        self._state = {}     # src -> [base, bitmap]
+        self.received = 0
+        self.duplicates = 0
+
+    def on_data(self, src: int, seq: int) -> bool:
+        """Record a data frame; True if it is new (deliver it), False if a duplicate."""
+        st = self._state.get(src)
+        d = _diff(seq, st[0]) if st else None
+        if st is None or d > RESYNC or d < -RESYNC:
+            # first frame from this source, or it restarted with another seq
+            self._state[src] = [(seq - ACK_BITS) % SEQ_MOD, 1 << (ACK_BITS - 1)]
+            self.received += 1
+            return True
+        base, bitmap = st
+        if d < 0:
+            self.duplicates += 1
+            return False
+        if d == 0:
+            base += 1
+            while bitmap & 1:
+                bitmap >>= 1
+                base += 1
+            bitmap >>= 1
+        else:
+            got_base = False
+            if d > ACK_BITS:
+                # beyond the bitmap: the sender gave up on the oldest frames
+                shift = d - ACK_BITS
+                got_base = shift <= ACK_BITS and bool(bitmap >> (shift - 1) & 1)
+                base += shift
+                bitmap >>= shift
+                d = ACK_BITS
+            bit = 1 << (d - 1)
+            if bitmap & bit:
+                self.duplicates += 1
+                return False
+            bitmap |= bit
+            if got_base:
+                # the new base already arrived: move past it and what follows it
+                base += 1
+                while bitmap & 1:
+                    bitmap >>= 1
+                    base += 1
+                bitmap >>= 1
+        st[0], st[1] = base % SEQ_MOD, bitmap
+        self.received += 1
+        return True
+
+    def ack(self, src: int) -> bytes:
+        base, bitmap = self._state[src]
+        return encode_ack(base, bitmap)
+
+
+class ArqLink:
+    """Reliable sends to one destination over an sx126x (TX side)."""
+
+    def __init__(self, dev, dest_addr, sender, limiter=None):
+        self.dev = dev
+        self.dest = dest_addr
+        self.sender = sender
+        self.limiter = limiter
+        self.parser = FrameParser(rssi=dev.rssi)
+        self.latencies = collections.deque(maxlen=1024)   # seconds, first send to ACK
+        # dest prefix + framed ACK + checksum
+        sender.ack_airtime = frame_airtime(3 + framing.HEADER_LEN + _ACK.size + 1, dev.air_speed, dev.buffer_size)
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(dev.ser.fileno(), selectors.EVENT_READ)
+
+    def _transmit(self, data) -> float:
+        frame = bytes([(self.dest >> 8) & 0xFF, self.dest & 0xFF, self.dev.offset_freq]) \
+            + framing.encode(self.dev.addr, self.dev.offset_freq, data)
+        at = frame_airtime(len(frame), self.dev.air_speed, self.dev.buffer_size)
+        if self.limiter:
+            self.limiter.acquire(at)
+        self.dev.send(frame)
+        return at
+
+    def send(self, payload: bytes) -> float:
+        """Send one payload reliably (waits while the window is full); return its airtime."""
+        while self.sender.full():
+            self.poll(self.sender.rto_max)
+        frame_len = len(payload) + DATA_HEADER + framing.HEADER_LEN + 4   # + CHK + dest prefix
+        seq, data = self.sender.push(payload, frame_airtime(frame_len, self.dev.air_speed, self.dev.buffer_size))
+        return self._transmit(data)
+
+    def poll(self, timeout: float):
+        """Handle ACKs and retransmissions for up to `timeout` seconds.
+
+        Returns early once the window has room again after being full.
+        """
+        end = time.monotonic() + timeout
+        was_full = self.sender.full()
+        while True:
+            for _, data in self.sender.due():
+                self._transmit(data)
+            now = time.monotonic()
+            if now >= end or (was_full and not self.sender.full()):
+                return
+            nd = self.sender.next_deadline()
+            wait = end - now if nd is None else max(0.0, min(end, nd) - now)
+            if self._sel.select(wait):
+                n = self.dev.ser.in_waiting
+                for fr in self.parser.feed(self.dev.ser.read(n or 1)):
+                    if is_ack(fr.payload):
+                        for _, lat in self.sender.on_ack(*decode_ack(fr.payload)):
+                            self.latencies.append(lat)
+
+    def flush(self, timeout=10.0):
+        """Wait until every frame is acknowledged or given up (or timeout)."""
+        end = time.monotonic() + timeout
+        while self.sender.in_flight and time.monotonic() < end:
+            self.poll(min(0.2, end - time.monotonic()))
+
+    def close(self):
+        self._sel.close()
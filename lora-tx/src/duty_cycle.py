@@ -0,0 +1,87 @@
+"""Duty-cycle budget for the transmitters.
+
+DutyCycleLimiter is a token bucket whose tokens are seconds of airtime:
+it earns `duty` seconds per second (e.g. 0.01 for a 1% sub-band) and each
+frame spends its computed airtime. A token bucket alone would allow a full
+bucket plus the refill inside one window, so the limiter also keeps the
+airtime sent in the last `window_s` seconds and never lets it exceed
+`duty * window_s`. When either check fails the sender waits.
+"""
+import collections, time
+
+
+class DutyCycleLimiter:
+    """Token bucket of airtime with utilisation reporting."""
+
+    def __init__(self, duty=0.01, window_s=3600.0, burst_s=None, clock=time.monotonic):
+        """Args:
+            duty: allowed fraction of time on air (0 < duty <= 1).
+            window_s: observation window of the regional rule (ETSI: 1 h).
+            burst_s: bucket size in seconds of airtime (default duty * window_s).
+            clock: monotonic time source (injectable for simulations).
+        """
+        if not 0 < duty <= 1:
+            raise ValueError(f"duty cycle must be in (0, 1]: {duty}")
+        self.duty = duty
+        self.window_s = window_s
+        self.budget = duty * window_s
+        self.capacity = burst_s if burst_s is not None else self.budget
+        self.clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._start = self._last
+        self._recent = collections.deque()  # (t, airtime) inside the window
+        self._recent_sum = 0.0
+        self.total_airtime = 0.0
+        self.total_wait = 0.0
+        self.frames = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.duty)
+        self._last = now
+
+    def _expire(self, now):
+        while self._recent and self._recent[0][0] <= now - self.window_s:
+            self._recent_sum -= self._recent.popleft()[1]
+
+    def delay_for(self, airtime: float) -> float:
+        """Seconds to wait before a frame of `airtime` seconds fits the budget."""
+        now = self.clock()
+        self._refill(now)
+        self._expire(now)
+        wait = max((min(airtime, self.capacity) - self._tokens) / self.duty, 0.0)
+        # Sliding window: wait for enough old frames to leave the window
+        excess = self._recent_sum + airtime - self.budget
+        if excess > 1e-12:
+            for t, a in self._recent:
+                excess -= a
+                if excess <= 1e-12:
+                    wait = max(wait, t + self.window_s - now)
+                    break
+        return wait
+
+    def consume(self, airtime: float):
+        """Record a frame that is being sent now."""
+        now = self.clock()
+        self._refill(now)
+        self._tokens -= airtime
+        self.total_airtime += airtime
+        self.frames += 1
+        self._recent.append((now, airtime))
+        self._recent_sum += airtime
+
+    def acquire(self, airtime: float, sleep=time.sleep) -> float:
+        """Wait until the frame fits the budget, spend it and return the wait."""
+        wait = self.delay_for(airtime)
+        if wait > 0:
+            sleep(wait)
+            self.total_wait += wait
+        self.consume(airtime)
+        return wait
+
+    def utilisation(self) -> float:
+        """Fraction of time on air over the last window (or since start)."""
+        now = self.clock()
+        self._expire(now)
+        span = min(self.window_s, now - self._start)
+        return self._recent_sum / span if span > 0 else 0.0
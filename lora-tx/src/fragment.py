@@ -0,0 +1,167 @@
+"""Fragmentation of payloads larger than one module packet.
+
+The module sends at most `buffer_size` bytes (240/128/64/32) per packet,
+and a framed body (see framing.py) adds HEADER_LEN + 1 bytes. A payload
+that does not fit is cut into fragments, each one the payload of its own
+frame:
+
+    offset size  field
+    0      1     0xF8 | VERSION (no UTF-8 text starts with it, nor JSON/telemetry)
+    1      2     message id (uint16, little-endian), per source address
+    3      1     fragment index (0 .. count-1)
+    4      1     fragment count (1 .. 255)
+    5      n     fragment data
+
+Payloads that fit in one packet are sent unchanged, so receivers without
+reassembly keep working for everything but the large messages.
+Reassembler puts fragments back together on RX with bounded memory,
+per-message timeouts and eviction of the oldest partial messages.
+"""
+import collections, struct, time
+from framing import HEADER_LEN
+
+VERSION = 1
+MARKER = 0xF8           # 0xF8-0xFF: not a UTF-8 lead byte, text never starts with it
+_HEAD = struct.Struct('<BHBB')
+FRAG_HEADER = _HEAD.size
+MAX_FRAGMENTS = 255
+
+
+def is_fragment(payload) -> bool:
+    """True if the payload starts with a fragment header."""
+    return len(payload) >= FRAG_HEADER and payload[0] == MARKER | VERSION
+
+
+def packet_budget(packet_size: int, reserve=0) -> int:
+    """Payload bytes of one frame that fit in a module packet.
+
+    `reserve` bytes are kept free for an outer header (e.g. arq.DATA_HEADER).
+    """
+    return packet_size - (HEADER_LEN + 1) - reserve
+
+
+def split(payload: bytes, msg_id: int, packet_size=240, reserve=0) -> list:
+    """Return the frame payloads that carry `payload`.
+
+    A payload that fits one packet comes back unchanged (as the only item);
+    larger ones are fragmented. Raises ValueError beyond MAX_FRAGMENTS.
+    """
+    budget = packet_budget(packet_size, reserve)
+    if len(payload) <= budget and not is_fragment(payload):
+        return [payload]
+    chunk = budget - FRAG_HEADER
+    count = max(1, -(-len(payload) // chunk))
+    if count > MAX_FRAGMENTS:
+        raise ValueError(f"payload too long: {len(payload)} bytes needs {count} > {MAX_FRAGMENTS} fragments")
+    mid = msg_id & 0xFFFF
+    return [_HEAD.pack(MARKER | VERSION, mid, i, count) + payload[i * chunk:(i + 1) * chunk]
+            for i in range(count)]
+
+
+class _Partial:
+    __slots__ = ('parts', 'missing', 'size', 't0')
+
+    def __init__(self, count, t0):
+        self.parts = [None] * count
+        self.missing = count
+        self.size = 0
+        self.t0 = t0
+
+
+class Reassembler:
+    """Reassembly table keyed by (source address, message id).
+
+    Partial messages live in insertion order, so the oldest is always at the
+    front: timeouts and eviction pop from there in O(1). Memory is bounded by
+    `max_messages` partial messages and `max_bytes` buffered fragment data.
+    Keys of recently completed messages are remembered for `timeout_s` so
+    late duplicates of their fragments are dropped instead of starting a new
+    partial message (at most DONE_KEYS of them).
+    """
+    DONE_KEYS = 1024
+
+    def __init__(self, timeout_s=30.0, max_messages=64, max_bytes=256 * 1024, clock=time.monotonic):
+        self.timeout_s = timeout_s
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._partial = collections.OrderedDict()   # key -> _Partial
+        self._done = collections.OrderedDict()      # key -> completion time
+        self.buffered = 0        # fragment bytes held in partial messages
+        self.completed = 0
+        self.duplicates = 0      # fragments already held or of a completed message
+        self.timeouts = 0        # partial messages dropped after timeout_s
+        self.evicted = 0         # partial messages dropped to stay within the bounds
+        self.invalid = 0         # malformed headers or inconsistent counts
+
+    @property
+    def pending(self) -> int:
+        """Number of partial messages waiting for fragments."""
+        return len(self._partial)
+
+    def _drop(self, key):
+        self.buffered -= self._partial.pop(key).size
+
+    def expire(self, now=None):
+        """Drop partial messages older than timeout_s."""
+        if now is None:
+            now = self.clock()
+        limit = now - self.timeout_s
+        while self._partial:
+            key, p = next(iter(self._partial.items()))
+            if p.t0 > limit:
+                break
+            self._drop(key)
+            self.timeouts += 1
+        while self._done and next(iter(self._done.values())) <= limit:
+            self._done.popitem(last=False)
+
+    def add(self, src_addr: int, payload):
+        """Store one fragment; return the whole message once it is complete."""
+        try:
+            marker, mid, idx, count = _HEAD.unpack_from(payload, 0)
+        except struct.error:
+            self.invalid += 1
+            return None
+        if marker != MARKER | VERSION or count == 0 or idx >= count:
+            self.invalid += 1
+            return None
+        now = self.clock()
+        self.expire(now)
+        key = (src_addr, mid)
+        if key in self._done:
+            self.duplicates += 1
+            return None
+        data = bytes(payload[FRAG_HEADER:])
+        if count == 1:
+            return self._complete(key, now, data)
+        p = self._partial.get(key)
+        if p is not None and len(p.parts) != count:
+            # message id reused with a different layout: the old one is lost
+            self.invalid += 1
+            self._drop(key)
+            p = None
+        if p is None:
+            p = self._partial[key] = _Partial(count, now)
+        if p.parts[idx] is not None:
+            self.duplicates += 1
+            return None
+        p.parts[idx] = data
+        p.missing -= 1
+        p.size += len(data)
+        self.buffered += len(data)
+        if p.missing == 0:
+            self._drop(key)
+            return self._complete(key, now, b''.join(p.parts))
+        while len(self._partial) > self.max_messages or self.buffered > self.max_bytes:
+            self._drop(next(iter(self._partial)))
+            self.evicted += 1
+        return None
+
+    def _complete(self, key, now, msg):
+        self._done[key] = now
+        self._done.move_to_end(key)
+        if len(self._done) > self.DONE_KEYS:
+            self._done.popitem(last=False)
+        self.completed += 1
+        return msg
@@ -0,0 +1,119 @@
+"""High-rate seismic sampling with NumPy window statistics.
+
+A SeismicSampler thread reads a 3-axis accelerometer at a fixed rate
+(e.g. 100-200 Hz) on absolute deadlines into a NumPy ring buffer. Once per
+TX period the transmitter drains the samples taken since the last frame
+and either summarises the window (window_stats) or decimates it into a
+batch that fits the packet (decimate).
+"""
+import math, random, threading, time
+import numpy as np
+
+
+def simulated_accel(sigma=0.005):
+    """Ambient-noise accelerometer stand-in: one (ax, ay, az) sample in g."""
+    return (random.gauss(0.0, sigma), random.gauss(0.0, sigma), random.gauss(0.0, sigma))
+
+
+class SeismicSampler:
+    """Fixed-rate sampler thread writing into a (capacity, 3) float32 ring buffer."""
+
+    def __init__(self, rate_hz=100.0, read_fn=simulated_accel, capacity_s=10.0, max_catchup=5):
+        """Args:
+            rate_hz: sampling rate.
+            read_fn: callable returning one (ax, ay, az) sample in g.
+            capacity_s: seconds of samples the ring buffer holds.
+            max_catchup: slots the thread may fall behind and still take
+                back-to-back; further behind, the lost slots are skipped.
+        """
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.max_catchup = max_catchup
+        self.read_fn = read_fn
+        self.capacity = int(math.ceil(rate_hz * capacity_s))
+        self._buf = np.zeros((self.capacity, 3), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.count = 0          # samples written since start
+        self._drained = 0       # value of count at the last drain()
+        self.missed = 0         # sample slots skipped because the thread ran too late
+        self.overrun = 0        # samples overwritten before being drained
+        self.max_late = 0.0     # worst lateness of a taken sample, seconds
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='seismic-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        period = self.period
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sample = self.read_fn()
+            late = time.monotonic() - deadline
+            with self._lock:
+                self._buf[self.count % self.capacity] = sample
+                self.count += 1
+            if late > self.max_late:
+                self.max_late = late
+            deadline += period
+            if late > self.max_catchup * period:
+                # Too far behind to catch up: skip the lost slots
+                skipped = int(late // period)
+                self.missed += skipped
+                deadline += skipped * period
+
+    def drain(self) -> np.ndarray:
+        """Return (n, 3) samples taken since the previous drain, oldest first."""
+        with self._lock:
+            end = self.count
+            n = end - self._drained
+            if n > self.capacity:
+                self.overrun += n - self.capacity
+                n = self.capacity
+            self._drained = end
+            i = end % self.capacity
+            if n <= i:
+                return self._buf[i - n:i].copy()
+            return np.concatenate((self._buf[self.capacity - (n - i):], self._buf[:i]))
+
+
+def window_stats(w: np.ndarray) -> dict:
+    """Summarise a (n, 3) window in g, after removing each axis' mean.
+
+    ax_g/ay_g/az_g are the signed per-axis peaks, pga_g the largest absolute
+    value over all axes and rms_g the RMS over all axes and samples. These are
+    the keys of the 'seismic' object in the JSON payload and the fields of
+    the binary seismic block (telemetry_codec.SEIS_FIELDS).
+    """
+    if len(w) == 0:
+        return {'ax_g': 0.0, 'ay_g': 0.0, 'az_g': 0.0, 'pga_g': 0.0, 'rms_g': 0.0}
+    d = w - w.mean(axis=0)
+    idx = np.abs(d).argmax(axis=0)
+    peaks = d[idx, (0, 1, 2)]
+    return {
+        'ax_g': round(float(peaks[0]), 5),
+        'ay_g': round(float(peaks[1]), 5),
+        'az_g': round(float(peaks[2]), 5),
+        'pga_g': round(float(np.abs(peaks).max()), 5),
+        'rms_g': round(float(np.sqrt(np.mean(d * d))), 5),
+    }
+
+
+def decimate(w: np.ndarray, n: int) -> np.ndarray:
+    """Reduce a (m, 3) window to at most n samples by block averaging."""
+    m = len(w)
+    if m <= n:
+        return w
+    k = -(-m // n)  # ceil(m / n) samples per output sample
+    usable = (m // k) * k
+    return w[m - usable:].reshape(-1, k, 3).mean(axis=1)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Simulated SX126x HATs on a shared LoRa channel, for runs off the Pi.
+
+SimChannel plays the module behind pseudo-terminals: attach() opens a pty
+and returns the slave path, which goes to sx126x() (or SERIAL=) in place
+of /dev/serial0; a channel thread answers on the master side like the
+module would:
+
+  - register write C0/C2 00 09 + 9 bytes -> C1 echo, readback C1 00 09,
+    noise query C0 C1 C2 C3 00 02 -> C1 00 02 noise last_rssi
+  - anything else is a packet in fixed-point mode: dest_hi dest_lo chan and
+    the on-air bytes (framed bodies are cut at their LEN, legacy ones at
+    the module packet size)
+  - a packet occupies the air for its LoRa time on air at the sender's air
+    speed (divided by time_scale) and is delivered to every node on the same
+    channel and air speed whose address matches (or dest 65535), with the
+    RSSI byte appended when register 06H asks for it
+  - packets overlapping on the same channel collide and are lost for all
+    receivers (no capture effect); a node that is transmitting hears
+    nothing (half duplex); each delivery is also dropped with probability
+    `loss` and gets one byte flipped with probability `corrupt`
+
+M0/M1 are not visible through the pty, so commands are recognised by their
+bytes, as if the module were always in the right mode. Run the module
+alone to get ptys for separate TX/RX processes, with LORA_GPIO=sim and the
+same LORA_TIME_SCALE in their environment:
+
+    python src/sim_radio.py --nodes 2 --loss 0.1 --time-scale 10
+"""
+import argparse, heapq, itertools, os, random, selectors, threading, time, tty
+from airtime import packet_airtime
+import framing
+
+AIR_SPEEDS = {1: 1200, 2: 2400, 3: 4800, 4: 9600, 5: 19200, 6: 38400, 7: 62500}
+PACKET_SIZES = {0x00: 240, 0x40: 128, 0x80: 64, 0xC0: 32}
+BROADCAST = 0xFFFF
+NOISE_CMD = bytes([0xC0, 0xC1, 0xC2, 0xC3, 0x00, 0x02])
+READ_CMD = bytes([0xC1, 0x00, 0x09])
+DEFAULT_REGS = bytes([0x00, 0x00, 0x00, 0x62, 0x00, 0x12, 0x43, 0x00, 0x00])
+
+
+class SimNode:
+    """One simulated module: its registers and the master side of its pty."""
+
+    def __init__(self, name, fd, path, regs=DEFAULT_REGS):
+        self.name = name
+        self.fd = fd                  # master side, the module's end of the UART
+        self.slave = None             # slave fd, held open so the master never sees a hangup
+        self.path = path
+        self.regs = bytearray(regs)   # 00H..08H as written by the host
+        self.buf = bytearray()        # UART bytes not yet consumed
+        self.t_rx = 0.0               # last time UART bytes arrived
+        self.busy_until = 0.0         # end of the last scheduled transmission
+        self.spans = []               # (start, end) of recent transmissions
+        self.last_rssi = 0
+        self.sent = 0
+        self.received = 0
+        self.overflows = 0
+
+    @property
+    def addr(self) -> int:
+        return (self.regs[0] << 8) | self.regs[1]
+
+    @property
+    def chan(self) -> int:
+        return self.regs[5]
+
+    @property
+    def air_speed(self) -> int:
+        return AIR_SPEEDS.get(self.regs[3] & 0x07, 2400)
+
+    @property
+    def packet_size(self) -> int:
+        return PACKET_SIZES[self.regs[4] & 0xC0]
+
+    @property
+    def rssi_byte(self) -> bool:
+        return bool(self.regs[6] & 0x80)
+
+    def transmitting(self, start, end) -> bool:
+        return any(s < end and start < e for s, e in self.spans)
+
+
+class _Tx:
+    __slots__ = ('node', 'dest', 'chan', 'air', 'data', 'start', 'end', 'collided')
+
+    def __init__(self, node, dest, data, start, end):
+        self.node = node
+        self.dest = dest
+        self.chan = node.chan
+        self.air = node.air_speed
+        self.data = data
+        self.start = start
+        self.end = end
+        self.collided = False
+
+
+class SimChannel:
+    """Shared channel for any number of SimNode modules."""
+    IDLE_S = 0.05   # UART silence after which a partial write goes out as is
+
+    def __init__(self, time_scale=1.0, loss=0.0, corrupt=0.0, rssi=-60.0, rssi_std=4.0,
+                 noise=-110, seed=None):
+        """Args:
+            time_scale: how much faster than real time the air runs.
+            loss: probability that a delivery is dropped.
+            corrupt: probability that a delivery gets one byte flipped.
+            rssi, rssi_std: mean and spread of the packet RSSI (dBm).
+            noise: noise floor reported by the C0 C1 C2 C3 query (dBm).
+            seed: random seed for reproducible runs.
+        """
+        self.time_scale = time_scale
+        self.loss = loss
+        self.corrupt = corrupt
+        self.rssi = rssi
+        self.rssi_std = rssi_std
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.nodes = []
+        self._air = []                 # scheduled or ongoing transmissions
+        self._events = []              # (end, tie, _Tx)
+        self._tie = itertools.count()
+        self._sel = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._closing = False
+        self._thread = None
+        self.packets = 0
+        self.delivered = 0
+        self.collisions = 0            # deliveries lost to overlapping packets
+        self.lost = 0                  # deliveries dropped by `loss` or half duplex
+        self.corrupted = 0
+
+    def attach(self, name=None) -> str:
+        """Add a module; return the serial port path to open it with."""
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+        path = os.ttyname(slave)
+        node = SimNode(name or f"node{len(self.nodes)}", master, path)
+        node.slave = slave
+        with self._lock:
+            self.nodes.append(node)
+            self._sel.register(master, selectors.EVENT_READ, node)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sim-channel', daemon=True)
+            self._thread.start()
+        return path
+
+    def close(self):
+        self._closing = True
+        if self._thread:
+            self._thread.join()
+        for node in self.nodes:
+            os.close(node.fd)
+            os.close(node.slave)
+        self._sel.close()
+
+    def _run(self):
+        while not self._closing:
+            now = time.monotonic()
+            timeout = 0.05
+            if self._events:
+                timeout = min(timeout, max(0.0, self._events[0][0] - now))
+            for key, _ in self._sel.select(timeout):
+                node = key.data
+                try:
+                    node.buf += os.read(node.fd, 4096)
+                except (BlockingIOError, OSError):
+                    continue
+                node.t_rx = time.monotonic()
+                with self._lock:
+                    self._consume(node)
+            now = time.monotonic()
+            with self._lock:
+                while self._events and self._events[0][0] <= now:
+                    self._deliver(heapq.heappop(self._events)[2])
+                for node in self.nodes:
+                    self._idle(node, now)
+
+    def _reply(self, node, data):
+        try:
+            os.write(node.fd, data)
+        except BlockingIOError:
+            node.overflows += 1        # host not reading: the module drops it
+
+    def _consume(self, node):
+        buf = node.buf
+        while buf:
+            if buf[0] in (0xC0, 0xC2) and buf[1:3] == b'\x00\x09':
+                if len(buf) < 12:
+                    return
+                node.regs[:] = buf[3:12]
+                self._reply(node, b'\xc1' + bytes(buf[1:12]))
+                del buf[:12]
+            elif buf[:3] == READ_CMD:
+                self._reply(node, READ_CMD + bytes(node.regs))
+                del buf[:3]
+            elif buf[:6] == NOISE_CMD:
+                self._reply(node, b'\xc1\x00\x02' + bytes([(256 + self.noise) & 0xFF, node.last_rssi & 0xFF]))
+                del buf[:6]
+            elif NOISE_CMD.startswith(bytes(buf)) or READ_CMD.startswith(bytes(buf)):
+                return                 # command still arriving
+            else:
+                n = self._packet_len(buf)
+                if n is None:
+                    return
+                self._transmit(node, (buf[0] << 8) | buf[1], bytes(buf[3:n]))
+                del buf[:n]
+
+    @staticmethod
+    def _packet_len(buf):
+        """Bytes of the next packet in `buf` (prefix included), None if incomplete."""
+        if len(buf) < 3 + framing.HEADER_LEN:
+            return None
+        if buf[6] == framing.SYNC:
+            n = 3 + framing.HEADER_LEN + buf[7] + 1
+            return n if len(buf) >= n else None
+        return len(buf)                # legacy unframed write: take what is there
+
+    def _idle(self, node, now):
+        """UART silent for IDLE_S: send what is buffered, as the module does."""
+        if node.buf and now - node.t_rx >= self.IDLE_S:
+            if len(node.buf) > 3:
+                self._transmit(node, (node.buf[0] << 8) | node.buf[1], bytes(node.buf[3:]))
+            node.buf.clear()
+
+    def _transmit(self, node, dest, data):
+        # longer writes leave as several module packets, back to back
+        for i in range(0, len(data), node.packet_size):
+            chunk = data[i:i + node.packet_size]
+            start = max(time.monotonic(), node.busy_until)
+            end = start + packet_airtime(len(chunk), node.air_speed) / self.time_scale
+            node.busy_until = end
+            node.spans = [(s, e) for s, e in node.spans if e > start - 1.0] + [(start, end)]
+            tx = _Tx(node, dest, chunk, start, end)
+            for other in self._air:
+                if other.chan == tx.chan and other.air == tx.air and other.start < end and start < other.end:
+                    other.collided = tx.collided = True
+            self._air.append(tx)
+            heapq.heappush(self._events, (end, next(self._tie), tx))
+            node.sent += 1
+            self.packets += 1
+
+    def _deliver(self, tx):
+        self._air.remove(tx)
+        for node in self.nodes:
+            if node is tx.node or node.chan != tx.chan or node.air_speed != tx.air:
+                continue
+            if tx.dest != BROADCAST and node.addr not in (tx.dest, BROADCAST):
+                continue
+            if tx.collided:
+                self.collisions += 1
+                continue
+            if node.transmitting(tx.start, tx.end) or self.rng.random() < self.loss:
+                self.lost += 1
+                continue
+            data = bytearray(tx.data)
+            if self.corrupt and self.rng.random() < self.corrupt and data:
+                data[self.rng.randrange(len(data))] ^= 1 << self.rng.randrange(8)
+                self.corrupted += 1
+            rssi = max(-255, min(-1, round(self.rng.gauss(self.rssi, self.rssi_std))))
+            node.last_rssi = 256 + rssi
+            if node.rssi_byte:
+                data.append(256 + rssi)
+            self._reply(node, bytes(data))
+            node.received += 1
+            self.delivered += 1
+
+    def stats(self) -> dict:
+        return {'packets': self.packets, 'delivered': self.delivered, 'collisions': self.collisions,
+                'lost': self.lost, 'corrupted': self.corrupted}
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Canal LoRa simulado: un pty por módulo')
+    ap.add_argument('--nodes', type=int, default=2)
+    ap.add_argument('--loss', type=float, default=0.0, help='Probabilidad de perder cada entrega')
+    ap.add_argument('--corrupt', type=float, default=0.0, help='Probabilidad de corromper un byte')
+    ap.add_argument('--rssi', type=float, default=-60.0, help='RSSI medio de los paquetes (dBm)')
+    ap.add_argument('--time-scale', type=float, default=float(os.getenv('LORA_TIME_SCALE','1') or 1),
+                    help='Aceleración del tiempo en el aire (usar el mismo LORA_TIME_SCALE en TX/RX)')
+    ap.add_argument('--seed', type=int, default=None)
+    args = ap.parse_args()
+    ch = SimChannel(args.time_scale, args.loss, args.corrupt, args.rssi, seed=args.seed)
+    for i in range(args.nodes):
+        print(f"node{i}: {ch.attach()}", flush=True)
+    print(f"Canal simulado x{args.time_scale:g} (CTRL+C para salir); lanzar TX/RX con LORA_GPIO=sim")
+    try:
+        while True:
+            time.sleep(10)
+            print(ch.stats(), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(ch.stats())
+        ch.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,12 +10,36 @@ Note: This is a simplified driver adapted from vendor examples.
 import RPi.GPIO as GPIO
 import serial
 import time
+import collections
+import json
+import os
+from airtime import frame_airtime, uart_time
+from framing import FrameParser, NOISE_CMD
+import tracing
+
+class ConfigResult:
+    """Outcome of sx126x.set(): what the module holds and what it took."""
+    __slots__ = ('ok', 'source', 'reg', 'attempts', 'elapsed_ms')
+
+    def __init__(self, ok, source, reg, attempts, elapsed_ms):
+        self.ok = ok                    # module holds the requested registers
+        self.source = source            # memory | cache | readback | written | failed
+        self.reg = reg                  # 9 parameter registers (00H-08H) as applied
+        self.attempts = attempts        # register writes sent (0 if skipped)
+        self.elapsed_ms = elapsed_ms
+
+    def __repr__(self):
+        return 'ConfigResult(ok=%s, source=%s, attempts=%d, elapsed_ms=%.1f, reg=%s)' % (
+            self.ok, self.source, self.attempts, self.elapsed_ms, ' '.join('%02X' % b for b in self.reg))
 
 class sx126x:
     """Minimal SX126x UART driver for Raspberry Pi GPIO/UART HAT."""
 
     M0 = 22
     M1 = 27
+    # M0/M1 levels for normal mode (LOW/LOW) and configuration mode (M1 HIGH)
+    MODE_NORMAL = (GPIO.LOW,GPIO.LOW)
+    MODE_CONFIG = (GPIO.LOW,GPIO.HIGH)
     # if the header is 0xC0, then the LoRa register settings dont lost when it poweroff, and 0xC2 will be lost. 
     # cfg_reg = [0xC0,0x00,0x09,0x00,0x00,0x00,0x62,0x00,0x17,0x43,0x00,0x00]
     cfg_reg = [0xC2,0x00,0x09,0x00,0x00,0x00,0x62,0x00,0x12,0x43,0x00,0x00]
@@ -24,6 +48,23 @@ class sx126x:
     addr = 65535
     serial_n = ""
     addr_temp = 0
+    parser = None
+    mode = None         # last M0/M1 levels driven (None = unknown)
+    _mode_t = 0.0       # monotonic time of the last M0/M1 change
+    CONFIG_SETTLE = 0.1  # seconds the module needs after entering config mode
+    fast_start = False  # read registers back and skip the write when they match
+    cfg_cache = None    # directory of the per-port cache of applied registers
+    cfg_source = None   # how set() got the registers (see ConfigResult.source)
+    config = None       # ConfigResult of the last set()
+    _applied = None     # cfg_reg the module acknowledged in this process
+    CONFIG_TRIES = 3    # register writes per set() before giving up
+    ACK_TIMEOUT = 0.3   # deadline for the 12-byte 0xC1 answer to each write
+    aux = None          # optional BCM pin wired to the module AUX output
+    NOISE_INTERVAL = 10.0  # seconds between the noise queries receive() sends
+    noise_rssi = None   # last noise floor reported by the module (dBm)
+    _noise_t = 0.0
+    # frames allowed between the UART and the air before send() waits
+    MAX_INFLIGHT = 2
 
     #
     # start frequence of two lora module
@@ -87,7 +128,8 @@ class sx126x:
 
     def __init__(self,serial_num,freq,addr,power,rssi,air_speed=2400,\
                  net_id=0,buffer_size = 240,crypt=0,\
-                 relay=False,lbt=False,wor=False):
+                 skip_config=False,relay=False,lbt=False,wor=False,aux_pin=None,\
+                 fast_start=False,cfg_cache=None,m0_pin=None,m1_pin=None):
         """Initialize the radio and UART.
 
         Args:
@@ -98,39 +140,98 @@ class sx126x:
             rssi: Whether to append packet RSSI to received messages.
             air_speed: Air data rate in bps.
             net_id, buffer_size, crypt, relay, lbt, wor: Module features.
+            skip_config: Do not write the registers; only compute the channel
+                offset and leave the module in normal mode.
+            aux_pin: Optional BCM pin connected to AUX; send(block=True) and
+                mode changes then wait for AUX instead of the airtime estimate.
+            fast_start: Read the registers back (C1 00 09) and skip the write
+                when they already match.
+            cfg_cache: Directory for a per-port record of the last applied
+                registers; a match there skips even the readback.
+            m0_pin, m1_pin: BCM pins of M0/M1 when they differ from the HAT
+                defaults (22/27), e.g. a second module on a gateway.
         """
         self.rssi = rssi
         self.addr = addr
         self.freq = freq
         self.serial_n = serial_num
         self.power = power
+        self.air_speed = air_speed
+        self.buffer_size = buffer_size
+        self.fast_start = fast_start
+        self.cfg_cache = cfg_cache
+        if m0_pin is not None:
+            self.M0 = m0_pin
+        if m1_pin is not None:
+            self.M1 = m1_pin
         # Initial the GPIO for M0 and M1 Pin
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
         GPIO.setup(self.M0,GPIO.OUT)
         GPIO.setup(self.M1,GPIO.OUT)
-        GPIO.output(self.M0,GPIO.LOW)
-        GPIO.output(self.M1,GPIO.HIGH)
+        if aux_pin is not None:
+            GPIO.setup(aux_pin,GPIO.IN)
+            self.aux = aux_pin
+        self._inflight = collections.deque()   # estimated end of air time per frame
+        self._backlog = []   # frames read by get_channel_rssi() for receive()
+        self._uart_done = 0.0
+        # M0/M1 are driven by set() (config) or below (normal), so a fast start
+        # that finds the registers already applied never enters config mode
 
         # The hardware UART of Pi3B+,Pi4B is /dev/ttyS0
         self.ser = serial.Serial(serial_num,9600)
         self.ser.flushInput()
-        self.set(freq,addr,power,rssi,air_speed,net_id,buffer_size,crypt,relay,lbt,wor)
+        if not skip_config:
+            self.set(freq,addr,power,rssi,air_speed,net_id,buffer_size,crypt,relay,lbt,wor)
+        else:
+            # Channel offset for build_frame without touching the module registers
+            if freq > 850:
+                self.start_freq = 850
+                self.offset_freq = freq - 850
+            elif freq > 410:
+                self.start_freq = 410
+                self.offset_freq = freq - 410
+            self.enter_mode(self.MODE_NORMAL)
 
-    def set(self,freq,addr,power,rssi,air_speed=2400,\
-            net_id=0,buffer_size = 240,crypt=0,\
-            relay=False,lbt=False,wor=False):
-        """Apply configuration to the module over UART while M1 is high.
+    def set_mode(self,mode):
+        """Drive M0/M1 for the given mode tuple.
 
-        Retries up to 5 times waiting for 0xC1 acknowledgment.
+        Returns True if the pins actually changed; the caller must then let
+        the module settle. Unchanged modes cost nothing.
         """
-        self.send_to = addr
-        self.addr = addr
-        # We should pull up the M1 pin when sets the module
-        GPIO.output(self.M0,GPIO.LOW)
-        GPIO.output(self.M1,GPIO.HIGH)
-        time.sleep(0.5)
+        if self.mode == mode:
+            return False
+        GPIO.output(self.M0,mode[0])
+        GPIO.output(self.M1,mode[1])
+        self.mode = mode
+        self._mode_t = time.monotonic()
+        return True
+
+    def enter_mode(self,mode,settle=0.1):
+        """Switch mode and make sure `settle` seconds passed since the change.
+
+        Costs nothing when the module has been in `mode` for long enough.
+        """
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        changed = self.mode != mode
+        if changed:
+            # never leave normal mode with a frame still going out
+            self.wait_tx_done()
+            self.set_mode(mode)
+        delay = self._mode_t + settle - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if tr and (changed or delay > 0):
+            tr.add('mode', t0)
 
+    def build_cfg_reg(self,freq,addr,power,rssi,air_speed=2400,\
+                      net_id=0,buffer_size = 240,crypt=0,relay=False):
+        """Return the 12-byte register block for the given settings.
+
+        Also updates start_freq/offset_freq used to build and parse frames.
+        """
+        reg = list(self.cfg_reg)
         low_addr = addr & 0xff
         high_addr = addr >> 8 & 0xff
         net_id_temp = net_id & 0xff
@@ -164,62 +265,192 @@ class sx126x:
         h_crypt = crypt >> 8 & 0xff
         
         if relay==False:
-            self.cfg_reg[3] = high_addr
-            self.cfg_reg[4] = low_addr
-            self.cfg_reg[5] = net_id_temp
-            self.cfg_reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
+            reg[3] = high_addr
+            reg[4] = low_addr
+            reg[5] = net_id_temp
+            reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
             # 
             # it will enable to read noise rssi value when add 0x20 as follow
             # 
-            self.cfg_reg[7] = buffer_size_temp + power_temp + 0x20
-            self.cfg_reg[8] = freq_temp
+            reg[7] = buffer_size_temp + power_temp + 0x20
+            reg[8] = freq_temp
             #
             # it will output a packet rssi value following received message
             # when enable eighth bit with 06H register(rssi_temp = 0x80)
             #
-            self.cfg_reg[9] = 0x43 + rssi_temp
-            self.cfg_reg[10] = h_crypt
-            self.cfg_reg[11] = l_crypt
+            reg[9] = 0x43 + rssi_temp
+            reg[10] = h_crypt
+            reg[11] = l_crypt
         else:
-            self.cfg_reg[3] = 0x01
-            self.cfg_reg[4] = 0x02
-            self.cfg_reg[5] = 0x03
-            self.cfg_reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
+            reg[3] = 0x01
+            reg[4] = 0x02
+            reg[5] = 0x03
+            reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
             # 
             # it will enable to read noise rssi value when add 0x20 as follow
             # 
-            self.cfg_reg[7] = buffer_size_temp + power_temp + 0x20
-            self.cfg_reg[8] = freq_temp
+            reg[7] = buffer_size_temp + power_temp + 0x20
+            reg[8] = freq_temp
             #
             # it will output a packet rssi value following received message
             # when enable eighth bit with 06H register(rssi_temp = 0x80)
             #
-            self.cfg_reg[9] = 0x03 + rssi_temp
-            self.cfg_reg[10] = h_crypt
-            self.cfg_reg[11] = l_crypt
+            reg[9] = 0x03 + rssi_temp
+            reg[10] = h_crypt
+            reg[11] = l_crypt
+        return reg
+
+    def set(self,freq,addr,power,rssi,air_speed=2400,\
+            net_id=0,buffer_size = 240,crypt=0,\
+            relay=False,lbt=False,wor=False):
+        """Apply configuration to the module and return a ConfigResult.
+
+        Each attempt writes the 12-byte register block and reads exactly the
+        12-byte 0xC1 answer with an ACK_TIMEOUT deadline, so a responsive
+        module costs one round trip; only the mode settle time is fixed.
+        With fast_start, registers the module already holds are not rewritten.
+        """
+        t0 = time.monotonic()
+        tr = tracing.TRACER
+        if tr: t_ns = time.perf_counter_ns()
+        self.send_to = addr
+        self.addr = addr
+        self.cfg_reg = self.build_cfg_reg(freq,addr,power,rssi,air_speed,net_id,buffer_size,crypt,relay)
+        attempts = 0
+        if self.fast_start and self._cfg_is_current():
+            reg = self.cfg_reg[3:]
+        else:
+            reg = None
+            # We should pull up the M1 pin when sets the module
+            self.enter_mode(self.MODE_CONFIG,self.CONFIG_SETTLE)
+            while attempts < self.CONFIG_TRIES and reg is None:
+                attempts += 1
+                reg = self.check_cfg_ack(self._command(bytes(self.cfg_reg),len(self.cfg_reg),self.ACK_TIMEOUT))
+        self.enter_mode(self.MODE_NORMAL)
+        self.record_cfg(reg,attempts,t0,freq,addr,power,rssi,air_speed,buffer_size)
+        if tr: tr.add('set', t_ns)
+        return self.config
+
+    def check_cfg_ack(self,resp):
+        """Validate the answer to a write of self.cfg_reg.
+
+        The module echoes the 12-byte block with 0xC1 in place of the write
+        header. Returns the 9 applied registers, or None for a short, missing
+        or foreign answer.
+        """
+        if len(resp) == len(self.cfg_reg) and resp[0] == 0xC1 and list(resp[1:3]) == self.cfg_reg[1:3]:
+            return list(resp[3:])
+        return None
+
+    def record_cfg(self,reg,attempts,t0,freq,addr,power,rssi,air_speed,buffer_size):
+        """Record the outcome of applying self.cfg_reg and return the ConfigResult.
+
+        reg holds the registers the module acknowledged (None if it never
+        did); attempts is 0 when fast start found them already applied.
+        Shared by set() and AsyncSX126x.configure(), so either path leaves
+        the fast-start memory, the disk cache and the settings send() uses
+        for its airtime estimate in step with the module.
+        """
+        ok = reg is not None
+        if attempts:
+            self.cfg_source = 'written' if ok else 'failed'
+            self._save_cfg_cache(ok)
+        self._applied = list(self.cfg_reg) if ok else None
+        if ok:
+            self.freq, self.addr, self.send_to, self.power = freq, addr, addr, power
+            self.rssi, self.air_speed, self.buffer_size = rssi, air_speed, buffer_size
+        self.config = ConfigResult(ok,self.cfg_source,reg or [],attempts,(time.monotonic() - t0) * 1000)
+        return self.config
+
+    def _command(self,cmd,size,timeout):
+        """Write a command and read exactly `size` answer bytes (fewer on timeout)."""
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
         self.ser.flushInput()
+        self.ser.write(cmd)
+        old = self.ser.timeout
+        self.ser.timeout = timeout
+        try:
+            return self.ser.read(size)
+        finally:
+            self.ser.timeout = old
+            if tr: tr.add('command', t0)
 
-        for i in range(5):
-            self.ser.write(bytes(self.cfg_reg))
-            end_time = time.time() + 1.0
-            while self.ser.inWaiting() == 0 and time.time() < end_time:
-                time.sleep(0.05)
-            if self.ser.inWaiting() > 0:
-                time.sleep(0.05)
-                r_buff = self.ser.read(self.ser.inWaiting())
-                if len(r_buff) > 0 and r_buff[0] == 0xC1:
-                    # configuration acknowledged
-                    # print("parameters set OK")
-                    break
-            print("setting fail,setting again")
-            self.ser.flushInput()
-            time.sleep(0.2)
-            if i == 4:
-                print("setting fail,Press Esc to Exit and run again")
-
-        GPIO.output(self.M0,GPIO.LOW)
-        GPIO.output(self.M1,GPIO.LOW)
-        time.sleep(0.1)
+    def read_cfg_reg(self,timeout=0.3):
+        """Read the parameter registers back with C1 00 09 (config mode).
+
+        Returns the 12-byte answer (C1 00 09 + 9 registers) as a list, or
+        None if the module does not answer in time.
+        """
+        self.enter_mode(self.MODE_CONFIG,self.CONFIG_SETTLE)
+        buf = self._command(bytes([0xC1,0x00,0x09]),12,timeout)
+        if len(buf) == 12 and buf[:3] == bytes([0xC1,0x00,0x09]):
+            return list(buf[:12])
+        return None
+
+    def _cfg_is_current(self):
+        """True if the module already holds self.cfg_reg (memory, cache, then readback)."""
+        if self._applied == self.cfg_reg:
+            # applied by this process: a runtime set() with unchanged settings is free
+            self.cfg_source = 'memory'
+            return True
+        if self._load_cfg_cache() == self.cfg_reg:
+            self.cfg_source = 'cache'
+            return True
+        # The crypt key (registers 7-8) is write-only: it cannot be verified
+        if self.cfg_reg[10] or self.cfg_reg[11]:
+            return False
+        cur = self.read_cfg_reg()
+        if cur is not None and cur[3:10] == self.cfg_reg[3:10]:
+            self.cfg_source = 'readback'
+            self._save_cfg_cache(True)
+            return True
+        return False
+
+    def _cfg_cache_path(self):
+        name = os.path.basename(self.serial_n) or 'serial'
+        return os.path.join(self.cfg_cache, 'sx126x-%s.json' % name)
+
+    @staticmethod
+    def _boot_id():
+        # 0xC2 registers do not survive a power cycle: a cache entry is only
+        # trusted within the same boot
+        try:
+            with open('/proc/sys/kernel/random/boot_id') as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    def _load_cfg_cache(self):
+        if not self.cfg_cache:
+            return None
+        try:
+            with open(self._cfg_cache_path()) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('port') != self.serial_n or entry.get('boot_id') != self._boot_id():
+            return None
+        return entry.get('reg')
+
+    def _save_cfg_cache(self,ok):
+        """Record self.cfg_reg as applied (ok) or forget the entry."""
+        if not self.cfg_cache:
+            return
+        path = self._cfg_cache_path()
+        try:
+            if not ok:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            os.makedirs(self.cfg_cache, exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'port': self.serial_n, 'boot_id': self._boot_id(), 'reg': self.cfg_reg}, f)
+            os.replace(tmp, path)
+        except OSError:
+            # The cache is an optimisation only; startup continues without it
+            pass
 
     def get_settings(self):
         """Query module settings (requires M1 high). Prints basic parameters."""
@@ -250,52 +481,120 @@ class sx126x:
 # the data format like as following
 # "node address,frequence,payload"
 # "20,868,Hello World"
-    def send(self,data):
-        """Send raw bytes over UART. Ensures normal mode (M0=LOW, M1=LOW)."""
-        GPIO.output(self.M1,GPIO.LOW)
-        GPIO.output(self.M0,GPIO.LOW)
-        time.sleep(0.1)
+    def send(self,data,block=False):
+        """Send raw bytes over UART in normal mode (M0=LOW, M1=LOW).
 
+        The mode pins are only toggled (and waited for) on a real change.
+        Writes are pipelined: the call returns once the bytes are handed to
+        the UART, and only waits when MAX_INFLIGHT earlier frames are still
+        draining or on air (from the UART time and computed airtime). With
+        block=True it also waits until this frame has left the antenna.
+        """
+        tr = tracing.TRACER
+        if tr: t0 = time.perf_counter_ns()
+        self.enter_mode(self.MODE_NORMAL)
+        self._wait_slot()
+        if tr:
+            t1 = time.perf_counter_ns()
+            tr.add('send.wait', t0, t1)
         self.ser.write(data)
-        # if self.rssi == True:
-            # self.get_channel_rssi()
-        time.sleep(0.1)
+        if tr: tr.add('send.write', t1)
+        # the UART carries one frame after another; the module starts a frame
+        # once it is in its buffer and the previous one is out
+        self._uart_done = max(time.monotonic(), self._uart_done) + uart_time(len(data))
+        prev = self._inflight[-1] if self._inflight else 0.0
+        done = max(self._uart_done, prev) + frame_airtime(len(data), self.air_speed, self.buffer_size)
+        self._inflight.append(done)
+        if block:
+            self.wait_tx_done()
+        if tr: tr.add('send', t0)
 
+    def _wait_slot(self):
+        """Block until fewer than MAX_INFLIGHT frames are pending."""
+        now = time.monotonic()
+        while self._inflight and self._inflight[0] <= now:
+            self._inflight.popleft()
+        if len(self._inflight) >= self.MAX_INFLIGHT:
+            if self.aux is not None:
+                self.wait_tx_done()
+            else:
+                time.sleep(max(self._inflight.popleft() - now, 0.0))
+
+    def wait_tx_done(self,timeout=5.0):
+        """Wait until every frame written so far has been transmitted."""
+        if self.aux is not None:
+            end = time.monotonic() + timeout
+            # AUX is LOW while the module is busy
+            while GPIO.input(self.aux) == GPIO.LOW and time.monotonic() < end:
+                time.sleep(0.002)
+        elif self._inflight:
+            time.sleep(max(self._inflight[-1] - time.monotonic(), 0.0))
+        self._inflight.clear()
 
     def receive(self):
-        """Blocking read of available UART bytes; prints payload and optional RSSI."""
+        """Read available UART bytes and print every complete frame with optional RSSI.
+
+        With rssi enabled, a noise RSSI query goes out every NOISE_INTERVAL
+        seconds without waiting for it; the reply is taken out of the stream
+        by the parser and printed when it arrives.
+        """
+        parser = self._get_parser()
+        frames, self._backlog = self._backlog, []
         if self.ser.inWaiting() > 0:
-            time.sleep(0.5)
-            r_buff = self.ser.read(self.ser.inWaiting())
+            # Frames are delimited by the SYNC/LEN header, so partial reads stay
+            # buffered in the parser instead of waiting a fixed time here
+            frames += parser.feed(self.ser.read(self.ser.inWaiting()))
+        for fr in frames:
+            print("receive message from node address with frequence\033[1;32m %d,%d.125MHz\033[0m"%(fr.src_addr,fr.chan+self.start_freq),end='\r\n',flush = True)
+            print("message is "+str(fr.payload),end='\r\n')
 
-            print("receive message from node address with frequence\033[1;32m %d,%d.125MHz\033[0m"%((r_buff[0]<<8)+r_buff[1],r_buff[2]+self.start_freq),end='\r\n',flush = True)
-            print("message is "+str(r_buff[3:-1]),end='\r\n')
-            
             # print the rssi
             if self.rssi:
-                # print('\x1b[3A',end='\r')
-                print("the packet rssi value: -{0}dBm".format(256-r_buff[-1:][0]))
-                self.get_channel_rssi()
-            else:
-                pass
-                #print('\x1b[2A',end='\r')
+                print("the packet rssi value: {0}dBm".format(fr.rssi))
+        now = time.monotonic()
+        if self.rssi and now - self._noise_t >= self.NOISE_INTERVAL:
+            if parser.noise_expected:
+                parser.cancel_noise()   # the last query was never answered
+            self._noise_t = now
+            self.request_noise()
 
-    def get_channel_rssi(self):
-        """Query current noise RSSI (not the last packet RSSI)."""
-        GPIO.output(self.M1,GPIO.LOW)
-        GPIO.output(self.M0,GPIO.LOW)
-        time.sleep(0.1)
-        self.ser.flushInput()
-        self.ser.write(bytes([0xC0,0xC1,0xC2,0xC3,0x00,0x02]))
-        time.sleep(0.5)
-        re_temp = bytes(5)
-        if self.ser.inWaiting() > 0:
-            time.sleep(0.1)
-            re_temp = self.ser.read(self.ser.inWaiting())
-        if re_temp[0] == 0xC1 and re_temp[1] == 0x00 and re_temp[2] == 0x02:
-            print("the current noise rssi value: -{0}dBm".format(256-re_temp[3]))
-            # print("the last receive packet rssi value: -{0}dBm".format(256-re_temp[4]))
-        else:
-            # pass
+    def _get_parser(self):
+        if self.parser is None:
+            self.parser = FrameParser(rssi=self.rssi, on_noise=self._on_noise)
+        return self.parser
+
+    def _on_noise(self, noise, last_rssi):
+        self.noise_rssi = noise
+        print("the current noise rssi value: {0}dBm".format(noise))
+
+    def request_noise(self,parser=None):
+        """Write the noise RSSI query and return at once.
+
+        The reply is taken out of the stream by `parser` (default: the one
+        receive() uses), which must be fed everything read from this UART.
+        """
+        self.enter_mode(self.MODE_NORMAL)
+        (parser or self._get_parser()).expect_noise()
+        self.ser.write(NOISE_CMD)
+
+    def get_channel_rssi(self,timeout=1.0):
+        """Query current noise RSSI in dBm (not the last packet RSSI); None without a reply.
+
+        Nothing is flushed: frames that arrive while waiting are kept for the
+        next receive().
+        """
+        parser = self._get_parser()
+        replies = parser.noise_replies
+        self.request_noise()
+        end = time.monotonic() + timeout
+        while parser.noise_replies == replies and time.monotonic() < end:
+            n = self.ser.inWaiting()
+            if n:
+                self._backlog += parser.feed(self.ser.read(n))
+            else:
+                time.sleep(0.01)
+        if parser.noise_replies == replies:
+            parser.cancel_noise()
             print("receive rssi value fail")
-            # print("receive rssi value fail: ",re_temp)
+            return None
+        return self.noise_rssi
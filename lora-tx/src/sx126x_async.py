@@ -0,0 +1,182 @@
+"""asyncio front-end for the sx126x driver.
+
+Wraps an sx126x instance (normally created with skip_config=True so the
+constructor does not block) and drives its UART through loop.add_reader /
+loop.add_writer on the serial file descriptor. The radio, sinks and any
+other coroutine can then share one event loop without threads:
+
+    dev = sx126x(serial_num, freq, addr, power, rssi=True, skip_config=True)
+    async with AsyncSX126x(dev) as radio:
+        await radio.configure(freq, addr, power, rssi=True, air_speed=2400)
+        await radio.send(frame)
+        async for fr in radio.frames():
+            ...
+
+Nothing here touches hardware directly other than through `dev.ser` and
+`dev.set_mode()`, so any object providing those (plus build_cfg_reg,
+check_cfg_ack, record_cfg and the MODE_* constants) works, e.g. an sx126x
+on a pty-backed serial port. configure() validates the module's answer and
+records the result with the same helpers as sx126x.set(), so a later
+blocking set() or send() sees the registers and air speed it applied.
+"""
+import asyncio, os, time
+from framing import FrameParser, NOISE_CMD as NOISE_RSSI_CMD
+
+
+class AsyncSX126x:
+    """Non-blocking send/receive/configure for an sx126x radio."""
+
+    def __init__(self, dev, queue_size=256, mode_settle=0.1):
+        """Args:
+            dev: sx126x instance (its UART must already be open).
+            queue_size: received frames kept before the oldest is dropped.
+            mode_settle: seconds to wait after changing M0/M1.
+        """
+        self.dev = dev
+        self.ser = dev.ser
+        self.fd = dev.ser.fileno()
+        self.parser = FrameParser(rssi=dev.rssi, on_noise=self._on_noise)
+        self.mode_settle = mode_settle
+        self.dropped = 0          # frames discarded because nobody consumed them
+        self._queue = asyncio.Queue(queue_size)
+        self._response = None     # (size, bytearray, future) while a command waits
+        self._noise = None        # future of a pending noise query
+        self._loop = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Register the UART fd with the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        os.set_blocking(self.fd, False)
+        self._loop.add_reader(self.fd, self._on_readable)
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.remove_reader(self.fd)
+            self._loop = None
+
+    def _on_readable(self):
+        n = self.ser.in_waiting
+        data = self.ser.read(n) if n else b''
+        if not data:
+            return
+        if self._response is not None:
+            # Command responses arrive in config mode or right after a query;
+            # route everything to the pending command until it completes.
+            size, buf, fut = self._response
+            buf += data
+            if len(buf) >= size and not fut.done():
+                fut.set_result(None)
+            return
+        for fr in self.parser.feed(data):
+            if self._queue.full():
+                self._queue.get_nowait()
+                self.dropped += 1
+            self._queue.put_nowait(fr)
+
+    def _on_noise(self, noise, last_rssi):
+        if self._noise is not None and not self._noise.done():
+            self._noise.set_result(noise)
+
+    async def _write(self, data):
+        """Write all bytes without blocking the loop, then wait for the UART to drain."""
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self.fd, view):]
+            except BlockingIOError:
+                fut = self._loop.create_future()
+                self._loop.add_writer(self.fd, lambda: fut.done() or fut.set_result(None))
+                try:
+                    await fut
+                finally:
+                    self._loop.remove_writer(self.fd)
+        # 10 bits per byte (8N1) at the UART baud rate
+        await asyncio.sleep(len(data) * 10.0 / self.ser.baudrate)
+
+    async def _command(self, cmd: bytes, size: int, timeout: float) -> bytes:
+        """Send a command and return up to `size` response bytes (short on timeout)."""
+        fut = self._loop.create_future()
+        buf = bytearray()
+        self._response = (size, buf, fut)
+        try:
+            await self._write(cmd)
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._response = None
+        return bytes(buf[:size])
+
+    async def _enter(self, mode):
+        # dev.set_mode() caches M0/M1 and reports whether they changed,
+        # so the mode is shared with the blocking driver methods
+        if self.dev.set_mode(mode):
+            await asyncio.sleep(self.mode_settle)
+
+    async def configure(self, freq, addr, power, rssi, air_speed=2400,
+                        net_id=0, buffer_size=240, crypt=0, relay=False,
+                        retries=3, timeout=1.0) -> bool:
+        """Write the module registers; True once the module echoes them back.
+
+        The outcome is recorded on dev (dev.config, fast-start memory and
+        cache, air_speed/buffer_size) like sx126x.set() does.
+        """
+        dev = self.dev
+        t0 = time.monotonic()
+        dev.cfg_reg = dev.build_cfg_reg(freq, addr, power, rssi, air_speed,
+                                        net_id, buffer_size, crypt, relay)
+        applied, attempts = None, 0
+        await self._enter(dev.MODE_CONFIG)
+        try:
+            while attempts < retries and applied is None:
+                attempts += 1
+                self.ser.reset_input_buffer()
+                resp = await self._command(bytes(dev.cfg_reg), len(dev.cfg_reg), timeout)
+                applied = dev.check_cfg_ack(resp)
+        finally:
+            await self._enter(dev.MODE_NORMAL)
+            dev.record_cfg(applied, attempts, t0, freq, addr, power, rssi, air_speed, buffer_size)
+            self.parser.rssi = dev.rssi
+        return dev.config.ok
+
+    async def send(self, data: bytes):
+        """Transmit one frame (as built by build_frame)."""
+        await self._enter(self.dev.MODE_NORMAL)
+        await self._write(data)
+
+    async def recv(self, timeout=None):
+        """Return the next received Frame, or None on timeout."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def frames(self):
+        """Async iterator over received Frames."""
+        while True:
+            yield await self._queue.get()
+
+    async def noise_rssi(self, timeout=1.0):
+        """Query the current channel noise RSSI in dBm (None if no valid reply).
+
+        The parser takes the reply out of the receive stream, so frames
+        arriving meanwhile are still delivered.
+        """
+        await self._enter(self.dev.MODE_NORMAL)
+        self._noise = self._loop.create_future()
+        self.parser.expect_noise()
+        try:
+            await self._write(NOISE_RSSI_CMD)
+            return await asyncio.wait_for(self._noise, timeout)
+        except asyncio.TimeoutError:
+            self.parser.cancel_noise()
+            return None
+        finally:
+            self._noise = None
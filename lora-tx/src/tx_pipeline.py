@@ -0,0 +1,213 @@
+"""Decoupled transmit pipeline: sampling producer, bounded queue, radio writer.
+
+A transmitter that samples, encodes, sends and then sleeps(period) in one
+loop lets every radio stall push the next sample back: a duty-cycle wait, a
+full ARQ window or the module's in-flight limit. TxPipeline splits it in two
+threads:
+
+    producer  calls sample() on absolute deadlines, one period after the
+              other (not one period after the last send), and queues the
+              message it returns
+    writer    takes messages from the bounded queue, oldest first, and
+              calls send() on each as fast as the airtime allows
+
+When a sample arrives with `depth` messages already queued, `policy` says
+what gives:
+
+    drop-oldest  the oldest queued message is discarded (freshest data wins)
+    coalesce     the new sample is merged into the newest queued one with
+                 merge(old, new), by default the new one replaces it; merge
+                 runs under the queue lock, so it must be quick
+
+The queue depth, its high-water mark, drops, merges, skipped sampling
+slots and the time each message waited are counted for the summary and,
+through metrics(), for Prometheus.
+"""
+import collections, threading, time
+
+POLICIES = ('drop-oldest', 'coalesce')
+
+
+class TxPipeline:
+    """Producer and writer threads around a bounded message queue."""
+
+    def __init__(self, sample, send, period, depth=8, policy='drop-oldest', merge=None,
+                 idle=None, idle_s=0.05):
+        """Args:
+            sample: callable() returning the next message, or None to skip the slot.
+            send: callable(msg) transmitting one message; may block.
+            period: seconds between two sample() calls.
+            depth: messages the queue holds at most.
+            policy: 'drop-oldest' or 'coalesce' when the queue is full.
+            merge: callable(old, new) returning the coalesced message.
+            idle: callable(timeout) run by the writer while the queue is empty
+                (e.g. ArqLink.poll for ACKs and retransmissions); at most
+                idle_s long so a new message waits little.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"unknown queue policy {policy!r} (use {', '.join(POLICIES)})")
+        self.sample = sample
+        self.send = send
+        self.period = period
+        self.depth = max(1, depth)
+        self.policy = policy
+        self.merge = merge or (lambda old, new: new)
+        self.idle = idle
+        self.idle_s = idle_s
+        self._q = collections.deque()       # (monotonic time queued, message)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()      # producer: no more samples
+        self._closing = False               # writer: return once the queue is empty
+        self._abort = False                 # writer: return after the current send
+        self._failed = threading.Event()
+        self.error = None                   # exception that stopped a thread
+        self.sampled = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.missed = 0          # sampling slots skipped because the producer ran late
+        self.max_late = 0.0      # worst lateness of a sample() call, seconds
+        self.max_depth = 0
+        self.waits = collections.deque(maxlen=1024)   # seconds from queued to sent
+        self._m_wait = None
+        self._producer = threading.Thread(target=self._produce, name='tx-producer', daemon=True)
+        self._writer = threading.Thread(target=self._write, name='tx-writer', daemon=True)
+
+    def __len__(self):
+        """Messages queued right now."""
+        return len(self._q)
+
+    def metrics(self, reg):
+        """Register the queue metrics (lora_tx_*) in a metrics.Registry."""
+        reg.gauge('lora_tx_queue_depth', 'Messages waiting for the radio', fn=lambda: len(self._q))
+        reg.gauge('lora_tx_queue_max_depth', 'Most messages ever waiting for the radio',
+                  fn=lambda: self.max_depth)
+        reg.counter('lora_tx_samples_total', 'Messages produced by the sampler', fn=lambda: self.sampled)
+        reg.counter('lora_tx_messages_sent_total', 'Messages handed to the radio', fn=lambda: self.sent)
+        reg.counter('lora_tx_queue_dropped_total', 'Oldest messages dropped on a full queue',
+                    fn=lambda: self.dropped)
+        reg.counter('lora_tx_queue_coalesced_total', 'Samples merged into a queued message on a full queue',
+                    fn=lambda: self.coalesced)
+        reg.counter('lora_tx_sample_missed_total', 'Sampling slots skipped because the sampler ran late',
+                    fn=lambda: self.missed)
+        self._m_wait = reg.histogram('lora_tx_queue_wait_seconds', 'Time a message waited for the radio',
+                                     [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0])
+
+    def start(self):
+        self._producer.start()
+        self._writer.start()
+        return self
+
+    def run(self):
+        """start() and block until a thread fails (re-raised here) or KeyboardInterrupt."""
+        self.start()
+        while not self._failed.wait(0.5):
+            pass
+        raise self.error
+
+    def _fail(self, e):
+        self.error = e
+        self._stop.set()
+        with self._cond:
+            self._abort = True
+            self._cond.notify()
+        self._failed.set()
+
+    def _produce(self):
+        period = self.period
+        deadline = time.monotonic()
+        try:
+            while True:
+                delay = deadline - time.monotonic()
+                if delay > 0 and self._stop.wait(delay):
+                    return
+                if self._stop.is_set():
+                    return
+                late = time.monotonic() - deadline
+                if late > self.max_late:
+                    self.max_late = late
+                msg = self.sample()
+                if msg is not None:
+                    self._put(msg)
+                deadline += period
+                if late > period:
+                    # Too far behind: skip the lost slots instead of sampling back to back
+                    skipped = int(late // period)
+                    self.missed += skipped
+                    deadline += skipped * period
+        except Exception as e:
+            self._fail(e)
+
+    def _put(self, msg):
+        with self._cond:
+            self.sampled += 1
+            if len(self._q) >= self.depth:
+                if self.policy == 'coalesce':
+                    # keeps the queue time of the older message: its wait goes on
+                    t, old = self._q[-1]
+                    self._q[-1] = (t, self.merge(old, msg))
+                    self.coalesced += 1
+                    return
+                self._q.popleft()
+                self.dropped += 1
+            self._q.append((time.monotonic(), msg))
+            if len(self._q) > self.max_depth:
+                self.max_depth = len(self._q)
+            if len(self._q) == 1:
+                self._cond.notify()
+
+    def _write(self):
+        try:
+            while True:
+                with self._cond:
+                    if not self._q and self.idle is None and not self._closing and not self._abort:
+                        self._cond.wait()
+                    if self._abort:
+                        return
+                    item = self._q.popleft() if self._q else None
+                    closing = self._closing
+                if item is None:
+                    if closing:
+                        return
+                    if self.idle is not None:
+                        self.idle(self.idle_s)
+                    continue
+                t, msg = item
+                wait = time.monotonic() - t
+                self.waits.append(wait)
+                if self._m_wait:
+                    self._m_wait.observe(wait)
+                self.send(msg)
+                self.sent += 1
+        except Exception as e:
+            self._fail(e)
+
+    def close(self, timeout=5.0) -> bool:
+        """Stop sampling and send what is queued for up to `timeout` seconds.
+
+        Returns True if the writer finished (queue empty, nothing in send());
+        False if it is still blocked in send(), which must then not be used
+        from another thread.
+        """
+        self._stop.set()
+        if self._producer.is_alive():
+            self._producer.join()
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._writer.is_alive():
+            self._writer.join(timeout)
+        if self._writer.is_alive():
+            with self._cond:
+                self._abort = True
+                self._cond.notify()
+            self._writer.join(1.0)
+        return not self._writer.is_alive()
+
+    def summary(self) -> str:
+        """One line for the exit report."""
+        w = sorted(self.waits)
+        return (f"Cola: {self.sampled} muestras, {self.sent} enviadas, {len(self._q)} sin enviar, "
+                f"{self.dropped} descartadas, {self.coalesced} combinadas, máx. {self.max_depth} en cola"
+                + (f", espera p50={w[len(w) // 2] * 1000:.0f} máx={w[-1] * 1000:.0f} ms" if w else "")
+                + (f", {self.missed} muestreos perdidos" if self.missed else ""))
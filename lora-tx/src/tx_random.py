@@ -3,21 +3,27 @@
 
 Sends periodically either JSON or text frames to a destination address.
 Environment variables (via .env) and CLI flags control UART port,
-frequency, addresses, power, air speed, mode, and period.
+frequency, addresses, power, air speed, mode, and period. Payloads are
+generated on schedule by a producer thread and sent by a writer thread
+(tx_pipeline), so radio stalls never delay them.
 """
 import os, argparse, json, random, time
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 from sx126x import sx126x
+import framing
+from airtime import frame_airtime
+from duty_cycle import DutyCycleLimiter
+from tx_pipeline import TxPipeline, POLICIES
+import fragment, arq, metrics, tracing
 
 load_dotenv()
 
 def build_frame(dev, dest_addr: int, payload: bytes) -> bytes:
-    """Construct a LoRa frame by prefixing destination/src address and
-    channel offset bytes to the payload."""
+    """Construct a LoRa frame: destination/channel prefix for the module plus
+    the framed body (source, channel, SYNC/LEN header, payload, checksum)."""
     dest_hi = (dest_addr >> 8) & 0xFF; dest_lo = dest_addr & 0xFF
-    src_hi  = (dev.addr >> 8) & 0xFF;  src_lo  = dev.addr & 0xFF
-    return bytes([dest_hi, dest_lo, dev.offset_freq, src_hi, src_lo, dev.offset_freq]) + payload
+    return bytes([dest_hi, dest_lo, dev.offset_freq]) + framing.encode(dev.addr, dev.offset_freq, payload)
 
 def now_iso():
     """Return current UTC timestamp in ISO 8601 (seconds resolution)."""
@@ -34,30 +40,122 @@ def main():
     ap.add_argument('--airspeed', type=int, default=int(os.getenv('AIRSPEED','2400')))
     ap.add_argument('--mode', choices=['json','text'], default=os.getenv('MODE','json'))
     ap.add_argument('--period', type=float, default=float(os.getenv('PERIOD','1.0')))
+    ap.add_argument('--duty', type=float, default=float(os.getenv('DUTY_CYCLE','0')),
+                    help='Duty cycle máximo (0.01 = 1%%); 0 desactiva el límite')
+    ap.add_argument('--duty-window', type=float, default=float(os.getenv('DUTY_WINDOW_S','3600')),
+                    help='Ventana de observación del duty cycle en segundos')
+    ap.add_argument('--arq', type=int, default=int(os.getenv('ARQ','0')),
+                    help='1: envío fiable con ventana deslizante y ACK del RX')
+    ap.add_argument('--arq-window', type=int, default=int(os.getenv('ARQ_WINDOW','8')),
+                    help='Tramas sin confirmar como máximo en modo ARQ')
+    ap.add_argument('--queue', type=int, default=int(os.getenv('TX_QUEUE','8')),
+                    help='Mensajes en cola hacia la radio como máximo')
+    ap.add_argument('--queue-policy', choices=POLICIES, default=os.getenv('TX_QUEUE_POLICY','drop-oldest'),
+                    help='Cola llena: descartar el mensaje más antiguo o sustituir el último por el nuevo')
+    ap.add_argument('--metrics-port', type=int, default=int(os.getenv('TX_METRICS_PORT','0')),
+                    help='Puerto HTTP de las métricas Prometheus (/metrics); 0 = desactivado')
+    ap.add_argument('--metrics-addr', default=os.getenv('TX_METRICS_ADDR','127.0.0.1'),
+                    help='Dirección donde escuchar las métricas')
+    ap.add_argument('--fast-start', type=int, default=int(os.getenv('FAST_START','1')),
+                    help='1: leer los registros del módulo y no reescribirlos si ya coinciden')
+    ap.add_argument('--cfg-cache', default=os.getenv('CFG_CACHE',''),
+                    help='Directorio de caché de la configuración aplicada por puerto (vacío = sin caché)')
     args = ap.parse_args()
+    tracing.setup_from_env()
 
+    t0 = time.monotonic()
     dev = sx126x(serial_num=args.serial, freq=args.freq, addr=args.addr,
-                 power=args.power, rssi=False, air_speed=args.airspeed, relay=False)
+                 power=args.power, rssi=False, air_speed=args.airspeed, relay=False,
+                 fast_start=bool(args.fast_start), cfg_cache=args.cfg_cache or None)
+    startup_ms = (time.monotonic() - t0) * 1000
+
+    limiter = DutyCycleLimiter(args.duty, args.duty_window) if args.duty > 0 else None
+    # Modo fiable: las tramas quedan en una ventana hasta su ACK y se reenvían si se pierden
+    link = None
+    if args.arq:
+        sender = arq.ArqSender(window=args.arq_window, first_seq=random.randrange(65536))
+        link = arq.ArqLink(dev, args.dest, sender, limiter)
 
     seq = 0
+    # Id de mensaje para fragmentos: inicio aleatorio para que un reinicio del TX no
+    # repita ids que el RX todavía recuerda como completos
+    msg_id = random.randrange(65536)
     print(f"TX → dest={hex(args.dest)} @ {args.freq}.125 MHz | mode={args.mode} | period={args.period}s")
-    try:
-        while True:
-            if args.mode == 'json':
-                payload_obj = {'ts': now_iso(), 'seq': seq,
-                               'rand': random.randint(0, 10**6),
-                               'val': round(random.uniform(0,100), 3)}
-                payload = json.dumps(payload_obj, separators=(',',':')).encode()
-            else:
-                payload = f"MSG|{seq:06d}|{now_iso()}|{random.randint(0,9999)}".encode()
-
-            frame = build_frame(dev, args.dest, payload)
+    cfg = dev.config
+    print(f"Radio lista en {startup_ms:.0f} ms (registros: {cfg.source}, escrituras={cfg.attempts}, "
+          f"configuración {cfg.elapsed_ms:.0f} ms)")
+    if not cfg.ok:
+        print("⚠️  El módulo no confirmó la configuración (revisa jumpers, M0/M1 y el puerto serie)")
+    reg = metrics.Registry()
+    m_frames = reg.counter('lora_tx_frames_total', 'Frames written to the module (fragments included)')
+    m_air = reg.counter('lora_tx_airtime_seconds_total', 'Computed airtime of the frames sent')
+
+    def sample():
+        """Next payload, timestamped when it is generated (producer thread)."""
+        nonlocal seq
+        if args.mode == 'json':
+            payload_obj = {'ts': now_iso(), 'seq': seq,
+                           'rand': random.randint(0, 10**6),
+                           'val': round(random.uniform(0,100), 3)}
+            payload = json.dumps(payload_obj, separators=(',',':')).encode()
+        else:
+            payload = f"MSG|{seq:06d}|{now_iso()}|{random.randint(0,9999)}".encode()
+        seq += 1
+        return payload
+
+    def send(payload):
+        """Transmit one payload (writer thread)."""
+        nonlocal msg_id
+        # Lo que no cabe en un paquete del módulo se envía fragmentado
+        parts = fragment.split(payload, msg_id, dev.buffer_size, arq.DATA_HEADER if link else 0)
+        msg_id += 1
+        airtime = 0.0
+        for part in parts:
+            if link:
+                airtime += link.send(part)
+                continue
+            frame = build_frame(dev, args.dest, part)
+            # Tiempo en el aire de la trama; con límite de duty cycle se espera presupuesto
+            at = frame_airtime(len(frame), args.airspeed, dev.buffer_size)
+            if limiter:
+                limiter.acquire(at)
             dev.send(frame)
-            print("TX:", payload.decode(errors='ignore'))
-            seq += 1
-            time.sleep(args.period)
+            airtime += at
+        m_frames.inc(len(parts))
+        m_air.inc(airtime)
+        info = f" | air={airtime * 1000:.0f}ms" + (f" frags={len(parts)}" if len(parts) > 1 else "") \
+            + (f" duty={limiter.utilisation():.2%}" if limiter else "") \
+            + (f" arq={link.sender.in_flight}/{link.sender.window}" if link else "") \
+            + (f" cola={len(pipe)}" if len(pipe) else "")
+        print("TX:", payload.decode(errors='ignore') + info)
+
+    # Muestreo y radio desacoplados: el productor sigue su periodo aunque la radio
+    # se atasque (duty cycle, ventana ARQ llena) y la cola acotada absorbe la diferencia;
+    # en modo ARQ el escritor atiende ACKs y reenvíos mientras la cola está vacía
+    pipe = TxPipeline(sample, send, args.period, depth=args.queue, policy=args.queue_policy,
+                      idle=link.poll if link else None)
+    pipe.metrics(reg)
+    if args.metrics_port:
+        reg.serve(args.metrics_port, args.metrics_addr)
+    try:
+        pipe.run()
     except KeyboardInterrupt:
         pass
+    finally:
+        # Lo que queda en la cola sale antes de cerrar (5 s como mucho)
+        drained = pipe.close()
+        print(pipe.summary())
+        if link and drained:
+            link.flush()
+            st = link.sender
+            lat = sorted(link.latencies)
+            print(f"ARQ: {st.acked}/{st.sent} confirmadas, {st.retransmissions} reenvíos, {st.failed} perdidas"
+                  + (f", latencia p50={lat[len(lat) // 2] * 1000:.0f} ms" if lat else "")
+                  + (f", srtt={st.srtt * 1000:.0f} ms" if st.srtt else ""))
+            link.close()
+        # Dejar salir la última trama antes de soltar el puerto
+        if drained:
+            dev.wait_tx_done()
 
 if __name__ == '__main__':
     main()
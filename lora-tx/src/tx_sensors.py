@@ -4,26 +4,36 @@
 Sends simulated rain and seismic data frames at a configurable period.
 Environment variables (via .env) and CLI flags control UART port,
 frequency, addresses, power, air speed, station id, and bucket size.
+Readings are taken on schedule by a producer thread and sent by a writer
+thread (tx_pipeline), so radio stalls never shift the sampling.
 """
 
-import os, argparse, json, random, time, math
-from datetime import datetime, timezone
+import os, argparse, json, random, time
+from datetime import datetime
 from dotenv import load_dotenv
+import numpy as np
 from sx126x import sx126x
+import framing
+from airtime import frame_airtime
+from duty_cycle import DutyCycleLimiter
+from tx_pipeline import TxPipeline, POLICIES
+import fragment, arq, metrics, tracing
+import telemetry_codec
+from seismic import SeismicSampler, window_stats, decimate
 
 load_dotenv()
 
 def build_frame(dev, dest_addr: int, payload: bytes) -> bytes:
-    """Construct a LoRa frame prefixing payload with destination and source
-    addresses and the device channel offset bytes expected by the receiver.
+    """Construct a LoRa frame: destination address and channel for the
+    module's fixed-point mode, then the framed body (source address, channel,
+    SYNC/LEN header, payload and checksum) expected by the receiver.
     """
     dest_hi = (dest_addr >> 8) & 0xFF; dest_lo = dest_addr & 0xFF
-    src_hi  = (dev.addr >> 8) & 0xFF;  src_lo  = dev.addr & 0xFF
-    return bytes([dest_hi, dest_lo, dev.offset_freq, src_hi, src_lo, dev.offset_freq]) + payload
+    return bytes([dest_hi, dest_lo, dev.offset_freq]) + framing.encode(dev.addr, dev.offset_freq, payload)
 
-def now_iso():
-    """Return current local time formatted as 'YYYY-MM-DD HH:MM:SS'."""
-    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def now_iso(t=None):
+    """Return local time `t` (default: now) formatted as 'YYYY-MM-DD HH:MM:SS'."""
+    return (datetime.now() if t is None else datetime.fromtimestamp(t)).strftime('%Y-%m-%d %H:%M:%S')
 
 def simulate_rain(period_s: float, bucket_mm: float, total_mm: float, tips: int):
     """Simulate rainfall over the given sample period.
@@ -52,25 +62,6 @@ def simulate_rain(period_s: float, bucket_mm: float, total_mm: float, tips: int)
         'rain_mm_total': round(total_mm, 3)
     }, total_mm, tips
 
-def simulate_seismic():
-    """Simulate 3-axis acceleration (g) with ambient noise and compute metrics.
-
-    Returns a dict with ax_g, ay_g, az_g, pga_g (peak), and rms_g.
-    """
-    # Simula aceleración en g con ruido ambiental
-    ax = random.gauss(0.0, 0.005)
-    ay = random.gauss(0.0, 0.005)
-    az = random.gauss(0.0, 0.005)
-    pga_g = max(abs(ax), abs(ay), abs(az))
-    rms_g = math.sqrt((ax*ax + ay*ay + az*az) / 3.0)
-    return {
-        'ax_g': round(ax, 5),
-        'ay_g': round(ay, 5),
-        'az_g': round(az, 5),
-        'pga_g': round(pga_g, 5),
-        'rms_g': round(rms_g, 5)
-    }
-
 def main():
     """Entry point: parse CLI, configure radio, and transmit sensor frames."""
     ap = argparse.ArgumentParser(description='Transmit simulated rain and seismic data')
@@ -81,44 +72,193 @@ def main():
     ap.add_argument('--power', type=int, default=int(os.getenv('POWER','22')))
     ap.add_argument('--airspeed', type=int, default=int(os.getenv('AIRSPEED','2400')))
     ap.add_argument('--period', type=float, default=float(os.getenv('PERIOD','1.0')))
+    ap.add_argument('--duty', type=float, default=float(os.getenv('DUTY_CYCLE','0')),
+                    help='Duty cycle máximo (0.01 = 1%%); 0 desactiva el límite')
+    ap.add_argument('--duty-window', type=float, default=float(os.getenv('DUTY_WINDOW_S','3600')),
+                    help='Ventana de observación del duty cycle en segundos')
+    ap.add_argument('--arq', type=int, default=int(os.getenv('ARQ','0')),
+                    help='1: envío fiable con ventana deslizante y ACK del RX')
+    ap.add_argument('--arq-window', type=int, default=int(os.getenv('ARQ_WINDOW','8')),
+                    help='Tramas sin confirmar como máximo en modo ARQ')
     ap.add_argument('--station', default=os.getenv('STATION','tx01'))
     ap.add_argument('--rain', action='store_true', help='Incluir bloque de lluvia')
     ap.add_argument('--seismic', action='store_true', help='Incluir bloque sísmico')
     ap.add_argument('--bucket-mm', type=float, default=float(os.getenv('BUCKET_MM','0.2')))
+    ap.add_argument('--format', choices=['bin','json'], default=os.getenv('PAYLOAD_FORMAT','bin'),
+                    help='bin: compact struct-packed payload (telemetry_codec); json: legacy JSON')
+    ap.add_argument('--sample-hz', type=float, default=float(os.getenv('SAMPLE_HZ','100')),
+                    help='Frecuencia de muestreo del acelerómetro')
+    ap.add_argument('--seismic-mode', choices=['window','batch'], default=os.getenv('SEISMIC_MODE','window'),
+                    help='window: resumen PGA/RMS/picos de la ventana; batch: además muestras diezmadas que llenan el paquete')
+    ap.add_argument('--packet-size', type=int, choices=[240,128,64,32], default=int(os.getenv('PACKET_SIZE','240')),
+                    help='Tamaño de paquete del módulo (buffer_size)')
+    ap.add_argument('--batch-packets', type=int, default=int(os.getenv('BATCH_PACKETS','1')),
+                    help='Paquetes que puede ocupar una trama batch (>1 la envía fragmentada)')
+    ap.add_argument('--queue', type=int, default=int(os.getenv('TX_QUEUE','8')),
+                    help='Mensajes en cola hacia la radio como máximo')
+    ap.add_argument('--queue-policy', choices=POLICIES, default=os.getenv('TX_QUEUE_POLICY','drop-oldest'),
+                    help='Cola llena: descartar el mensaje más antiguo o combinar la lectura nueva con la última en cola')
+    ap.add_argument('--metrics-port', type=int, default=int(os.getenv('TX_METRICS_PORT','0')),
+                    help='Puerto HTTP de las métricas Prometheus (/metrics); 0 = desactivado')
+    ap.add_argument('--metrics-addr', default=os.getenv('TX_METRICS_ADDR','127.0.0.1'),
+                    help='Dirección donde escuchar las métricas')
+    ap.add_argument('--fast-start', type=int, default=int(os.getenv('FAST_START','1')),
+                    help='1: leer los registros del módulo y no reescribirlos si ya coinciden')
+    ap.add_argument('--cfg-cache', default=os.getenv('CFG_CACHE',''),
+                    help='Directorio de caché de la configuración aplicada por puerto (vacío = sin caché)')
     args = ap.parse_args()
+    tracing.setup_from_env()
 
     # Si no se especifica ninguno, incluir ambos por defecto
     include_rain = args.rain or (not args.rain and not args.seismic)
     include_seis = args.seismic or (not args.rain and not args.seismic)
+    if args.seismic_mode == 'batch' and args.format != 'bin':
+        ap.error('--seismic-mode batch requires --format bin')
 
+    t0 = time.monotonic()
     dev = sx126x(serial_num=args.serial, freq=args.freq, addr=args.addr,
-                 power=args.power, rssi=False, air_speed=args.airspeed, relay=False)
+                 power=args.power, rssi=False, air_speed=args.airspeed,
+                 buffer_size=args.packet_size, relay=False,
+                 fast_start=bool(args.fast_start), cfg_cache=args.cfg_cache or None)
+    startup_ms = (time.monotonic() - t0) * 1000
+
+    # El acelerómetro se muestrea en su propio hilo; cada trama resume la ventana
+    sampler = SeismicSampler(rate_hz=args.sample_hz).start() if include_seis else None
+
+    limiter = DutyCycleLimiter(args.duty, args.duty_window) if args.duty > 0 else None
+    # Modo fiable: las tramas quedan en una ventana hasta su ACK y se reenvían si se pierden
+    link = None
+    if args.arq:
+        sender = arq.ArqSender(window=args.arq_window, first_seq=random.randrange(65536))
+        link = arq.ArqLink(dev, args.dest, sender, limiter)
 
     seq = 0
+    # Id de mensaje para fragmentos: inicio aleatorio para que un reinicio del TX no
+    # repita ids que el RX todavía recuerda como completos
+    msg_id = random.randrange(65536)
     total_mm = 0.0
     tips = 0
-    print(f"TX sensors → dest={hex(args.dest)} @ {args.freq}.125 MHz | period={args.period}s | serial={args.serial}")
-    try:
-        while True:
+    print(f"TX sensors → dest={hex(args.dest)} @ {args.freq}.125 MHz | period={args.period}s | format={args.format} | serial={args.serial}")
+    cfg = dev.config
+    print(f"Radio lista en {startup_ms:.0f} ms (registros: {cfg.source}, escrituras={cfg.attempts}, "
+          f"configuración {cfg.elapsed_ms:.0f} ms)")
+    if not cfg.ok:
+        print("⚠️  El módulo no confirmó la configuración (revisa jumpers, M0/M1 y el puerto serie)")
+    reg = metrics.Registry()
+    m_frames = reg.counter('lora_tx_frames_total', 'Frames written to the module (fragments included)')
+    m_air = reg.counter('lora_tx_airtime_seconds_total', 'Computed airtime of the frames sent')
+
+    def encode(r):
+        """Fill r['payload'] and r['shown'] from the reading r (seq, ts, rain, window)."""
+        window = r['window']
+        seis_obj = window_stats(window) if window is not None else None
+        if args.format == 'bin':
+            payload = telemetry_codec.encode(r['seq'], r['ts'], args.station, r['rain'], seis_obj)
+            if window is not None and args.seismic_mode == 'batch':
+                # Llenar el resto del paquete (o de batch_packets fragmentos) con muestras diezmadas
+                budget = fragment.packet_budget(args.packet_size)
+                if args.batch_packets > 1:
+                    budget = args.batch_packets * (budget - fragment.FRAG_HEADER)
+                budget -= len(payload)
+                n = telemetry_codec.batch_capacity(budget)
+                if n > 0 and len(window) > 0:
+                    samples = decimate(window, n)
+                    interval_ms = 1000.0 * (len(window) // len(samples)) / args.sample_hz
+                    payload = telemetry_codec.encode(r['seq'], r['ts'], args.station, r['rain'], seis_obj,
+                                                     batch=(interval_ms, samples))
+            shown = f"seq={r['seq']} {len(payload)}B {payload.hex()}"
+        else:
             payload_obj = {
-                'ts': now_iso(),
-                'seq': seq,
+                'ts': now_iso(r['ts']),
+                'seq': r['seq'],
                 'station': args.station
             }
-            if include_rain:
-                rain_obj, total_mm, tips = simulate_rain(args.period, args.bucket_mm, total_mm, tips)
-                payload_obj['rain'] = rain_obj
-            if include_seis:
-                payload_obj['seismic'] = simulate_seismic()
-
+            if r['rain']:
+                payload_obj['rain'] = r['rain']
+            if seis_obj:
+                payload_obj['seismic'] = seis_obj
             payload = json.dumps(payload_obj, separators=(',',':')).encode()
-            frame = build_frame(dev, args.dest, payload)
+            shown = payload.decode(errors='ignore')
+        r['payload'], r['shown'] = payload, shown
+        return r
+
+    def sample():
+        """Take one reading and encode it (producer thread)."""
+        nonlocal seq, total_mm, tips
+        rain_obj = window = None
+        if include_rain:
+            rain_obj, total_mm, tips = simulate_rain(args.period, args.bucket_mm, total_mm, tips)
+        if include_seis:
+            window = sampler.drain()
+        r = encode({'seq': seq, 'ts': time.time(), 'rain': rain_obj, 'window': window})
+        seq += 1
+        return r
+
+    def merge(old, new):
+        """Coalesce two readings: the newer rain totals, the seismic window of both."""
+        if new['window'] is not None and old['window'] is not None:
+            # los picos de la lectura antigua no se pierden: se resume la ventana completa
+            new['window'] = np.concatenate((old['window'], new['window']))
+            encode(new)
+        return new
+
+    def send(r):
+        """Transmit one reading (writer thread)."""
+        nonlocal msg_id
+        # Lo que no cabe en un paquete del módulo se envía fragmentado
+        parts = fragment.split(r['payload'], msg_id, dev.buffer_size, arq.DATA_HEADER if link else 0)
+        msg_id += 1
+        airtime = 0.0
+        for part in parts:
+            if link:
+                airtime += link.send(part)
+                continue
+            frame = build_frame(dev, args.dest, part)
+            # Tiempo en el aire de la trama; con límite de duty cycle se espera presupuesto
+            at = frame_airtime(len(frame), args.airspeed, dev.buffer_size)
+            if limiter:
+                limiter.acquire(at)
             dev.send(frame)
-            print("TX sensors:", payload.decode(errors='ignore'))
-            seq += 1
-            time.sleep(args.period)
+            airtime += at
+        m_frames.inc(len(parts))
+        m_air.inc(airtime)
+        info = f" | air={airtime * 1000:.0f}ms" + (f" frags={len(parts)}" if len(parts) > 1 else "") \
+            + (f" duty={limiter.utilisation():.2%}" if limiter else "") \
+            + (f" arq={link.sender.in_flight}/{link.sender.window}" if link else "") \
+            + (f" cola={len(pipe)}" if len(pipe) else "")
+        print("TX sensors:", r['shown'] + info)
+
+    # Muestreo y radio desacoplados: las lecturas siguen su periodo aunque la radio
+    # se atasque (duty cycle, ventana ARQ llena) y la cola acotada absorbe la diferencia;
+    # en modo ARQ el escritor atiende ACKs y reenvíos mientras la cola está vacía
+    pipe = TxPipeline(sample, send, args.period, depth=args.queue, policy=args.queue_policy,
+                      merge=merge, idle=link.poll if link else None)
+    pipe.metrics(reg)
+    if args.metrics_port:
+        reg.serve(args.metrics_port, args.metrics_addr)
+    try:
+        pipe.run()
     except KeyboardInterrupt:
         pass
+    finally:
+        # Lo que queda en la cola sale antes de cerrar (5 s como mucho)
+        drained = pipe.close()
+        print(pipe.summary())
+        if link and drained:
+            link.flush()
+            st = link.sender
+            lat = sorted(link.latencies)
+            print(f"ARQ: {st.acked}/{st.sent} confirmadas, {st.retransmissions} reenvíos, {st.failed} perdidas"
+                  + (f", latencia p50={lat[len(lat) // 2] * 1000:.0f} ms" if lat else "")
+                  + (f", srtt={st.srtt * 1000:.0f} ms" if st.srtt else ""))
+            link.close()
+        # Dejar salir la última trama antes de soltar el puerto
+        if drained:
+            dev.wait_tx_done()
+        if sampler:
+            sampler.stop()
+            print(f"Sismo: {sampler.count} muestras @ {args.sample_hz} Hz | perdidas={sampler.missed} "
+                  f"retraso máx={sampler.max_late * 1000:.1f} ms")
 
 if __name__ == '__main__':
     main()